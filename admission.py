@@ -0,0 +1,223 @@
+# app/admission.py
+"""
+비싼 엔드포인트의 동시 실행 수 제한(admission control)과 인증 엔드포인트의 토큰 버킷 rate limit.
+
+라우트를 비용 등급(auth / upload / heavy / export)으로 나누고 등급마다 동시 실행 수와 대기열 길이를 제한합니다.
+대기열이 가득 찼거나 ADMISSION_MAX_WAIT_SECONDS 안에 차례가 오지 않으면 바로 503 + Retry-After 로 응답합니다.
+등급이 없는 가벼운 라우트와 WebSocket 은 제한하지 않습니다. 제한은 워커 프로세스 단위입니다.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+from starlette.responses import JSONResponse
+
+import metrics
+from config import settings
+
+# (method, 라우트 템플릿) -> 비용 등급
+ROUTE_CLASSES: Dict[Tuple[str, str], str] = {
+    ("POST", "/auth/token"): "auth",
+    ("POST", "/auth/signup"): "auth",
+    ("POST", "/markets/{market_id}/image"): "upload",
+    ("POST", "/communities/{community_id}/image"): "upload",
+    ("PATCH", "/users/me/avatar"): "upload",
+    ("GET", "/markets/"): "heavy",
+    ("GET", "/communities/"): "heavy",
+    ("POST", "/markets/bulk"): "heavy",
+    ("PATCH", "/markets/bulk"): "heavy",
+    ("POST", "/markets/bulk/delete"): "heavy",
+    ("POST", "/communities/bulk"): "heavy",
+    ("PATCH", "/communities/bulk"): "heavy",
+    ("POST", "/communities/bulk/delete"): "heavy",
+    ("GET", "/markets/export"): "export",
+    ("GET", "/communities/export"): "export",
+}
+
+ADMISSION_IN_FLIGHT = metrics.REGISTRY.gauge("admission_in_flight", "Requests running inside an admission gate.")
+ADMISSION_QUEUED = metrics.REGISTRY.gauge("admission_queued", "Requests waiting for an admission gate.")
+ADMISSION_REJECTED = metrics.REGISTRY.counter("admission_rejected_total", "Requests shed by admission control.")
+RATE_LIMITED = metrics.REGISTRY.counter("rate_limited_total", "Requests rejected by a token-bucket rate limit.")
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionGate:
+    """
+    동시 실행 수 limit 과 길이 queue_size 의 FIFO 대기열을 가진 게이트. 이벤트 루프 스레드에서만 사용합니다.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        # 처리 시간 이동 평균 (Retry-After 추정용)
+        self.service_time = 0.1
+
+    async def acquire(self):
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+            return
+        if len(self.waiters) >= self.queue_size:
+            raise Rejected("queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        ADMISSION_QUEUED.inc(gate=self.name)
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done() and not waiter.cancelled():
+                # 시간 초과 직전에 자리를 넘겨받았으면 다음 대기자에게 돌려줍니다
+                self.release()
+            elif waiter in self.waiters:
+                self.waiters.remove(waiter)
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            raise Rejected("timeout")
+        finally:
+            ADMISSION_QUEUED.dec(gate=self.name)
+
+    def release(self):
+        # 자리를 줄이지 않고 대기 중인 다음 요청에 바로 넘깁니다
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def observe(self, elapsed: float):
+        self.service_time = 0.8 * self.service_time + 0.2 * elapsed
+
+    def retry_after(self) -> int:
+        backlog = len(self.waiters) + self.active
+        return max(1, math.ceil(self.service_time * backlog / max(1, self.limit)))
+
+
+def create_gates() -> Dict[str, AdmissionGate]:
+    max_wait = settings.ADMISSION_MAX_WAIT_SECONDS
+    return {
+        "auth": AdmissionGate("auth", settings.AUTH_CONCURRENCY, settings.AUTH_QUEUE_SIZE, max_wait),
+        "upload": AdmissionGate("upload", settings.UPLOAD_CONCURRENCY, settings.UPLOAD_QUEUE_SIZE, max_wait),
+        "heavy": AdmissionGate("heavy", settings.HEAVY_CONCURRENCY, settings.HEAVY_QUEUE_SIZE, max_wait),
+        "export": AdmissionGate("export", settings.EXPORT_CONCURRENCY, settings.EXPORT_QUEUE_SIZE, max_wait),
+    }
+
+
+class AdmissionControlMiddleware:
+    """
+    ROUTE_CLASSES 에 등록된 라우트만 등급별 게이트를 통과시키는 ASGI 미들웨어.
+    """
+
+    def __init__(self, app, gates: Optional[Dict[str, AdmissionGate]] = None):
+        self.app = app
+        self.gates = gates or create_gates()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route_class = ROUTE_CLASSES.get((scope["method"], metrics.route_template(scope)))
+        gate = self.gates.get(route_class) if route_class else None
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await gate.acquire()
+        except Rejected as rejected:
+            ADMISSION_REJECTED.inc(gate=gate.name, reason=rejected.reason)
+            response = JSONResponse(
+                {"detail": "요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해 주세요."},
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(gate.retry_after())},
+            )
+            await response(scope, receive, send)
+            return
+
+        ADMISSION_IN_FLIGHT.inc(gate=gate.name)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.observe(time.perf_counter() - started)
+            ADMISSION_IN_FLIGHT.dec(gate=gate.name)
+            gate.release()
+
+
+class TokenBucketLimiter:
+    """
+    키(사용자/클라이언트)별 토큰 버킷. rate 는 초당 충전 토큰 수, burst 는 버킷 크기입니다.
+    오래 쓰이지 않은 키는 max_keys 를 넘으면 LRU 순서로 버립니다.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, max_keys: int = 100000):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str) -> Optional[float]:
+        """
+        토큰 하나를 쓰고 None 을, 토큰이 없으면 다음 토큰까지 기다려야 할 초를 반환합니다.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        if allowed:
+            return None
+        return (1.0 - tokens) / self.rate
+
+    def check(self, key: str):
+        wait = self.hit(key)
+        if wait is not None:
+            RATE_LIMITED.inc(limiter=self.name)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="요청이 너무 많습니다. 잠시 후 다시 시도해 주세요.",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+
+
+login_limiter = TokenBucketLimiter("login", settings.LOGIN_RATE_PER_MINUTE / 60, settings.LOGIN_BURST)
+signup_limiter = TokenBucketLimiter("signup", settings.SIGNUP_RATE_PER_MINUTE / 60, settings.SIGNUP_BURST)
+
+
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+async def login_rate_limit(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    """
+    로그인 시도를 클라이언트 IP 별, 계정(이메일) 별로 각각 제한합니다.
+    """
+    login_limiter.check(f"ip:{_client_ip(request)}")
+    login_limiter.check(f"user:{form_data.username.lower()}")
+
+
+async def signup_rate_limit(request: Request):
+    """
+    회원가입을 클라이언트 IP 별로 제한합니다.
+    """
+    signup_limiter.check(f"ip:{_client_ip(request)}")
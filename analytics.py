@@ -0,0 +1,182 @@
+# app/analytics.py
+"""
+마켓 가격 통계 (작물별 / 지역별 개수, 최소, 최대, 평균, 근사 중앙값).
+
+집계는 price_stat / price_bucket 테이블에 있고 crud.market 이 게시물을 쓸 때 같은 트랜잭션에서
+변경분만큼 갱신합니다. (crud.market._sync_prices_many) 조회 시 market 테이블을 GROUP BY 하지 않습니다.
+
+중앙값은 DDSketch 방식의 로그 버킷 히스토그램으로 근사합니다. 버킷 i 는 (γ^(i-1), γ^i] 구간이고
+γ = (1 + α) / (1 - α) 이므로 대표값의 상대 오차가 α(PRICE_SKETCH_ACCURACY) 이하입니다.
+버킷 개수만 더하고 빼므로 삭제도 정확히 반영됩니다.
+
+마이그레이션 적용 후 기존 게시물 집계를 한 번 채워야 합니다.
+
+    python -m analytics
+"""
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import char_length
+from models.market import Market, PriceBucket, PriceStat
+
+DIMENSIONS = ("crop", "location")
+
+# 0 이하 가격용 버킷
+NON_POSITIVE_BUCKET = -1
+
+# price_stat.key 컬럼 길이. 이보다 긴 작물명/지역명은 집계하지 않습니다
+KEY_MAX_LENGTH = 100
+
+_GAMMA = (1 + settings.PRICE_SKETCH_ACCURACY) / (1 - settings.PRICE_SKETCH_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+
+def bucket_of(price: int) -> int:
+    if price <= 0:
+        return NON_POSITIVE_BUCKET
+    return max(0, math.ceil(math.log(price) / _LOG_GAMMA))
+
+
+def bucket_value(bucket: int) -> float:
+    """
+    버킷의 대표값 (구간 양 끝에 대한 상대 오차가 같아지는 점).
+    """
+    if bucket == NON_POSITIVE_BUCKET:
+        return 0.0
+    return 2 * _GAMMA ** bucket / (_GAMMA + 1)
+
+
+def quantile(buckets: Dict[int, int], q: float, low: Optional[int] = None, high: Optional[int] = None) -> Optional[float]:
+    """
+    {버킷: 개수} 히스토그램에서 q 분위수를 근사합니다. 정확한 최소/최대값이 있으면 그 범위로 자릅니다.
+    """
+    total = sum(count for count in buckets.values() if count > 0)
+    if total == 0:
+        return None
+    rank = q * (total - 1)
+    seen = 0
+    for bucket in sorted(buckets):
+        count = buckets[bucket]
+        if count <= 0:
+            continue
+        seen += count
+        if seen > rank:
+            value = bucket_value(bucket)
+            if low is not None:
+                value = max(value, low)
+            if high is not None:
+                value = min(value, high)
+            return round(value, 2)
+    return None
+
+
+def price_keys(crop: Optional[str], location: Optional[str]) -> List[Tuple[str, str]]:
+    """
+    게시물 하나가 기여하는 (dimension, key) 목록.
+    """
+    return [
+        (dimension, key)
+        for dimension, key in (("crop", crop), ("location", location))
+        if key and len(key) <= KEY_MAX_LENGTH
+    ]
+
+
+def get_price_stats(db: Session, dimension: str, key: Optional[str] = None, limit: int = 50) -> List[Dict]:
+    """
+    dimension(crop / location) 별 가격 통계를 게시물 수가 많은 순으로 조회합니다. key 를 주면 그 항목만 조회합니다.
+    """
+    query = select(PriceStat).where(PriceStat.dimension == dimension, PriceStat.count > 0)
+    if key is not None:
+        query = query.where(PriceStat.key == key)
+    stats = db.scalars(query.order_by(PriceStat.count.desc(), PriceStat.key).limit(limit)).all()
+    if not stats:
+        return []
+    histograms: Dict[str, Dict[int, int]] = {stat.key: {} for stat in stats}
+    rows = db.execute(
+        select(PriceBucket.key, PriceBucket.bucket, PriceBucket.count).where(
+            PriceBucket.dimension == dimension,
+            PriceBucket.key.in_(list(histograms)),
+            PriceBucket.count > 0,
+        )
+    ).all()
+    for row in rows:
+        histograms[row.key][row.bucket] = row.count
+    return [
+        {
+            "dimension": dimension,
+            "key": stat.key,
+            "count": stat.count,
+            "min": stat.min_price,
+            "max": stat.max_price,
+            "mean": round(stat.total / stat.count, 2),
+            "median": quantile(histograms[stat.key], 0.5, stat.min_price, stat.max_price),
+        }
+        for stat in stats
+    ]
+
+
+def _rebuild_filter(db: Session, column):
+    # price_keys 와 같은 기준(글자 수)으로 집계 대상을 고릅니다
+    return (
+        column.isnot(None),
+        column != "",
+        char_length(db, column) <= KEY_MAX_LENGTH,
+        Market.price.isnot(None),
+    )
+
+
+def rebuild(db: Session) -> Dict[str, int]:
+    """
+    market 테이블 전체에서 price_stat / price_bucket 을 다시 만듭니다. (최초 1회 또는 복구용)
+    """
+    db.execute(delete(PriceBucket))
+    db.execute(delete(PriceStat))
+    stats = 0
+    for dimension in DIMENSIONS:
+        column = getattr(Market, dimension)
+        rows = db.execute(
+            select(column, func.count(), func.sum(Market.price), func.min(Market.price), func.max(Market.price))
+            .where(*_rebuild_filter(db, column))
+            .group_by(column)
+        ).all()
+        if rows:
+            db.execute(insert(PriceStat), [
+                {"dimension": dimension, "key": key, "count": count, "total": total, "min_price": low, "max_price": high}
+                for key, count, total, low, high in rows
+            ])
+        stats += len(rows)
+        buckets: Counter = Counter()
+        price_rows = db.execute(
+            select(column, Market.price, func.count())
+            .where(*_rebuild_filter(db, column))
+            .group_by(column, Market.price)
+        ).all()
+        for key, price, count in price_rows:
+            buckets[(key, bucket_of(price))] += count
+        items = [
+            {"dimension": dimension, "key": key, "bucket": bucket, "count": count}
+            for (key, bucket), count in buckets.items()
+        ]
+        for start in range(0, len(items), 10000):
+            db.execute(insert(PriceBucket), items[start:start + 10000])
+    db.commit()
+    return {"stats": stats}
+
+
+def main():
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(rebuild(db))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# app/anomaly.py
+"""
+센서 수집 경로의 실시간 이상치 탐지.
+
+- 장치 x 센서(ANOMALY_SENSORS) 마다 지수 가중 이동 평균(EWMA)과 분산만 저장합니다. 원시 기록은 남기지 않으므로
+  상태 크기는 장치 수에만 비례합니다. 상태는 장치를 행으로 하는 NumPy 배열입니다.
+- 요청 경로(statuses._store)는 값을 큐에 넣기만 하고, 백그라운드 스레드가 ANOMALY_BATCH_INTERVAL_SECONDS 마다
+  모인 읽기값 전체를 한 번의 배열 연산으로 평가합니다. 같은 장치의 읽기값이 한 배치에 여러 개면 도착 순서대로
+  여러 번에 나눠 평가합니다. 큐가 ANOMALY_QUEUE_LIMIT 를 넘으면 오래된 읽기값부터 버립니다.
+- 읽기값 x 의 z = (x - 평균) / 표준편차 가 ANOMALY_Z_THRESHOLD 를 넘으면(처음 ANOMALY_WARMUP 개 제외) 이상치입니다.
+  표준편차는 |평균| * ANOMALY_MIN_RELATIVE_STD 보다 작아지지 않게 해서, 값이 거의 변하지 않던 센서의
+  작은 흔들림은 알림으로 만들지 않습니다. 같은 센서가 정상으로 돌아오기 전까지는 다시 알리지 않습니다.
+- 알림은 subscribe() 로 등록한 콜백(탐지 스레드에서 호출)과 최근 알림 목록(recent)으로 전달됩니다.
+
+상태는 워커 프로세스마다 따로 있으므로, 워커가 여러 개면 한 장치의 읽기값이 같은 워커로 가도록 라우팅해야
+평균이 모든 읽기값을 반영합니다.
+"""
+import logging
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import metrics
+from config import settings
+
+logger = logging.getLogger("plkit.anomaly")
+
+ANOMALY_READINGS = metrics.REGISTRY.counter("anomaly_readings_total", "Sensor readings evaluated by the anomaly detector.")
+ANOMALY_DROPPED = metrics.REGISTRY.counter(
+    "anomaly_readings_dropped_total", "Sensor readings dropped because the anomaly detector queue was full."
+)
+ANOMALY_ALERTS = metrics.REGISTRY.counter("anomaly_alerts_total", "Anomaly alerts emitted, by sensor.")
+ANOMALY_BATCH = metrics.REGISTRY.histogram(
+    "anomaly_batch_readings", "Readings evaluated per anomaly detector batch.", (1, 10, 100, 1000, 10000, 100000)
+)
+
+
+@dataclass
+class Alert:
+    device_id: str
+    sensor: str
+    value: float
+    mean: float
+    std: float
+    z: float
+    timestamp: float
+
+    def to_dict(self) -> Dict:
+        # 센서 레코드의 timestamp 와 같은 ISO 형식으로 내보냅니다
+        return {**asdict(self), "timestamp": datetime.fromtimestamp(self.timestamp).isoformat()}
+
+
+def _number(value) -> float:
+    # 숫자가 아니거나 없는 값은 NaN 으로 두고 평가와 갱신에서 뺍니다
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return math.nan
+    return float(value)
+
+
+def _rounds(rows: np.ndarray) -> np.ndarray:
+    """
+    각 읽기값이 같은 장치의 몇 번째 읽기값인지(도착 순서) 반환합니다. 같은 번호끼리는 장치가 겹치지 않습니다.
+    """
+    order = np.argsort(rows, kind="stable")
+    sorted_rows = rows[order]
+    starts = np.flatnonzero(np.r_[True, sorted_rows[1:] != sorted_rows[:-1]])
+    group_start = np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+    rank = np.empty(len(rows), dtype=np.int64)
+    rank[order] = np.arange(len(rows)) - group_start
+    return rank
+
+
+class AnomalyDetector:
+    def __init__(self, sensors: List[str], alpha: float, threshold: float, warmup: int, min_relative_std: float):
+        self.sensors = list(sensors)
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.min_relative_std = min_relative_std
+        # 장치 행 x 센서 열
+        self.rows: Dict[str, int] = {}
+        self.device_ids: List[str] = []
+        width = len(self.sensors)
+        self.mean = np.zeros((0, width))
+        self.var = np.zeros((0, width))
+        self.count = np.zeros((0, width), dtype=np.int64)
+        self.active = np.zeros((0, width), dtype=bool)
+        self.recent: "deque[Alert]" = deque(maxlen=settings.ANOMALY_RECENT_ALERTS)
+        self._subscribers: List[Callable[[List[Alert]], None]] = []
+        self._queue: "deque[Tuple[str, List[float], float]]" = deque()
+        self._lock = threading.Lock()
+        self._evaluate_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, device_id: str, sensors: Dict):
+        """
+        읽기값 하나를 큐에 넣습니다. (요청 경로에서 호출, O(센서 수))
+        """
+        values = [_number(sensors.get(name)) for name in self.sensors]
+        with self._lock:
+            self._queue.append((device_id, values, time.time()))
+            overflow = len(self._queue) - settings.ANOMALY_QUEUE_LIMIT
+            for _ in range(max(0, overflow)):
+                self._queue.popleft()
+        if overflow > 0:
+            ANOMALY_DROPPED.inc(overflow)
+        self._ensure_started()
+
+    def subscribe(self, callback: Callable[[List[Alert]], None]) -> Callable[[], None]:
+        """
+        알림 콜백을 등록하고 등록 해제 함수를 반환합니다. 콜백은 탐지 스레드에서 배치마다 한 번 호출됩니다.
+        """
+        self._subscribers.append(callback)
+
+        def unsubscribe():
+            try:
+                self._subscribers.remove(callback)
+            except ValueError:
+                pass
+
+        return unsubscribe
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="anomaly-detector", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._stop.wait(settings.ANOMALY_BATCH_INTERVAL_SECONDS)
+            try:
+                self.evaluate_pending()
+            except Exception:
+                logger.exception("anomaly evaluation failed")
+
+    def stop(self):
+        """
+        남은 읽기값을 평가하고 탐지 스레드를 멈춥니다. (애플리케이션 종료 시)
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.evaluate_pending()
+
+    def _row(self, device_id: str) -> int:
+        row = self.rows.get(device_id)
+        if row is None:
+            row = len(self.device_ids)
+            if row == len(self.mean):
+                capacity = max(row * 2, 1024)
+                for name in ("mean", "var", "count", "active"):
+                    current = getattr(self, name)
+                    grown = np.zeros((capacity, current.shape[1]), dtype=current.dtype)
+                    grown[:row] = current
+                    setattr(self, name, grown)
+            self.rows[device_id] = row
+            self.device_ids.append(device_id)
+        return row
+
+    def evaluate_pending(self) -> List[Alert]:
+        with self._lock:
+            if not self._queue:
+                return []
+            batch, self._queue = list(self._queue), deque()
+        with self._evaluate_lock:
+            rows = np.fromiter((self._row(device_id) for device_id, _, _ in batch), dtype=np.int64, count=len(batch))
+            values = np.array([values for _, values, _ in batch], dtype=np.float64)
+            timestamps = np.fromiter((at for _, _, at in batch), dtype=np.float64, count=len(batch))
+            alerts = self.evaluate(rows, values, timestamps)
+        ANOMALY_READINGS.inc(len(batch))
+        ANOMALY_BATCH.observe(len(batch))
+        if alerts:
+            with self._lock:
+                self.recent.extend(alerts)
+            for alert in alerts:
+                ANOMALY_ALERTS.inc(sensor=alert.sensor)
+            for callback in list(self._subscribers):
+                try:
+                    callback(alerts)
+                except Exception:
+                    logger.exception("anomaly subscriber failed")
+        return alerts
+
+    def evaluate(self, rows: np.ndarray, values: np.ndarray, timestamps: np.ndarray) -> List[Alert]:
+        """
+        읽기값 배치(rows[i] 장치의 values[i] 센서값)를 평가하고 상태를 갱신합니다.
+        """
+        alerts: List[Alert] = []
+        rank = _rounds(rows)
+        for step in range(int(rank.max()) + 1 if len(rank) else 0):
+            pick = np.flatnonzero(rank == step)
+            r, x = rows[pick], values[pick]
+            mean, var, count = self.mean[r], self.var[r], self.count[r]
+            present = ~np.isnan(x)
+            std = np.maximum(np.sqrt(var), np.abs(mean) * self.min_relative_std + 1e-9)
+            z = np.where(present, (x - mean) / std, 0.0)
+            anomalous = present & (count >= self.warmup) & (np.abs(z) > self.threshold)
+            onset = anomalous & ~self.active[r]
+            self.active[r] = np.where(present, anomalous, self.active[r])
+
+            # EWMA 평균/분산 갱신. 첫 읽기값은 평균으로 그대로 씁니다
+            first = present & (count == 0)
+            diff = np.where(present, x - mean, 0.0)
+            increment = self.alpha * diff
+            self.mean[r] = np.where(first, x, mean + increment)
+            self.var[r] = np.where(first, 0.0, np.where(present, (1 - self.alpha) * (var + diff * increment), var))
+            self.count[r] = count + present
+
+            for i, column in zip(*np.nonzero(onset)):
+                alerts.append(Alert(
+                    device_id=self.device_ids[r[i]],
+                    sensor=self.sensors[column],
+                    value=float(x[i, column]),
+                    mean=float(mean[i, column]),
+                    std=float(std[i, column]),
+                    z=float(z[i, column]),
+                    timestamp=float(timestamps[pick[i]]),
+                ))
+        return alerts
+
+    def alerts(self, device_id: Optional[str] = None, limit: int = 100) -> List[Alert]:
+        """
+        최근 알림을 최신순으로 반환합니다.
+        """
+        with self._lock:
+            recent = list(self.recent)
+        found = []
+        for alert in reversed(recent):
+            if device_id is None or alert.device_id == device_id:
+                found.append(alert)
+                if len(found) >= limit:
+                    break
+        return found
+
+
+detector = AnomalyDetector(
+    settings.ANOMALY_SENSORS,
+    settings.ANOMALY_ALPHA,
+    settings.ANOMALY_Z_THRESHOLD,
+    settings.ANOMALY_WARMUP,
+    settings.ANOMALY_MIN_RELATIVE_STD,
+)
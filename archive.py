@@ -0,0 +1,322 @@
+# app/archive.py
+"""
+장기 센서 기록 보관소 (열 지향, 일 단위 파티션, mmap 읽기).
+
+파일 레이아웃 (SENSOR_ARCHIVE_DIR 아래)
+- <장치 id>/index.json: {"days": {"YYYYMMDD": ["센서", ...]}}. 기록이 있는 날짜와 센서의 목록입니다.
+- <장치 id>/<YYYYMMDD>/<센서>.t: 타임스탬프 열. UTC epoch 밀리초 int64 배열입니다.
+- <장치 id>/<YYYYMMDD>/<센서>.v: 값 열. float32 배열이며 i 번째 값은 .t 의 i 번째 시각의 값입니다.
+
+두 열 모두 고정 폭이라 i 번째 읽기값의 위치를 바로 계산할 수 있습니다. 조회는 파일을 mmap 해서 복사 없는
+NumPy 뷰로 읽고, 정렬된 타임스탬프 열에서 이진 탐색으로 구간을 찾으므로 한 달짜리 차트 조회도 구간 경계와
+구간 안의 페이지만 읽습니다. 행 단위 MySQL 테이블과 달리 워커 메모리에 기록을 올리지 않습니다.
+
+쓰기 경로(statuses._store)는 읽기값을 메모리 버퍼에 넣기만 하고, 백그라운드 스레드가
+SENSOR_ARCHIVE_FLUSH_SECONDS 마다(또는 버퍼가 SENSOR_ARCHIVE_BUFFER_LIMIT 에 닿으면) 파일 끝에 덧붙입니다.
+덧붙이기는 .t 파일 배타 잠금(flock) 안에서 하므로 워커가 여러 개여도 두 열의 행이 어긋나지 않습니다.
+다른 워커의 기록이 섞여 파일 안 시각 순서가 뒤바뀌면 <센서>.unsorted 표시 파일을 남기고, 그 날짜는
+이진 탐색 대신 전체를 걸러 읽습니다.
+"""
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+import metrics
+from config import settings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger("plkit.archive")
+
+ARCHIVE_READINGS = metrics.REGISTRY.counter("archive_readings_total", "Sensor values appended to the history archive.")
+ARCHIVE_DROPPED = metrics.REGISTRY.counter(
+    "archive_readings_dropped_total", "Sensor readings dropped because the history archive buffer was full."
+)
+ARCHIVE_FLUSH_SECONDS = metrics.REGISTRY.histogram(
+    "archive_flush_seconds", "Time spent appending buffered readings to the history archive."
+)
+ARCHIVE_QUERY_POINTS = metrics.REGISTRY.histogram(
+    "archive_query_points", "Archived values scanned per history query.", (100, 1000, 10000, 100000, 1000000, 10000000)
+)
+
+TIMESTAMP_DTYPE = np.dtype("<i8")
+VALUE_DTYPE = np.dtype("<f4")
+DAY_MS = 86400 * 1000
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.:-]{1,64}$")
+
+
+def _safe_name(name: str) -> bool:
+    # 장치 id 와 센서 이름은 디렉터리/파일 이름이 되므로 경로를 벗어나는 이름을 막습니다
+    return bool(NAME_PATTERN.match(name)) and name not in (".", "..")
+
+
+def _day(day_index: int) -> str:
+    return (datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(days=int(day_index))).strftime("%Y%m%d")
+
+
+def _map(path: str, dtype: np.dtype, count: int) -> np.ndarray:
+    """
+    파일 앞부분 count 개를 복사 없이 읽는 읽기 전용 배열. 매핑은 배열이 사라질 때 함께 해제됩니다.
+    """
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), count * dtype.itemsize, access=mmap.ACCESS_READ)
+    return np.frombuffer(mapped, dtype=dtype, count=count)
+
+
+def _rows(t_path: str, v_path: str) -> int:
+    # 덧붙이는 중인 파일은 두 열의 길이가 잠깐 다를 수 있으므로 짧은 쪽에 맞춥니다
+    try:
+        return min(os.path.getsize(t_path) // TIMESTAMP_DTYPE.itemsize, os.path.getsize(v_path) // VALUE_DTYPE.itemsize)
+    except FileNotFoundError:
+        return 0
+
+
+class History:
+    """
+    조회 결과. 버킷마다 시각(버킷 시작, epoch 밀리초)과 평균/최소/최대/개수이며 빈 버킷은 뺍니다.
+    """
+
+    def __init__(self, start_ms: int, bucket_ms: int, buckets: int):
+        self.start_ms = start_ms
+        self.bucket_ms = bucket_ms
+        self.total = np.zeros(buckets)
+        self.count = np.zeros(buckets, dtype=np.int64)
+        self.min = np.full(buckets, np.inf)
+        self.max = np.full(buckets, -np.inf)
+
+    def add(self, timestamps: np.ndarray, values: np.ndarray):
+        keep = ~np.isnan(values)
+        if not keep.all():
+            timestamps, values = timestamps[keep], values[keep]
+        if not len(values):
+            return
+        bucket = (timestamps - self.start_ms) // self.bucket_ms
+        if len(bucket) > 1 and not (bucket[1:] >= bucket[:-1]).all():
+            order = np.argsort(bucket, kind="stable")
+            bucket, values = bucket[order], values[order]
+        # 버킷 번호가 정렬되어 있으므로 경계마다 reduceat 으로 한 번에 집계합니다
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        index = bucket[starts]
+        values = values.astype(np.float64)
+        self.total[index] += np.add.reduceat(values, starts)
+        self.count[index] += np.diff(np.r_[starts, len(values)])
+        self.min[index] = np.minimum(self.min[index], np.minimum.reduceat(values, starts))
+        self.max[index] = np.maximum(self.max[index], np.maximum.reduceat(values, starts))
+
+    def to_dict(self) -> Dict:
+        filled = np.flatnonzero(self.count)
+        return {
+            "bucket_seconds": self.bucket_ms / 1000,
+            "t": (self.start_ms + filled * self.bucket_ms).tolist(),
+            "mean": (self.total[filled] / self.count[filled]).tolist(),
+            "min": self.min[filled].tolist(),
+            "max": self.max[filled].tolist(),
+            "count": self.count[filled].tolist(),
+        }
+
+
+class SensorArchive:
+    def __init__(self, root: str, sensors: List[str], flush_interval: float, buffer_limit: int):
+        self.root = root
+        self.sensors = [name for name in sensors if _safe_name(name)]
+        self.flush_interval = flush_interval
+        self.buffer_limit = buffer_limit
+        self._buffer: List[Tuple[str, float, List[float]]] = []
+        # 이 프로세스가 index.json 에 이미 올린 (장치, 날짜, 센서)
+        self._indexed: Set[Tuple[str, str, str]] = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, device_id: str, sensors: Dict, timestamp: Optional[float] = None):
+        """
+        읽기값 하나를 버퍼에 넣습니다. (요청 경로에서 호출, O(센서 수))
+        """
+        if not _safe_name(device_id):
+            return
+        values = []
+        for name in self.sensors:
+            value = sensors.get(name)
+            values.append(float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else math.nan)
+        with self._lock:
+            if len(self._buffer) >= self.buffer_limit * 2:
+                # 디스크가 따라오지 못하는 상황. 메모리를 무한히 쓰지 않도록 새 읽기값을 버립니다
+                dropped = True
+            else:
+                dropped = False
+                self._buffer.append((device_id, time.time() if timestamp is None else timestamp, values))
+            full = len(self._buffer) >= self.buffer_limit
+        if dropped:
+            ARCHIVE_DROPPED.inc()
+        self._ensure_started()
+        if full:
+            self._wake.set()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="archive-flush", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("archive flush failed")
+
+    def stop(self):
+        """
+        남은 읽기값을 기록하고 플러시 스레드를 멈춥니다. (애플리케이션 종료 시)
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+            if fcntl is None:
+                raise RuntimeError("센서 기록 보관소는 fcntl 을 지원하는 OS 에서만 사용할 수 있습니다.")
+            started = time.perf_counter()
+            by_device: Dict[str, List[int]] = {}
+            for i, (device_id, _, _) in enumerate(batch):
+                by_device.setdefault(device_id, []).append(i)
+            timestamps = np.fromiter(
+                (round(at * 1000) for _, at, _ in batch), dtype=TIMESTAMP_DTYPE, count=len(batch)
+            )
+            values = np.array([values for _, _, values in batch], dtype=VALUE_DTYPE).reshape(len(batch), len(self.sensors))
+            for device_id, picks in by_device.items():
+                picks = np.asarray(picks)
+                device_ts = timestamps[picks]
+                order = np.argsort(device_ts, kind="stable")
+                device_ts, device_values = device_ts[order], values[picks][order]
+                days = device_ts // DAY_MS
+                bounds = np.flatnonzero(np.r_[True, days[1:] != days[:-1], True])
+                for lo, hi in zip(bounds[:-1], bounds[1:]):
+                    day = _day(days[lo])
+                    for column, sensor in enumerate(self.sensors):
+                        column_values = device_values[lo:hi, column]
+                        present = ~np.isnan(column_values)
+                        if present.any():
+                            self._append(device_id, day, sensor, device_ts[lo:hi][present], column_values[present])
+            ARCHIVE_FLUSH_SECONDS.observe(time.perf_counter() - started)
+
+    def _append(self, device_id: str, day: str, sensor: str, timestamps: np.ndarray, values: np.ndarray):
+        directory = os.path.join(self.root, device_id, day)
+        os.makedirs(directory, exist_ok=True)
+        t_path = os.path.join(directory, f"{sensor}.t")
+        v_path = os.path.join(directory, f"{sensor}.v")
+        with open(t_path, "a+b") as t_file, open(v_path, "ab") as v_file:
+            fcntl.flock(t_file, fcntl.LOCK_EX)
+            try:
+                rows = _rows(t_path, v_path)
+                if os.fstat(t_file.fileno()).st_size != rows * TIMESTAMP_DTYPE.itemsize:
+                    t_file.truncate(rows * TIMESTAMP_DTYPE.itemsize)
+                if os.fstat(v_file.fileno()).st_size != rows * VALUE_DTYPE.itemsize:
+                    # 이전 덧붙이기가 중간에 끊겼으면 두 열의 길이를 다시 맞춥니다
+                    v_file.truncate(rows * VALUE_DTYPE.itemsize)
+                if rows:
+                    last = np.frombuffer(os.pread(t_file.fileno(), 8, (rows - 1) * 8), dtype=TIMESTAMP_DTYPE)[0]
+                    if timestamps[0] < last:
+                        open(os.path.join(directory, f"{sensor}.unsorted"), "a").close()
+                t_file.write(timestamps.astype(TIMESTAMP_DTYPE, copy=False).tobytes())
+                v_file.write(values.astype(VALUE_DTYPE, copy=False).tobytes())
+                v_file.flush()
+                t_file.flush()
+            finally:
+                fcntl.flock(t_file, fcntl.LOCK_UN)
+        ARCHIVE_READINGS.inc(len(values))
+        if (device_id, day, sensor) not in self._indexed:
+            self._index(device_id, day, sensor)
+
+    def _index(self, device_id: str, day: str, sensor: str):
+        directory = os.path.join(self.root, device_id)
+        with open(os.path.join(directory, "index.lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                index = self.index(device_id)
+                sensors = index["days"].setdefault(day, [])
+                if sensor not in sensors:
+                    sensors.append(sensor)
+                    path = os.path.join(directory, "index.json")
+                    with open(path + ".tmp", "w") as f:
+                        json.dump(index, f, sort_keys=True)
+                    os.replace(path + ".tmp", path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        self._indexed.add((device_id, day, sensor))
+
+    def index(self, device_id: str) -> Dict:
+        try:
+            with open(os.path.join(self.root, device_id, "index.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"days": {}}
+
+    def query(self, device_id: str, sensor: str, start: float, end: float, buckets: int) -> Dict:
+        """
+        [start, end) 구간(epoch 초)의 센서값을 buckets 개 구간으로 나눠 집계합니다.
+        아직 플러시되지 않은 최근 읽기값(최대 SENSOR_ARCHIVE_FLUSH_SECONDS)은 포함되지 않습니다.
+        """
+        start_ms, end_ms = int(start * 1000), int(end * 1000)
+        bucket_ms = max(1, -(-(end_ms - start_ms) // buckets))
+        history = History(start_ms, bucket_ms, buckets)
+        scanned = 0
+        if _safe_name(device_id) and _safe_name(sensor):
+            days = self.index(device_id)["days"]
+            for day_index in range(start_ms // DAY_MS, (end_ms - 1) // DAY_MS + 1):
+                day = _day(day_index)
+                if sensor not in days.get(day, ()):
+                    continue
+                scanned += self._scan(os.path.join(self.root, device_id, day), sensor, start_ms, end_ms, history)
+        ARCHIVE_QUERY_POINTS.observe(scanned)
+        return history.to_dict()
+
+    def _scan(self, directory: str, sensor: str, start_ms: int, end_ms: int, history: History) -> int:
+        t_path = os.path.join(directory, f"{sensor}.t")
+        v_path = os.path.join(directory, f"{sensor}.v")
+        rows = _rows(t_path, v_path)
+        timestamps = _map(t_path, TIMESTAMP_DTYPE, rows)
+        values = _map(v_path, VALUE_DTYPE, rows)
+        if os.path.exists(os.path.join(directory, f"{sensor}.unsorted")):
+            keep = (timestamps >= start_ms) & (timestamps < end_ms)
+            timestamps, values = timestamps[keep], values[keep]
+        else:
+            lo, hi = np.searchsorted(timestamps, [start_ms, end_ms])
+            timestamps, values = timestamps[lo:hi], values[lo:hi]
+        history.add(timestamps, values)
+        return len(values)
+
+
+store = SensorArchive(
+    settings.SENSOR_ARCHIVE_DIR,
+    settings.SENSOR_ARCHIVE_SENSORS,
+    settings.SENSOR_ARCHIVE_FLUSH_SECONDS,
+    settings.SENSOR_ARCHIVE_BUFFER_LIMIT,
+)
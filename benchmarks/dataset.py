@@ -0,0 +1,204 @@
+# app/benchmarks/dataset.py
+"""
+벤치마크용 합성 데이터 생성기.
+
+사용자 / 마켓 / 커뮤니티 게시물 / 답변을 청크 단위로 생성해 executemany 로 넣습니다.
+id 는 1..N 으로 고정되므로 부하 발생기는 범위 안에서 임의의 id 를 고를 수 있습니다.
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.dataset --users 1000000 --markets 2000000
+"""
+import argparse
+import os
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+# 모든 벤치마크 사용자의 비밀번호 (bcrypt 해시는 한 번만 계산해 재사용)
+BENCH_PASSWORD = "benchpass"
+BENCH_EMAIL_DOMAIN = "bench.plkit"
+
+CROPS = ["딸기", "상추", "토마토", "감자", "고구마", "배추", "오이", "파프리카", "블루베리", "버섯"]
+LOCATIONS = ["서울", "경기 수원", "강원 춘천", "충북 청주", "충남 논산", "전북 전주", "전남 나주", "경북 상주", "경남 진주", "제주"]
+TAGS = ["유기농", "무농약", "스마트팜", "수경재배", "산지직송", "제철", "친환경", "GAP인증", "로컬푸드", "당일수확"]
+WORDS = ["수확", "재배", "양액", "온도", "습도", "판매", "후기", "질문", "정보", "공유", "모종", "병해충", "비료", "LED"]
+
+
+def bench_email(user_id: int) -> str:
+    return f"user{user_id}@{BENCH_EMAIL_DOMAIN}"
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _chunks(total: int, size: int) -> Iterator[range]:
+    for start in range(1, total + 1, size):
+        yield range(start, min(start + size, total + 1))
+
+
+def generate_users(rng: random.Random, ids: range, password_hash: str) -> List[Dict]:
+    return [
+        {"id": i, "email": bench_email(i), "name": f"농부{i}", "avatar": None, "password": password_hash}
+        for i in ids
+    ]
+
+
+def generate_markets(rng: random.Random, ids: range, users: int) -> List[Dict]:
+    import geo
+
+    rows = []
+    for i in ids:
+        crop = rng.choice(CROPS)
+        location = rng.choice(LOCATIONS)
+        # 지역 중심에서 ±약 15km 안에 흩뿌린 좌표
+        center_lat, center_lon = geo.geocode(location)
+        latitude = center_lat + rng.uniform(-0.135, 0.135)
+        longitude = center_lon + rng.uniform(-0.17, 0.17)
+        rows.append({
+            "id": i,
+            "title": f"{crop} {_sentence(rng, 3)}",
+            "content": _sentence(rng, 30),
+            "crop": crop,
+            "price": rng.randrange(1000, 100000, 100),
+            "location": location,
+            "farm_name": f"농장{rng.randint(1, max(1, users // 10))}",
+            "cultivation_period": f"{rng.randint(1, 12)}개월",
+            "hashtags": rng.sample(TAGS, rng.randint(0, 3)),
+            "image": None,
+            "writer_id": rng.randint(1, users),
+            "latitude": latitude,
+            "longitude": longitude,
+            "geohash": geo.encode(latitude, longitude),
+        })
+    return rows
+
+
+def generate_communities(rng: random.Random, ids: range, users: int, now: datetime) -> List[Dict]:
+    return [
+        {
+            "id": i,
+            "title": _sentence(rng, 4),
+            "content": _sentence(rng, 60),
+            "image": None,
+            "writer_id": rng.randint(1, users),
+            "created_at": now - timedelta(seconds=rng.randint(0, 90 * 24 * 3600)),
+        }
+        for i in ids
+    ]
+
+
+def generate_answers(rng: random.Random, communities: List[Dict], users: int, per_community: int, next_id: int) -> List[Dict]:
+    """
+    게시물마다 0 ~ 2*per_community 개의 답변을 만들고 게시물의 answer_count 를 맞춥니다.
+    """
+    rows = []
+    for community in communities:
+        count = rng.randint(0, 2 * per_community) if per_community > 0 else 0
+        community["answer_count"] = count
+        for _ in range(count):
+            rows.append({
+                "id": next_id,
+                "community_id": community["id"],
+                "writer_id": rng.randint(1, users),
+                "content": _sentence(rng, 12),
+                "created_at": community["created_at"] + timedelta(minutes=rng.randint(1, 7 * 24 * 60)),
+            })
+            next_id += 1
+    return rows
+
+
+def seed(
+    engine,
+    users: int,
+    markets: int,
+    communities: int,
+    chunk_size: int = 10000,
+    seed_value: int = 42,
+    answers_per_community: int = 3,
+) -> Dict[str, int]:
+    """
+    테이블을 만들고 합성 데이터를 채웁니다. 기존 데이터가 있으면 모두 지웁니다.
+    """
+    from sqlalchemy import insert
+    import crud
+    from database import Base
+    from models.user import User
+    from models.market import Market, MarketTag, TagCount
+    from models.community import Community, CommunityAnswer
+    import models.trending  # noqa: F401  (content_stat 테이블 생성)
+
+    if users < 1:
+        raise ValueError("users 는 1 이상이어야 합니다.")
+    rng = random.Random(seed_value)
+    password_hash = crud.user.pwd_context.hash(BENCH_PASSWORD)
+    now = datetime.utcnow()
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    with engine.begin() as conn:
+        for ids in _chunks(users, chunk_size):
+            conn.execute(insert(User), generate_users(rng, ids, password_hash))
+
+        tag_counts: Counter = Counter()
+        for ids in _chunks(markets, chunk_size):
+            rows = generate_markets(rng, ids, users)
+            conn.execute(insert(Market), rows)
+            tag_rows = [
+                {"market_id": row["id"], "tag": tag}
+                for row in rows
+                for tag in crud.market._normalize_tags(row["hashtags"])
+            ]
+            tag_counts.update(tag_row["tag"] for tag_row in tag_rows)
+            if tag_rows:
+                conn.execute(insert(MarketTag), tag_rows)
+        if tag_counts:
+            conn.execute(insert(TagCount), [{"tag": tag, "count": count} for tag, count in tag_counts.items()])
+
+        answers = 0
+        for ids in _chunks(communities, chunk_size):
+            rows = generate_communities(rng, ids, users, now)
+            answer_rows = generate_answers(rng, rows, users, answers_per_community, answers + 1)
+            conn.execute(insert(Community), rows)
+            if answer_rows:
+                conn.execute(insert(CommunityAnswer), answer_rows)
+            answers += len(answer_rows)
+
+    # 유사 게시물 목록 전체 빌드
+    import recommendations
+    from sqlalchemy.orm import sessionmaker
+    recommendations.rebuild(sessionmaker(bind=engine))
+
+    # 작물별/지역별 가격 통계 채우기
+    import analytics
+    with sessionmaker(bind=engine)() as db:
+        analytics.rebuild(db)
+
+    return {"users": users, "markets": markets, "communities": communities, "answers": answers}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PLKIT 벤치마크용 합성 데이터 생성")
+    parser.add_argument("--db", default=os.getenv("DATABASE_URL", "sqlite:///bench.db"))
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--markets", type=int, default=5000)
+    parser.add_argument("--communities", type=int, default=5000)
+    parser.add_argument("--answers-per-community", type=int, default=3, help="게시물당 평균 답변 수")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from benchmarks.run import configure_environment
+    configure_environment(args.db)
+    import database
+
+    started = time.perf_counter()
+    counts = seed(database.engine, args.users, args.markets, args.communities, args.chunk_size, args.seed, args.answers_per_community)
+    elapsed = time.perf_counter() - started
+    print(f"seeded {counts} into {args.db} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
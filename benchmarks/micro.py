@@ -0,0 +1,67 @@
+# app/benchmarks/micro.py
+"""
+crud 계층과 보조 함수의 마이크로 벤치마크 (HTTP 없이 함수 호출만 측정).
+
+    python -m benchmarks.micro --db sqlite:///bench.db --number 200
+"""
+import argparse
+import json
+import time
+from typing import Callable, Dict
+
+
+def measure(fn: Callable[[], object], number: int) -> Dict:
+    timings = []
+    for _ in range(number):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "runs": number,
+        "mean_ms": round(sum(timings) / number, 4),
+        "p50_ms": round(timings[number // 2], 4),
+        "p95_ms": round(timings[min(number - 1, int(number * 0.95))], 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PLKIT crud 마이크로 벤치마크")
+    parser.add_argument("--db", default="sqlite:///bench.db")
+    parser.add_argument("--number", type=int, default=100)
+    args = parser.parse_args()
+
+    from benchmarks.run import configure_environment
+    configure_environment(args.db)
+    import crud
+    import database
+    from routers import auth
+    from benchmarks.dataset import BENCH_PASSWORD, TAGS
+
+    db = database.SessionLocal()
+    password_hash = crud.user.pwd_context.hash(BENCH_PASSWORD)
+    token = auth.create_access_token({"sub": "user1@bench.plkit"})
+    cases = {
+        "crud.market._normalize_tags": (lambda: crud.market._normalize_tags(["#유기농", " 딸기 ", "#유기농"] * 3), 1),
+        "crud.market.get_market": (lambda: crud.market.get_market(db, 1), 1),
+        "crud.market.list_markets(tag any)": (lambda: crud.market.list_markets(db, tags=TAGS[:2]), 0.1),
+        "crud.market.list_markets(tag all)": (lambda: crud.market.list_markets(db, tags=TAGS[:2], match="all"), 0.1),
+        "crud.market.list_popular_tags": (lambda: crud.market.list_popular_tags(db), 1),
+        "crud.community.get_community": (lambda: crud.community.get_community(db, 1), 1),
+        "crud.user.get_user_by_email": (lambda: crud.user.get_user_by_email(db, "user1@bench.plkit"), 1),
+        "auth.create_access_token": (lambda: auth.create_access_token({"sub": "user1@bench.plkit"}), 1),
+        "jwt.decode": (lambda: auth.jwt.decode(token, auth.settings.SECRET_KEY, algorithms=[auth.settings.ALGORITHM]), 1),
+        "crud.user.verify_password": (lambda: crud.user.verify_password(BENCH_PASSWORD, password_hash), 0.05),
+    }
+    results = {}
+    try:
+        for name, (fn, weight) in cases.items():
+            results[name] = measure(fn, max(1, int(args.number * weight)))
+            db.rollback()
+    finally:
+        db.close()
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+# app/benchmarks/run.py
+"""
+API 부하 벤치마크.
+
+main.app 을 같은 프로세스의 uvicorn 스레드로 띄우고(기본: 로컬 SQLite), 라우트마다 설정한
+동시성으로 요청을 보낸 뒤 처리량과 p50/p95/p99 지연, 요청당 SQL 문장 수를 JSON 으로 출력합니다.
+라우트를 하나씩 순서대로 측정하므로 요청당 SQL 문장 수로 N+1 회귀를 바로 확인할 수 있습니다.
+
+    python -m benchmarks.run --seed --users 10000 --markets 50000 --communities 50000 \\
+        --concurrency 32 --requests 500 --output bench.json
+    python -m benchmarks.run --baseline bench.json   # p95/쿼리 수 회귀 시 종료 코드 1
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+def configure_environment(database_url: str):
+    """
+    config 를 처음 import 하기 전에 호출해야 합니다. 벤치마크 DB 와 필수 설정값을 환경 변수로 지정합니다.
+    """
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("PROFILING_TOKEN", "benchmark-profile")
+    os.environ.setdefault("DEVICE_TOKEN", "benchmark-device")
+    # 모든 요청이 한 IP 에서 오므로 인증 rate limit 은 사실상 끄고 처리량을 측정합니다
+    for name in ("LOGIN_RATE_PER_MINUTE", "LOGIN_BURST", "SIGNUP_RATE_PER_MINUTE", "SIGNUP_BURST"):
+        os.environ.setdefault(name, "1000000")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank 방식
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int, statements: Optional[int]) -> Dict:
+    ordered = sorted(latencies)
+    count = len(ordered)
+    summary = {
+        "requests": count,
+        "errors": errors,
+        "throughput_rps": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(ordered) / count, 3) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3) if count else 0.0,
+    }
+    if statements is not None:
+        summary["queries_per_request"] = round(statements / count, 2) if count else 0.0
+    return summary
+
+
+def route_keys(app) -> List[str]:
+    from fastapi.routing import APIRoute
+    from starlette.routing import WebSocketRoute
+
+    keys = []
+    for route in app.routes:
+        # 문서(/openapi.json, /docs, /redoc)처럼 스키마에서 뺀 라우트는 벤치마크 대상이 아닙니다
+        if isinstance(route, APIRoute) and route.include_in_schema:
+            keys.extend(f"{method} {route.path}" for method in sorted(route.methods) if method != "HEAD")
+        elif isinstance(route, WebSocketRoute):
+            keys.append(f"WS {route.path}")
+    return keys
+
+
+class StatementCounter:
+    """
+    database.engine 에서 실행되는 SQL 문장 수를 셉니다 (서버가 같은 프로세스일 때만 사용).
+    """
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+    def reset(self) -> int:
+        with self._lock:
+            count, self.count = self.count, 0
+        return count
+
+
+class InProcessServer:
+    def __init__(self, app):
+        import uvicorn
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", ws_max_size=64 * 1024 * 1024)
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+async def _run_http(ctx, scenario, total: int, concurrency: int):
+    latencies, errors = [], 0
+    next_index = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for index in next_index:
+            started = time.perf_counter()
+            try:
+                code = await scenario.call(ctx, index)
+            except Exception:
+                code = 599
+            latencies.append((time.perf_counter() - started) * 1000)
+            if code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(min(concurrency, total))])
+    return latencies, errors, time.perf_counter() - started
+
+
+async def run_benchmark(args, base_url: str, counter: Optional[StatementCounter], app_keys: List[str]) -> Dict:
+    import httpx
+    from benchmarks.dataset import BENCH_PASSWORD, bench_email
+    from benchmarks.scenarios import SCENARIOS, BenchContext
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        ctx = BenchContext(client=client, base_url=base_url, users=args.users, markets=args.markets, communities=args.communities)
+        token = await client.post("/auth/token", data={"username": bench_email(ctx.user_id), "password": BENCH_PASSWORD})
+        token.raise_for_status()
+        ctx.headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+
+        selected = [key for key in SCENARIOS if not args.routes or any(part in key for part in args.routes)]
+        results = {}
+        for key in selected:
+            scenario = SCENARIOS[key]
+            total = max(1, int(args.requests * scenario.weight))
+            if scenario.setup:
+                await scenario.setup(ctx, total)
+            if counter:
+                counter.reset()
+            if scenario.custom:
+                started = time.perf_counter()
+                latencies = await scenario.custom(ctx, total, args.concurrency)
+                errors, elapsed = 0, time.perf_counter() - started
+            else:
+                latencies, errors, elapsed = await _run_http(ctx, scenario, total, args.concurrency)
+            statements = counter.reset() if counter else None
+            results[key] = summarize(latencies, elapsed, errors, statements)
+            print(f"{key:45s} {results[key]['throughput_rps']:>9.1f} rps  p95 {results[key]['p95_ms']:>8.2f} ms", file=sys.stderr)
+
+    covered = set()
+    for scenario in SCENARIOS.values():
+        covered.add(scenario.key)
+        covered.update(scenario.covers)
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "database": os.environ.get("DATABASE_URL"),
+            "base_url": base_url,
+            "users": args.users,
+            "markets": args.markets,
+            "communities": args.communities,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+        },
+        "routes": results,
+        "uncovered": [key for key in app_keys if key not in covered],
+    }
+
+
+def compare(report: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    p95 지연이 threshold 비율 이상 늘었거나 요청당 SQL 문장 수가 늘어난 라우트를 반환합니다.
+    """
+    regressions = []
+    for key, current in report["routes"].items():
+        previous = baseline.get("routes", {}).get(key)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(f"{key}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if "queries_per_request" in current and "queries_per_request" in previous:
+            if current["queries_per_request"] > previous["queries_per_request"] + 0.5:
+                regressions.append(
+                    f"{key}: queries/request {previous['queries_per_request']} -> {current['queries_per_request']}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PLKIT API 부하 벤치마크")
+    parser.add_argument("--db", default="sqlite:///bench.db", help="인프로세스 서버가 사용할 DB URL")
+    parser.add_argument("--url", help="이미 떠 있는 서버를 측정 (이 경우 SQL 문장 수는 집계하지 않음)")
+    parser.add_argument("--seed", action="store_true", help="측정 전에 합성 데이터를 새로 생성")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--markets", type=int, default=5000)
+    parser.add_argument("--communities", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="라우트별 기본 요청 수 (시나리오 weight 로 조정)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--routes", nargs="*", help="키에 이 문자열이 포함된 시나리오만 실행")
+    parser.add_argument("--output", help="JSON 결과 파일 (기본: 표준 출력)")
+    parser.add_argument("--baseline", help="이전 결과 JSON 과 비교해 회귀가 있으면 종료 코드 1")
+    parser.add_argument("--threshold", type=float, default=0.25, help="허용하는 p95 증가 비율")
+    parser.add_argument("--strict", action="store_true", help="시나리오가 없는 라우트가 있으면 실패")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    configure_environment(args.db)
+    import database
+    import main as app_module
+    from benchmarks.dataset import seed
+
+    if args.seed:
+        seed(database.engine, args.users, args.markets, args.communities)
+    app_keys = route_keys(app_module.app)
+
+    if args.url:
+        report = asyncio.run(run_benchmark(args, args.url.rstrip("/"), None, app_keys))
+    else:
+        counter = StatementCounter(database.engine)
+        with InProcessServer(app_module.app) as server:
+            report = asyncio.run(run_benchmark(args, server.url, counter, app_keys))
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    failed = False
+    if report["uncovered"]:
+        print(f"routes without a scenario: {report['uncovered']}", file=sys.stderr)
+        failed = args.strict
+    if baseline is not None:
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        failed = failed or bool(regressions)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,687 @@
+# app/benchmarks/scenarios.py
+"""
+라우트별 부하 시나리오.
+
+키는 `"<METHOD> <경로 템플릿>"` 형식으로 main.app 의 라우트와 1:1 대응합니다.
+run.py 는 app.routes 와 이 표를 비교해 시나리오가 없는 라우트를 보고합니다.
+새 라우트를 추가하면 여기에도 시나리오를 추가해 주세요.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.dataset import BENCH_EMAIL_DOMAIN, BENCH_PASSWORD, CROPS, LOCATIONS, TAGS, bench_email
+
+# 업로드/다운로드용 작은 PNG (1x1)
+TINY_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000100e221bc330000000049454e44ae426082"
+)
+
+
+@dataclass
+class BenchContext:
+    client: httpx.AsyncClient
+    base_url: str
+    users: int
+    markets: int
+    communities: int
+    rng: random.Random = field(default_factory=lambda: random.Random(7))
+    headers: Dict[str, str] = field(default_factory=dict)
+    user_id: int = 1
+    # 시나리오별 준비 데이터 (소유한 게시물 id 등)
+    pools: Dict[str, List[int]] = field(default_factory=dict)
+
+    def pop(self, pool: str) -> int:
+        return self.pools[pool].pop()
+
+    def pick(self, pool: str) -> int:
+        return self.rng.choice(self.pools[pool])
+
+
+Call = Callable[[BenchContext, int], Awaitable[int]]
+Setup = Callable[[BenchContext, int], Awaitable[None]]
+
+
+@dataclass
+class Scenario:
+    key: str
+    call: Call
+    setup: Optional[Setup] = None
+    # 기본 요청 수에 곱하는 비율 (bcrypt 처럼 비싼 라우트는 줄입니다)
+    weight: float = 1.0
+    # 함께 커버하는 다른 라우트 키 (WebSocket 송수신 쌍 등)
+    covers: Tuple[str, ...] = ()
+    # 요청 단위 대신 직접 지연 시간을 재는 시나리오 (WebSocket)
+    custom: Optional[Callable[[BenchContext, int, int], Awaitable[List[float]]]] = None
+
+
+SCENARIOS: Dict[str, Scenario] = {}
+
+
+def scenario(key: str, setup: Optional[Setup] = None, weight: float = 1.0, covers: Tuple[str, ...] = ()):
+    def register(fn: Call) -> Call:
+        SCENARIOS[key] = Scenario(key, fn, setup, weight, covers)
+        return fn
+    return register
+
+
+def _market_payload(ctx: BenchContext) -> dict:
+    return {
+        "title": f"{ctx.rng.choice(CROPS)} 판매",
+        "content": "벤치마크 게시물",
+        "crop": ctx.rng.choice(CROPS),
+        "price": ctx.rng.randrange(1000, 50000, 100),
+        "location": ctx.rng.choice(LOCATIONS),
+        "farm_name": "벤치농장",
+        "cultivation_period": "3개월",
+        "hashtags": ctx.rng.sample(TAGS, 2),
+    }
+
+
+async def _own_markets(ctx: BenchContext, pool: str, n: int):
+    ids = ctx.pools.setdefault(pool, [])
+    for start in range(0, n, 500):
+        items = [_market_payload(ctx) for _ in range(min(500, n - start))]
+        r = await ctx.client.post("/markets/bulk", json={"items": items}, headers=ctx.headers)
+        r.raise_for_status()
+        ids.extend(item["id"] for item in r.json())
+
+
+async def _own_communities(ctx: BenchContext, pool: str, n: int):
+    ids = ctx.pools.setdefault(pool, [])
+    for start in range(0, n, 500):
+        items = [{"title": "벤치 글", "content": "내용"} for _ in range(min(500, n - start))]
+        r = await ctx.client.post("/communities/bulk", json={"items": items}, headers=ctx.headers)
+        r.raise_for_status()
+        ids.extend(item["id"] for item in r.json())
+
+
+async def _own_links(ctx: BenchContext, pool: str, n: int):
+    ids = ctx.pools.setdefault(pool, [])
+    for _ in range(n):
+        r = await ctx.client.post("/users/link", json={"url": "https://plkit.example"}, headers=ctx.headers)
+        r.raise_for_status()
+        ids.append(r.json()["id"])
+
+
+def _image_file() -> dict:
+    return {"file": ("bench.png", TINY_PNG, "image/png")}
+
+
+# --- root / dummy -------------------------------------------------------------
+
+@scenario("GET /")
+async def get_root(ctx, i):
+    return (await ctx.client.get("/")).status_code
+
+
+@scenario("GET /metrics")
+async def get_metrics(ctx, i):
+    return (await ctx.client.get("/metrics")).status_code
+
+
+def _dummy(name: str):
+    async def call(ctx, i):
+        return (await ctx.client.get(f"/dummy/status/{name}")).status_code
+    scenario(f"GET /dummy/status/{name}")(call)
+
+
+for _name in ("temp_hum", "water_level", "illumination", "tds", "liquid_temp", "prediction"):
+    _dummy(_name)
+
+
+# --- statuses -----------------------------------------------------------------
+
+def _sensor_payload(ctx: BenchContext) -> dict:
+    return {
+        "sensors": {
+            "temperature": round(ctx.rng.gauss(24, 2), 2),
+            "tds": round(ctx.rng.gauss(720, 30), 1),
+            "water_level": round(ctx.rng.uniform(40, 70), 1),
+            "liquid_temperature": round(ctx.rng.gauss(20, 1), 2),
+        },
+        "controls": {"pump": ctx.rng.random() > 0.5, "led": ctx.rng.random() > 0.5},
+    }
+
+
+async def _post_sensor_once(ctx, n):
+    await ctx.client.post("/statuses/data", json=_sensor_payload(ctx))
+
+
+@scenario("GET /statuses/data", setup=_post_sensor_once)
+async def get_sensor_data(ctx, i):
+    return (await ctx.client.get("/statuses/data")).status_code
+
+
+@scenario("POST /statuses/data")
+async def post_sensor_data(ctx, i):
+    return (await ctx.client.post("/statuses/data", json=_sensor_payload(ctx))).status_code
+
+
+BENCH_DEVICES = 200
+
+
+def _device_id(i: int) -> str:
+    return f"bench-farm-{i % BENCH_DEVICES}"
+
+
+async def _post_devices(ctx, n):
+    for i in range(BENCH_DEVICES):
+        (await ctx.client.post(f"/statuses/{_device_id(i)}/data", json=_sensor_payload(ctx))).raise_for_status()
+
+
+@scenario("POST /statuses/{device_id}/data")
+async def post_device_data(ctx, i):
+    return (await ctx.client.post(f"/statuses/{_device_id(i)}/data", json=_sensor_payload(ctx))).status_code
+
+
+@scenario("GET /statuses/{device_id}/data", setup=_post_devices)
+async def get_device_data(ctx, i):
+    return (await ctx.client.get(f"/statuses/{_device_id(i)}/data")).status_code
+
+
+@scenario("GET /statuses/{device_id}/history", setup=_post_devices)
+async def get_device_history(ctx, i):
+    # 보관소 플러시 전이면 빈 구간을 집계하므로, 오래 돌리면 읽기 경로 전체를 잽니다
+    params = {"sensor": "temperature", "points": 500}
+    return (await ctx.client.get(f"/statuses/{_device_id(i)}/history", params=params)).status_code
+
+
+@scenario("GET /statuses/latest", setup=_post_devices)
+async def get_latest_devices(ctx, i):
+    ids = ",".join(_device_id(i + k) for k in range(50))
+    return (await ctx.client.get("/statuses/latest", params={"ids": ids})).status_code
+
+
+@scenario("GET /statuses/alerts")
+async def list_alerts(ctx, i):
+    return (await ctx.client.get("/statuses/alerts", params={"limit": 100})).status_code
+
+
+@scenario("GET /statuses/devices")
+async def list_devices(ctx, i):
+    return (await ctx.client.get("/statuses/devices", headers=ctx.headers)).status_code
+
+
+# --- auth ---------------------------------------------------------------------
+
+@scenario("POST /auth/token", weight=0.1)
+async def login(ctx, i):
+    email = bench_email(ctx.rng.randint(1, ctx.users))
+    r = await ctx.client.post("/auth/token", data={"username": email, "password": BENCH_PASSWORD})
+    return r.status_code
+
+
+@scenario("POST /auth/signup", weight=0.1)
+async def signup(ctx, i):
+    email = f"signup-{uuid.uuid4().hex}@{BENCH_EMAIL_DOMAIN}"
+    r = await ctx.client.post("/auth/signup", json={"email": email, "name": "신규", "password": BENCH_PASSWORD})
+    return r.status_code
+
+
+# --- users --------------------------------------------------------------------
+
+@scenario("GET /users/me")
+async def users_me(ctx, i):
+    return (await ctx.client.get("/users/me", headers=ctx.headers)).status_code
+
+
+@scenario("PATCH /users/me/name")
+async def users_me_name(ctx, i):
+    r = await ctx.client.patch("/users/me/name", params={"name": f"벤치{i}"}, headers=ctx.headers)
+    return r.status_code
+
+
+@scenario("PATCH /users/me/avatar", weight=0.25)
+async def users_me_avatar(ctx, i):
+    files = {"avatar": ("avatar.png", TINY_PNG, "image/png")}
+    return (await ctx.client.patch("/users/me/avatar", files=files, headers=ctx.headers)).status_code
+
+
+async def _ensure_avatar(ctx, n):
+    files = {"avatar": ("avatar.png", TINY_PNG, "image/png")}
+    (await ctx.client.patch("/users/me/avatar", files=files, headers=ctx.headers)).raise_for_status()
+
+
+@scenario("GET /users/me/avatar", setup=_ensure_avatar)
+async def users_me_avatar_get(ctx, i):
+    return (await ctx.client.get("/users/me/avatar", headers=ctx.headers)).status_code
+
+
+@scenario("GET /users/{id}/avatar", setup=_ensure_avatar)
+async def users_avatar_by_id(ctx, i):
+    return (await ctx.client.get(f"/users/{ctx.user_id}/avatar")).status_code
+
+
+@scenario("GET /users/{id}/name")
+async def users_name_by_id(ctx, i):
+    return (await ctx.client.get(f"/users/{ctx.rng.randint(1, ctx.users)}/name")).status_code
+
+
+@scenario("GET /users/batch")
+async def users_batch(ctx, i):
+    ids = ",".join(str(ctx.rng.randint(1, ctx.users)) for _ in range(20))
+    return (await ctx.client.get("/users/batch", params={"ids": ids})).status_code
+
+
+@scenario("POST /users/link")
+async def users_link_add(ctx, i):
+    r = await ctx.client.post("/users/link", json={"url": f"https://plkit.example/{i}"}, headers=ctx.headers)
+    return r.status_code
+
+
+@scenario("GET /users/me/links", setup=lambda ctx, n: _own_links(ctx, "links", 5))
+async def users_links(ctx, i):
+    return (await ctx.client.get("/users/me/links", headers=ctx.headers)).status_code
+
+
+@scenario("PATCH /users/link/{link_id}", setup=lambda ctx, n: _own_links(ctx, "links", 5))
+async def users_link_update(ctx, i):
+    r = await ctx.client.patch(
+        f"/users/link/{ctx.pick('links')}", json={"url": f"https://plkit.example/u{i}"}, headers=ctx.headers
+    )
+    return r.status_code
+
+
+@scenario("DELETE /users/link/{link_id}", setup=lambda ctx, n: _own_links(ctx, "links_delete", n))
+async def users_link_delete(ctx, i):
+    return (await ctx.client.delete(f"/users/link/{ctx.pop('links_delete')}", headers=ctx.headers)).status_code
+
+
+# --- communities --------------------------------------------------------------
+
+@scenario("POST /communities/")
+async def community_create(ctx, i):
+    r = await ctx.client.post(
+        "/communities/", json={"title": "벤치 글", "content": "내용", "writer_id": 0}, headers=ctx.headers
+    )
+    return r.status_code
+
+
+@scenario("POST /communities/bulk", weight=0.1)
+async def community_bulk_create(ctx, i):
+    items = [{"title": "벤치 글", "content": "내용"} for _ in range(100)]
+    return (await ctx.client.post("/communities/bulk", json={"items": items}, headers=ctx.headers)).status_code
+
+
+@scenario("PATCH /communities/bulk", setup=lambda ctx, n: _own_communities(ctx, "communities", 200), weight=0.1)
+async def community_bulk_update(ctx, i):
+    items = [{"id": cid, "title": f"수정 {i}"} for cid in ctx.rng.sample(ctx.pools["communities"], 100)]
+    return (await ctx.client.patch("/communities/bulk", json={"items": items}, headers=ctx.headers)).status_code
+
+
+@scenario("POST /communities/bulk/delete", setup=lambda ctx, n: _own_communities(ctx, "communities_bulk_delete", n * 10), weight=0.1)
+async def community_bulk_delete(ctx, i):
+    ids = [ctx.pop("communities_bulk_delete") for _ in range(10)]
+    return (await ctx.client.post("/communities/bulk/delete", json={"ids": ids}, headers=ctx.headers)).status_code
+
+
+@scenario("GET /communities/{community_id}")
+async def community_get(ctx, i):
+    return (await ctx.client.get(f"/communities/{ctx.rng.randint(1, ctx.communities)}")).status_code
+
+
+@scenario("PATCH /communities/{community_id}", setup=lambda ctx, n: _own_communities(ctx, "communities", 200))
+async def community_update(ctx, i):
+    r = await ctx.client.patch(
+        f"/communities/{ctx.pick('communities')}", json={"title": f"수정 {i}"}, headers=ctx.headers
+    )
+    return r.status_code
+
+
+@scenario("DELETE /communities/{community_id}", setup=lambda ctx, n: _own_communities(ctx, "communities_delete", n))
+async def community_delete(ctx, i):
+    return (await ctx.client.delete(f"/communities/{ctx.pop('communities_delete')}", headers=ctx.headers)).status_code
+
+
+@scenario("GET /communities/", weight=0.1)
+async def community_list(ctx, i):
+    return (await ctx.client.get("/communities/", params={"keyword": ctx.rng.choice(["수확", "양액", ""])})).status_code
+
+
+@scenario("GET /communities/trending")
+async def community_trending(ctx, i):
+    return (await ctx.client.get("/communities/trending", params={"limit": 20})).status_code
+
+
+@scenario("GET /communities/feed")
+async def community_feed(ctx, i):
+    params = {"limit": 20}
+    if i % 2:
+        params["writer_id"] = ctx.rng.randint(1, ctx.users)
+    r = await ctx.client.get("/communities/feed", params=params)
+    cursor = r.json().get("next_cursor") if r.status_code == 200 else None
+    if cursor:
+        params["cursor"] = cursor
+        r = await ctx.client.get("/communities/feed", params=params)
+    return r.status_code
+
+
+@scenario("GET /communities/{community_id}/answers")
+async def community_answers(ctx, i):
+    r = await ctx.client.get(f"/communities/{ctx.rng.randint(1, ctx.communities)}/answers", params={"limit": 20})
+    return r.status_code
+
+
+@scenario("POST /communities/{community_id}/answers")
+async def community_answer_create(ctx, i):
+    r = await ctx.client.post(
+        f"/communities/{ctx.rng.randint(1, ctx.communities)}/answers", json={"content": f"벤치 답변 {i}"}, headers=ctx.headers
+    )
+    return r.status_code
+
+
+async def _own_answers(ctx, n):
+    await _own_communities(ctx, "communities_answers", 1)
+    cid = ctx.pools["communities_answers"][0]
+    ids = ctx.pools.setdefault("answers", [])
+    for _ in range(n):
+        r = await ctx.client.post(f"/communities/{cid}/answers", json={"content": "삭제용 답변"}, headers=ctx.headers)
+        r.raise_for_status()
+        ids.append(r.json()["id"])
+
+
+@scenario("DELETE /communities/{community_id}/answers/{answer_id}", setup=_own_answers)
+async def community_answer_delete(ctx, i):
+    cid = ctx.pools["communities_answers"][0]
+    return (await ctx.client.delete(f"/communities/{cid}/answers/{ctx.pop('answers')}", headers=ctx.headers)).status_code
+
+
+@scenario("POST /communities/{community_id}/image", setup=lambda ctx, n: _own_communities(ctx, "communities", 200), weight=0.25)
+async def community_image_upload(ctx, i):
+    r = await ctx.client.post(f"/communities/{ctx.pick('communities')}/image", files=_image_file(), headers=ctx.headers)
+    return r.status_code
+
+
+async def _community_with_image(ctx, n):
+    await _own_communities(ctx, "communities_image", 1)
+    cid = ctx.pools["communities_image"][0]
+    (await ctx.client.post(f"/communities/{cid}/image", files=_image_file(), headers=ctx.headers)).raise_for_status()
+
+
+@scenario("GET /communities/{community_id}/image", setup=_community_with_image)
+async def community_image_get(ctx, i):
+    return (await ctx.client.get(f"/communities/{ctx.pools['communities_image'][0]}/image")).status_code
+
+
+# --- markets ------------------------------------------------------------------
+
+@scenario("POST /markets/")
+async def market_create(ctx, i):
+    return (await ctx.client.post("/markets/", json=_market_payload(ctx), headers=ctx.headers)).status_code
+
+
+@scenario("POST /markets/bulk", weight=0.05)
+async def market_bulk_create(ctx, i):
+    items = [_market_payload(ctx) for _ in range(500)]
+    return (await ctx.client.post("/markets/bulk", json={"items": items}, headers=ctx.headers)).status_code
+
+
+@scenario("PATCH /markets/bulk", setup=lambda ctx, n: _own_markets(ctx, "markets", 200), weight=0.1)
+async def market_bulk_update(ctx, i):
+    items = [{"id": mid, "price": 1000 + i} for mid in ctx.rng.sample(ctx.pools["markets"], 100)]
+    return (await ctx.client.patch("/markets/bulk", json={"items": items}, headers=ctx.headers)).status_code
+
+
+@scenario("POST /markets/bulk/delete", setup=lambda ctx, n: _own_markets(ctx, "markets_bulk_delete", n * 10), weight=0.1)
+async def market_bulk_delete(ctx, i):
+    ids = [ctx.pop("markets_bulk_delete") for _ in range(10)]
+    return (await ctx.client.post("/markets/bulk/delete", json={"ids": ids}, headers=ctx.headers)).status_code
+
+
+@scenario("PATCH /markets/{market_id}", setup=lambda ctx, n: _own_markets(ctx, "markets", 200))
+async def market_update(ctx, i):
+    r = await ctx.client.patch(f"/markets/{ctx.pick('markets')}", json={"price": 1000 + i}, headers=ctx.headers)
+    return r.status_code
+
+
+@scenario("GET /markets/trending")
+async def market_trending(ctx, i):
+    return (await ctx.client.get("/markets/trending", params={"limit": 20})).status_code
+
+
+@scenario("GET /markets/{market_id}/similar")
+async def market_similar(ctx, i):
+    return (await ctx.client.get(f"/markets/{ctx.rng.randint(1, ctx.markets)}/similar", params={"limit": 10})).status_code
+
+
+@scenario("GET /markets/analytics/prices")
+async def market_price_stats(ctx, i):
+    by = "crop" if i % 2 else "location"
+    return (await ctx.client.get("/markets/analytics/prices", params={"by": by})).status_code
+
+
+@scenario("GET /markets/nearby")
+async def market_nearby(ctx, i):
+    import geo
+
+    latitude, longitude = geo.geocode(ctx.rng.choice(LOCATIONS))
+    params = {"lat": latitude, "lon": longitude, "radius": 5, "limit": 20}
+    return (await ctx.client.get("/markets/nearby", params=params)).status_code
+
+
+@scenario("GET /markets/export")
+async def market_export(ctx, i):
+    # 전체 덤프는 데이터 크기에 비례하므로 첫 배치가 도착할 때까지(time to first byte)만 잽니다
+    params = {"format": "csv" if i % 2 else "ndjson", "gzip": "true" if i % 4 < 2 else "false"}
+    async with ctx.client.stream("GET", "/markets/export", params=params) as r:
+        async for _ in r.aiter_raw():
+            break
+    return r.status_code
+
+
+@scenario("GET /communities/export")
+async def community_export(ctx, i):
+    # market_export 와 같이 첫 배치까지만 잽니다 (작성자 이름 JOIN 포함)
+    params = {"format": "csv" if i % 2 else "ndjson", "gzip": "true" if i % 4 < 2 else "false"}
+    async with ctx.client.stream("GET", "/communities/export", params=params) as r:
+        async for _ in r.aiter_raw():
+            break
+    return r.status_code
+
+
+@scenario("GET /markets/{market_id}")
+async def market_get(ctx, i):
+    return (await ctx.client.get(f"/markets/{ctx.rng.randint(1, ctx.markets)}")).status_code
+
+
+@scenario("DELETE /markets/{market_id}", setup=lambda ctx, n: _own_markets(ctx, "markets_delete", n))
+async def market_delete(ctx, i):
+    return (await ctx.client.delete(f"/markets/{ctx.pop('markets_delete')}", headers=ctx.headers)).status_code
+
+
+@scenario("GET /markets/", weight=0.1)
+async def market_list(ctx, i):
+    params = {"tag": ctx.rng.sample(TAGS, 2), "match": ctx.rng.choice(["any", "all"])}
+    return (await ctx.client.get("/markets/", params=params)).status_code
+
+
+@scenario("GET /markets/tags/popular")
+async def market_popular_tags(ctx, i):
+    return (await ctx.client.get("/markets/tags/popular")).status_code
+
+
+@scenario("POST /markets/{market_id}/image", setup=lambda ctx, n: _own_markets(ctx, "markets", 200), weight=0.25)
+async def market_image_upload(ctx, i):
+    r = await ctx.client.post(f"/markets/{ctx.pick('markets')}/image", files=_image_file(), headers=ctx.headers)
+    return r.status_code
+
+
+async def _market_with_image(ctx, n):
+    await _own_markets(ctx, "markets_image", 1)
+    mid = ctx.pools["markets_image"][0]
+    (await ctx.client.post(f"/markets/{mid}/image", files=_image_file(), headers=ctx.headers)).raise_for_status()
+
+
+@scenario("GET /markets/{market_id}/image", setup=_market_with_image)
+async def market_image_get(ctx, i):
+    return (await ctx.client.get(f"/markets/{ctx.pools['markets_image'][0]}/image")).status_code
+
+
+@scenario("GET /markets/{market_id}/image?size=thumb", setup=_market_with_image)
+async def market_image_thumb(ctx, i):
+    url = f"/markets/{ctx.pools['markets_image'][0]}/image"
+    return (await ctx.client.get(url, params={"size": "thumb"}, headers={"Accept": "image/webp"})).status_code
+
+
+# --- profiles -----------------------------------------------------------------
+
+def _profile_headers() -> dict:
+    return {"X-Profile": os.environ.get("PROFILING_TOKEN", "")}
+
+
+async def _capture_profile(ctx, n):
+    r = await ctx.client.get("/markets/tags/popular", headers=_profile_headers())
+    ctx.pools["profiles"] = [r.headers["x-profile-id"]]
+
+
+@scenario("GET /profiles/", setup=_capture_profile)
+async def profiles_list(ctx, i):
+    return (await ctx.client.get("/profiles/", headers=_profile_headers())).status_code
+
+
+@scenario("GET /profiles/{profile_id}", setup=_capture_profile)
+async def profiles_get(ctx, i):
+    r = await ctx.client.get(f"/profiles/{ctx.pools['profiles'][0]}", headers=_profile_headers())
+    return r.status_code
+
+
+# --- WebSocket ----------------------------------------------------------------
+
+VIDEO_VIEWERS = 8
+VIDEO_FRAME_BYTES = 32 * 1024
+
+
+async def video_broadcast(ctx: BenchContext, frames: int, concurrency: int) -> List[float]:
+    """
+    /ws/video_feed 로 프레임을 보내고 /ws/video 시청자 전원이 받을 때까지의 지연(ms)을 잽니다.
+    """
+    import websockets
+
+    ws_base = ctx.base_url.replace("http", "ws", 1)
+    viewers = [await websockets.connect(f"{ws_base}/ws/video", max_size=None) for _ in range(VIDEO_VIEWERS)]
+    feed = await websockets.connect(f"{ws_base}/ws/video_feed", max_size=None)
+
+    async def drain_feed():
+        # 피드 소켓도 브로드캐스트 대상이므로 읽어서 버리지 않으면 송신이 막힙니다
+        try:
+            async for _ in feed:
+                pass
+        except websockets.ConnectionClosed:
+            pass
+
+    drainer = asyncio.create_task(drain_feed())
+    latencies = []
+    frame = bytes(VIDEO_FRAME_BYTES)
+    try:
+        for _ in range(frames):
+            started = time.perf_counter()
+            await feed.send(frame)
+            await asyncio.gather(*[viewer.recv() for viewer in viewers])
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        for viewer in viewers:
+            await viewer.close()
+        await feed.close()
+        drainer.cancel()
+    return latencies
+
+
+SCENARIOS["WS /ws/video_feed"] = Scenario(
+    "WS /ws/video_feed", call=None, covers=("WS /ws/video",), custom=video_broadcast
+)
+
+
+async def device_control(ctx: BenchContext, commands: int, concurrency: int) -> List[float]:
+    """
+    POST /statuses/devices/{device_id}/controls?wait=true 로 명령을 보내고, 장치 채널이 받아서 ack 한 뒤
+    응답이 돌아올 때까지의 왕복 지연(ms)을 잽니다. 장치는 센서 데이터도 함께 올려 보냅니다.
+    """
+    import websockets
+
+    ws_base = ctx.base_url.replace("http", "ws", 1)
+    device = await websockets.connect(f"{ws_base}/statuses/devices/bench-device/ws?token={os.environ['DEVICE_TOKEN']}")
+
+    async def run_device():
+        uplink = 0
+        try:
+            async for text in device:
+                message = json.loads(text)
+                if message["type"] == "control":
+                    await device.send(json.dumps({"type": "ack", "seq": message["seq"]}))
+                    uplink += 1
+                    await device.send(json.dumps({"type": "data", "seq": uplink, **_sensor_payload(ctx)}))
+        except websockets.ConnectionClosed:
+            pass
+
+    runner = asyncio.create_task(run_device())
+    latencies = []
+    try:
+        for i in range(commands):
+            started = time.perf_counter()
+            r = await ctx.client.post(
+                "/statuses/devices/bench-device/controls",
+                params={"wait": "true"},
+                json={"controls": {"pump": i % 2 == 0}},
+                headers=ctx.headers,
+            )
+            r.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        await device.close()
+        runner.cancel()
+    return latencies
+
+
+SCENARIOS["WS /statuses/devices/{device_id}/ws"] = Scenario(
+    "WS /statuses/devices/{device_id}/ws",
+    call=None,
+    covers=("POST /statuses/devices/{device_id}/controls",),
+    custom=device_control,
+)
+
+
+ALERT_WARMUP_READINGS = 25
+
+
+async def anomaly_alerts(ctx: BenchContext, alerts: int, concurrency: int) -> List[float]:
+    """
+    안정된 값을 받던 장치에 튀는 온도를 올리고 /statuses/alerts/ws 로 알림이 올 때까지의 지연(ms)을 잽니다.
+    알림은 장치/센서마다 한 번만 나오므로 장치마다 한 번씩 잽니다.
+    """
+    import websockets
+
+    devices = [f"bench-anomaly-{uuid.uuid4().hex[:8]}" for _ in range(alerts)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm(device_id: str):
+        async with semaphore:
+            for _ in range(ALERT_WARMUP_READINGS):
+                await ctx.client.post(f"/statuses/{device_id}/data", json=_sensor_payload(ctx))
+
+    await asyncio.gather(*[warm(device_id) for device_id in devices])
+    ws_base = ctx.base_url.replace("http", "ws", 1)
+    latencies = []
+    async with websockets.connect(f"{ws_base}/statuses/alerts/ws") as stream:
+        for device_id in devices:
+            payload = _sensor_payload(ctx)
+            payload["sensors"]["temperature"] = 80.0
+            started = time.perf_counter()
+            await ctx.client.post(f"/statuses/{device_id}/data", json=payload)
+            while json.loads(await stream.recv())["device_id"] != device_id:
+                pass
+            latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+SCENARIOS["WS /statuses/alerts/ws"] = Scenario(
+    "WS /statuses/alerts/ws", call=None, weight=0.25, custom=anomaly_alerts
+)
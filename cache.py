@@ -0,0 +1,89 @@
+# app/cache.py
+"""
+프로세스 내 LRU 캐시.
+
+워커 프로세스마다 따로 존재하므로 한 워커에서 무효화해도 다른 워커에는 반영되지 않습니다.
+그래서 항목마다 TTL 을 두어 다른 워커의 오래된 값이 남아 있는 시간을 제한합니다.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+import metrics
+
+CACHE_REQUESTS = metrics.REGISTRY.counter("cache_requests_total", "In-process cache lookups by cache and result.")
+CACHE_SIZE = metrics.REGISTRY.gauge("cache_entries", "Entries held by an in-process cache.")
+
+
+class LRUCache:
+    """
+    스레드 안전한 LRU + TTL 캐시. max_size 를 넘으면 가장 오래 쓰이지 않은 항목부터 버립니다.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 무효화할 때마다 증가. DB 에서 읽는 사이에 무효화가 끼어들면 읽은 값을 캐시에 넣지 않습니다
+        self.generation = 0
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """
+        캐시에 있는 키만 {키: 값} 으로 반환합니다.
+        """
+        now = time.monotonic()
+        found = {}
+        misses = 0
+        with self._lock:
+            for key in keys:
+                entry = self._items.get(key)
+                if entry is None or entry[0] < now:
+                    if entry is not None:
+                        del self._items[key]
+                    misses += 1
+                    continue
+                self._items.move_to_end(key)
+                found[key] = entry[1]
+        if found:
+            CACHE_REQUESTS.inc(len(found), cache=self.name, result="hit")
+        if misses:
+            CACHE_REQUESTS.inc(misses, cache=self.name, result="miss")
+        return found
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: Dict[Hashable, Any], generation: Optional[int] = None):
+        """
+        generation 을 주면, 그 값을 읽은 뒤 무효화가 있었을 경우 아무것도 저장하지 않습니다.
+        """
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            for key, value in items.items():
+                self._items[key] = (expires, value)
+                self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+            size = len(self._items)
+        CACHE_SIZE.set(size, cache=self.name)
+
+    def set(self, key: Hashable, value: Any):
+        self.set_many({key: value})
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._items.pop(key, None)
+            self.generation += 1
+            size = len(self._items)
+        CACHE_SIZE.set(size, cache=self.name)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.generation += 1
+        CACHE_SIZE.set(0, cache=self.name)
@@ -0,0 +1,207 @@
+# app/compression.py
+"""
+응답 압축 (Accept-Encoding 협상으로 brotli 또는 gzip).
+
+- CompressionMiddleware: COMPRESSION_CONTENT_TYPES 에 있는 응답 중 COMPRESSION_MIN_SIZE 바이트 이상인 것만 압축합니다.
+  이미지(FileResponse 등 허용 목록 밖의 타입), 이미 Content-Encoding 이 있는 응답, HEAD/204/304, WebSocket 은 건드리지 않습니다.
+  스트리밍 응답은 청크마다 flush 해서 스트리밍을 유지합니다.
+- Precompressed: 고정된 응답 본문을 가장 높은 압축 수준으로 한 번만 압축해 두고 요청마다 알맞은 변형을 내려줍니다.
+  미들웨어는 Content-Encoding 이 있는 응답을 다시 압축하지 않으므로 요청당 압축 비용이 없습니다.
+
+brotli 패키지가 없으면 gzip 만 사용합니다.
+"""
+import gzip
+import hashlib
+import zlib
+from typing import Callable, Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+
+import metrics
+from config import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_RESPONSES = metrics.REGISTRY.counter("compression_responses_total", "Compressed responses, by encoding.")
+COMPRESSION_BYTES = metrics.REGISTRY.counter(
+    "compression_bytes_total", "Bytes before (stage=\"in\") and after (stage=\"out\") response compression."
+)
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Accept-Encoding 헤더에서 사용할 인코딩("br" / "gzip")을 고릅니다. 둘 다 안 되면 None.
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    br = weights.get("br", wildcard) if brotli is not None else 0.0
+    gz = weights.get("gzip", wildcard)
+    if br > 0 and br >= gz:
+        return "br"
+    if gz > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=level)
+        else:
+            self._zlib = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip 헤더
+
+    def compress(self, data: bytes, finish: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if finish else self._brotli.flush())
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH if finish else zlib.Z_SYNC_FLUSH)
+
+
+def _level(encoding: str) -> int:
+    return settings.COMPRESSION_BROTLI_QUALITY if encoding == "br" else settings.COMPRESSION_GZIP_LEVEL
+
+
+def _add_vary(headers: MutableHeaders):
+    vary = headers.get("vary")
+    if not vary:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = vary + ", Accept-Encoding"
+
+
+class CompressionMiddleware:
+    """
+    협상된 인코딩으로 응답 본문을 압축하는 ASGI 미들웨어.
+    """
+
+    def __init__(self, app, minimum_size: Optional[int] = None, content_types=None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.content_types = frozenset(content_types or settings.COMPRESSION_CONTENT_TYPES)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+                length = headers.get("content-length")
+                passthrough = (
+                    message["status"] < 200
+                    or message["status"] in (204, 304)
+                    or "content-encoding" in headers
+                    or content_type not in self.content_types
+                    or (length is not None and length.isdigit() and int(length) < self.minimum_size)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    # 첫 본문 청크를 보고 압축 여부를 정할 때까지 헤더를 보류합니다
+                    start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                # http.response.pathsend 등 본문이 아닌 메시지가 오면 압축하지 않고 그대로 보냅니다
+                if start is not None:
+                    passthrough = True
+                    await send(start)
+                    start = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                response_start, start = start, None
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(response_start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, _level(encoding))
+                headers = MutableHeaders(scope=response_start)
+                headers["Content-Encoding"] = encoding
+                _add_vary(headers)
+                if more_body:
+                    del headers["Content-Length"]
+                    await send(response_start)
+                else:
+                    compressed = compressor.compress(body, finish=True)
+                    headers["Content-Length"] = str(len(compressed))
+                    COMPRESSION_RESPONSES.inc(encoding=encoding)
+                    COMPRESSION_BYTES.inc(len(body), stage="in")
+                    COMPRESSION_BYTES.inc(len(compressed), stage="out")
+                    await send(response_start)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                COMPRESSION_RESPONSES.inc(encoding=encoding)
+
+            # 스트리밍 응답: 청크마다 flush 해서 받은 만큼 바로 내보냅니다
+            compressed = compressor.compress(body, finish=not more_body)
+            COMPRESSION_BYTES.inc(len(body), stage="in")
+            COMPRESSION_BYTES.inc(len(compressed), stage="out")
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class Precompressed:
+    """
+    한 번만 압축해 두는 고정 응답 본문. body_factory 는 첫 요청 때 호출됩니다.
+    """
+
+    def __init__(self, body_factory: Callable[[], bytes], media_type: str):
+        self.body_factory = body_factory
+        self.media_type = media_type
+        self._variants: Optional[Dict[str, bytes]] = None
+        self._digest = ""
+
+    def _load(self) -> Dict[str, bytes]:
+        if self._variants is None:
+            body = self.body_factory()
+            variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants["br"] = brotli.compress(body, quality=11)
+            self._digest = hashlib.sha1(body).hexdigest()
+            self._variants = variants
+        return self._variants
+
+    def response(self, request: Request) -> Response:
+        variants = self._load()
+        encoding = negotiate(request.headers.get("accept-encoding")) or "identity"
+        etag = f'"{self._digest}-{encoding}"'
+        headers = {"Vary": "Accept-Encoding", "ETag": etag}
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        return Response(variants[encoding], media_type=self.media_type, headers=headers)
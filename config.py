@@ -1,5 +1,6 @@
 # app/config.py
 import os
+from typing import List, Optional
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 
@@ -13,16 +14,167 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
     # Database settings
-    DB_HOST: str = os.getenv("DB_HOST")
-    DB_NAME: str = os.getenv("DB_NAME")
-    DB_USER: str = os.getenv("DB_USER")
-    DB_PASSWORD: str = os.getenv("DB_PASSWORD")
+    DB_HOST: Optional[str] = os.getenv("DB_HOST")
+    DB_NAME: Optional[str] = os.getenv("DB_NAME")
+    DB_USER: Optional[str] = os.getenv("DB_USER")
+    DB_PASSWORD: Optional[str] = os.getenv("DB_PASSWORD")
     DB_PORT: str = os.getenv("DB_PORT", "3306")  # 기본 포트를 3306으로 설정
+    # 전체 SQLAlchemy URL 을 직접 지정 (예: 벤치마크용 sqlite:///bench.db). 지정하면 DB_* 설정보다 우선합니다.
+    DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL")
+
+    # Read replica settings (읽기 전용 GET 엔드포인트용). 지정하지 않으면 모든 요청이 primary 를 사용합니다.
+    DB_REPLICA_HOST: Optional[str] = os.getenv("DB_REPLICA_HOST")
+    REPLICA_DATABASE_URL: Optional[str] = os.getenv("REPLICA_DATABASE_URL")
+    REPLICA_MAX_LAG_SECONDS: float = 5.0  # 복제 지연이 이보다 크면 primary 로 읽습니다
+    REPLICA_LAG_CHECK_INTERVAL: float = 2.0
+    STICKY_PRIMARY_SECONDS: float = 10.0  # 쓰기 직후 이 시간 동안 같은 클라이언트는 primary 에서 읽습니다
+
+    # 개발/스테이징용 SQL 검사기 (N+1, 느린 쿼리 로그)
+    QUERY_INSPECTOR_ENABLED: bool = False
+    QUERY_REPEAT_THRESHOLD: int = 5  # 한 요청에서 같은 문장이 이 횟수를 넘으면 N+1 의심
+    SLOW_QUERY_MS: float = 200.0
+
+    # 요청 단위 프로파일링 (토큰이 없으면 헤더/쿼리 트리거와 /profiles 가 비활성)
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILING_SAMPLE_RATE: float = 0.0  # 0.0 ~ 1.0, 무작위로 프로파일링할 요청 비율
+    PROFILING_MAX_PROFILES: int = 50
+    PROFILING_DIR: Optional[str] = None  # 지정하면 메모리 대신 이 디렉터리에 보관
+    PROFILING_SAMPLE_INTERVAL_MS: float = 1.0
+
+    # 사용자 공개 프로필(이름, 아바타) LRU 캐시. 무효화는 update_user 를 실행한 워커에만 적용되므로, TTL 이
+    # 워커가 여러 개일 때 다른 워커가 바뀐 이름/아바타를 보여 주기까지의 최대 시간입니다
+    USER_PROFILE_CACHE_SIZE: int = 10000
+    USER_PROFILE_CACHE_TTL_SECONDS: float = 15.0
+
+    # 조회수/상호작용 집계와 hot 랭킹 (/communities/trending, /markets/trending)
+    TRENDING_HALF_LIFE_HOURS: float = 12.0  # 이 시간이 지나면 이벤트의 기여도가 절반이 됩니다
+    TRENDING_INTERACTION_WEIGHT: float = 5.0  # 조회 1회 대비 상호작용(답변 등) 가중치
+    TRENDING_TOP_K: int = 100
+    TRENDING_FLUSH_INTERVAL_SECONDS: float = 5.0
+    TRENDING_FLUSH_MAX_KEYS: int = 5000
+    TRENDING_RESYNC_SECONDS: float = 60.0  # 이 워커가 쓴 것이 없어도 이 주기로 상위 K 개를 다시 읽습니다 (다른 워커 반영)
+
+    # 마켓 유사 게시물 추천 (recommendations.py)
+    RECOMMEND_ENABLED: bool = True
+    RECOMMEND_DIM: int = 256  # feature hashing 차원. 바꾸면 `python -m recommendations` 로 다시 빌드해야 합니다
+    RECOMMEND_TOP_N: int = 20
+    RECOMMEND_REFRESH_INTERVAL_SECONDS: float = 5.0
+    RECOMMEND_REVERSE_FANOUT: int = 2  # 바뀐 게시물과 가까운 top_n * 이 값 개 게시물의 목록도 다시 계산
+    RECOMMEND_BATCH_SIZE: int = 256  # 한 번에 곱하는 질의 벡터 수
+    RECOMMEND_CHUNK_ROWS: int = 65536  # 한 번에 곱하는 행렬 행 수
+
+    # 마켓 가격 통계의 근사 중앙값 상대 오차 (analytics.py). 바꾸면 `python -m analytics` 로 다시 빌드해야 합니다
+    PRICE_SKETCH_ACCURACY: float = 0.01
+
+    # 마켓 반경 검색 (geo.py)
+    NEARBY_MAX_RADIUS_KM: float = 50.0
+    NEARBY_MAX_CELLS: int = 32  # 한 번에 읽는 geohash 칸 수 상한 (클수록 칸이 작아져 후보가 줄어듭니다)
+
+    # 전체 덤프 스트리밍 (export.py)
+    EXPORT_BATCH_SIZE: int = 1000  # 서버 측 커서에서 한 번에 읽어 인코딩하는 행 수
+    EXPORT_GZIP_LEVEL: int = 6
+
+    # 응답 압축 (compression.py)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # 이보다 작은 응답은 압축하지 않습니다 (바이트)
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # 요청마다 압축하므로 낮은 품질(빠름)을 씁니다
+    COMPRESSION_CONTENT_TYPES: List[str] = [
+        "application/json",
+        "application/x-ndjson",
+        "text/csv",
+        "text/plain",
+        "text/html",
+    ]
+
+    # 백그라운드 작업 큐 (jobs.py, tasks.py)
+    JOBS_DB_PATH: str = "jobs.sqlite3"
+    JOBS_CONCURRENCY: int = 2  # 워커 프로세스마다 작업 스레드 수
+    JOBS_MAX_ATTEMPTS: int = 5
+    JOBS_BACKOFF_SECONDS: float = 2.0  # 재시도 간격: 2, 4, 8, ... 초 (지터 포함)
+    JOBS_BACKOFF_MAX_SECONDS: float = 300.0
+    JOBS_LEASE_SECONDS: float = 300.0  # 실행 중에는 계속 연장되고, 워커가 죽으면 이 시간 뒤에 다른 워커가 다시 가져갑니다
+    JOBS_POLL_INTERVAL_SECONDS: float = 1.0
+    IMAGE_MAX_BYTES: int = 10 * 1024 * 1024
+
+    # 이미지 파생본 (images.py)
+    IMAGE_THUMB_SIZE: int = 320  # 긴 변 픽셀
+    IMAGE_MEDIUM_SIZE: int = 1280
+    IMAGE_QUALITY: int = 80
+    IMAGE_RENDER_CONCURRENCY: int = 2  # 요청 중에 파생본을 만드는 동시 작업 수 (워커 프로세스 단위)
+
+    # 장치 WebSocket 채널 (devices.py)
+    DEVICE_TOKEN: Optional[str] = None  # 장치가 ?token= 또는 X-Device-Token 헤더로 보낼 값. 없으면 모든 장치 연결을 거부합니다
+    DEVICE_ACK_TIMEOUT_SECONDS: float = 2.0  # 이 시간 안에 확인되지 않은 명령은 다시 보냅니다
+    DEVICE_ACK_WAIT_SECONDS: float = 5.0  # 제어 명령 API 의 wait=true 최대 대기 시간
+    DEVICE_PENDING_LIMIT: int = 100  # 장치마다 보관하는 미확인 명령 수
+
+    # 장치별 최신 센서 상태 저장소 (sensor_state.py)
+    SENSOR_STATE_BACKEND: str = "memory"  # memory: 워커별 메모리, mmap: 워커 간 공유 파일
+    SENSOR_STATE_PATH: str = "sensor_state.bin"
+    SENSOR_STATE_SLOTS: int = 16384  # 저장할 수 있는 최대 장치 수
+    SENSOR_STATE_RECORD_BYTES: int = 1024  # 장치당 최대 레코드 크기 (JSON 바이트)
+
+    # 센서 이상치 탐지 (anomaly.py)
+    ANOMALY_SENSORS: List[str] = ["temperature", "tds", "water_level", "liquid_temperature"]
+    ANOMALY_ALPHA: float = 0.05  # EWMA 가중치. 클수록 최근 값에 빨리 적응합니다
+    ANOMALY_Z_THRESHOLD: float = 4.0
+    ANOMALY_WARMUP: int = 20  # 센서마다 이만큼 읽은 뒤부터 판정합니다
+    ANOMALY_MIN_RELATIVE_STD: float = 0.01  # 표준편차 하한 (|평균| 대비)
+    ANOMALY_BATCH_INTERVAL_SECONDS: float = 0.05
+    ANOMALY_QUEUE_LIMIT: int = 100000
+    ANOMALY_RECENT_ALERTS: int = 1000
+
+    # 장기 센서 기록 보관소 (archive.py). 장치/날짜/센서별 고정 폭 열 파일
+    SENSOR_ARCHIVE_ENABLED: bool = True
+    SENSOR_ARCHIVE_DIR: str = "sensor_archive"
+    SENSOR_ARCHIVE_SENSORS: List[str] = ["temperature", "humidity", "tds", "water_level", "liquid_temperature"]
+    SENSOR_ARCHIVE_FLUSH_SECONDS: float = 5.0
+    SENSOR_ARCHIVE_BUFFER_LIMIT: int = 50000  # 버퍼가 이만큼 차면 바로 플러시합니다
+    SENSOR_ARCHIVE_MAX_RANGE_DAYS: int = 366  # 한 번에 조회할 수 있는 최대 기간
+
+    # 운영 서버 실행기 (serve.py)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 1  # 0 이면 이 프로세스가 쓸 수 있는 CPU 수
+    # 워커 여러 개를 허용합니다. 장치 채널/이상치 탐지가 워커마다 따로 있으므로, 장치 트래픽을 워커 1개짜리
+    # 인스턴스로 따로 보내는 경우에만 켭니다. 켜도 SENSOR_STATE_BACKEND=mmap 이어야 시작합니다
+    SERVER_MULTI_WORKER: bool = False
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS: float = 30.0  # 종료 시 진행 중인 요청/WebSocket 핸들러를 기다리는 최대 시간
+
+    # 비싼 엔드포인트 동시 실행 수 제한 (워커 프로세스 단위). 대기열이 차면 503 + Retry-After
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_WAIT_SECONDS: float = 2.0
+    AUTH_CONCURRENCY: int = 4  # bcrypt 로그인/회원가입
+    AUTH_QUEUE_SIZE: int = 32
+    UPLOAD_CONCURRENCY: int = 4  # 이미지 업로드
+    UPLOAD_QUEUE_SIZE: int = 16
+    HEAVY_CONCURRENCY: int = 8  # 목록 조회, 일괄 작업
+    HEAVY_QUEUE_SIZE: int = 64
+    EXPORT_CONCURRENCY: int = 2  # 전체 덤프 (응답이 끝날 때까지 자리를 차지합니다)
+    EXPORT_QUEUE_SIZE: int = 4
+
+    # 인증 엔드포인트 토큰 버킷 (분당 충전 수, 버킷 크기)
+    LOGIN_RATE_PER_MINUTE: float = 10.0
+    LOGIN_BURST: int = 5
+    SIGNUP_RATE_PER_MINUTE: float = 5.0
+    SIGNUP_BURST: int = 3
 
     @property
     def database_url(self) -> str:
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return f"mysql+pymysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def replica_database_url(self) -> Optional[str]:
+        if self.REPLICA_DATABASE_URL:
+            return self.REPLICA_DATABASE_URL
+        if self.DB_REPLICA_HOST:
+            return f"mysql+pymysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_REPLICA_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+        return None
+
     class Config:
         env_file = ".env"
 
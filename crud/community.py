@@ -1,9 +1,14 @@
 # app/crud/community.py
+from fastapi import HTTPException, status
+import base64
+from datetime import datetime
+from sqlalchemy import select, update, delete, tuple_
 from sqlalchemy.orm import Session
+from database import supports_returning
 from models.user import User
-from models.community import Community
-from schemas.community import CommunityCreate
-from typing import Optional
+from models.community import Community, CommunityAnswer
+from schemas.community import AnswerCreate, CommunityCreate, CommunityUpdate, CommunityBulkCreateItem, CommunityBulkUpdateItem
+from typing import Dict, List, Optional
 
 def create_community(db: Session, community_data: CommunityCreate):
     # writer_id로 사용자 객체를 조회하여 관계 설정
@@ -25,15 +30,297 @@ def create_community(db: Session, community_data: CommunityCreate):
 def get_community(db: Session, community_id: int):
     return db.query(Community).filter(Community.id == community_id).first()
 
-def delete_community(db: Session, community_id: int):
-    community = db.query(Community).filter(Community.id == community_id).first()
-    if community:
-        db.delete(community)
-        db.commit()
-    return community
+def _community_not_changed(db: Session, community_id: int):
+    # 조건부 UPDATE/DELETE 가 0 행일 때만 실행: 없는 게시물(None)인지 남의 게시물(403)인지 구분
+    db.rollback()
+    if db.scalar(select(Community.id).where(Community.id == community_id)) is None:
+        return None
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="권한이 없습니다.")
+
+def update_community(db: Session, community_id: int, community_update: CommunityUpdate, current_id: int):
+    """
+    소유권 조건을 WHERE 절에 넣은 UPDATE 한 문장으로 게시물을 수정하고, 수정된 행을 dict 로 반환합니다.
+    RETURNING 을 지원하지 않는 방언(MySQL)에서는 수정 후 한 번 더 조회합니다.
+    """
+    community_table = Community.__table__
+    owned = (community_table.c.id == community_id) & (community_table.c.writer_id == current_id)
+    update_data = community_update.dict(exclude_unset=True)
+
+    if not update_data:
+        row = db.execute(select(*community_table.c).where(owned)).mappings().first()
+    elif supports_returning(db, "update"):
+        row = db.execute(
+            update(community_table).where(owned).values(**update_data).returning(*community_table.c)
+        ).mappings().first()
+    else:
+        result = db.execute(update(community_table).where(owned).values(**update_data))
+        row = None
+        if result.rowcount:
+            row = db.execute(
+                select(*community_table.c).where(community_table.c.id == community_id)
+            ).mappings().first()
+    if row is None:
+        return _community_not_changed(db, community_id)
+    db.commit()
+    return dict(row)
+
+def delete_community(db: Session, community_id: int, current_id: int):
+    """
+    소유권 조건을 WHERE 절에 넣은 DELETE 한 문장으로 게시물을 삭제합니다.
+    삭제되면 True, 게시물이 없으면 None 을 반환하고 남의 게시물이면 403 을 발생시킵니다.
+    """
+    result = db.execute(
+        delete(Community).where(Community.id == community_id, Community.writer_id == current_id)
+    )
+    if not result.rowcount:
+        return _community_not_changed(db, community_id)
+    db.commit()
+    return True
 
 def list_communities(db: Session, keyword: Optional[str] = None):
-    query = db.query(Community)
+    """
+    게시물 목록을 작성자 이름과 함께 한 번의 JOIN 쿼리로 조회합니다. 답변은 answer_count 만 포함합니다.
+    """
+    query = (
+        select(*Community.__table__.c, User.name.label("writer_name"))
+        .join(User, User.id == Community.writer_id)
+    )
     if keyword:
-        query = query.filter(Community.title.contains(keyword))
-    return query.all()
+        query = query.where(Community.title.contains(keyword))
+    query = query.order_by(Community.created_at.desc(), Community.id.desc())
+    return db.execute(query).mappings().all()
+
+def export_query():
+    """
+    전체 덤프(export.stream)용 쿼리. 작성자 이름을 JOIN 으로 함께 내보냅니다.
+    """
+    return (
+        select(*Community.__table__.c, User.name.label("writer_name"))
+        .join(User, User.id == Community.writer_id)
+        .order_by(Community.id)
+    )
+
+def get_communities_by_ids(db: Session, ids: List[int]) -> Dict[int, Dict]:
+    """
+    여러 게시물을 작성자 이름/아바타와 함께 한 번의 IN 쿼리로 조회해 {id: 행} 으로 반환합니다.
+    """
+    if not ids:
+        return {}
+    rows = db.execute(
+        select(
+            *Community.__table__.c,
+            User.name.label("writer_name"),
+            User.avatar.label("writer_avatar"),
+        )
+        .join(User, User.id == Community.writer_id)
+        .where(Community.id.in_(ids))
+    ).mappings().all()
+    return {row["id"]: row for row in rows}
+
+def encode_feed_cursor(created_at: datetime, community_id: int) -> str:
+    raw = f"{created_at.isoformat()},{community_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_feed_cursor(cursor: str):
+    """
+    encode_feed_cursor 의 역변환. 형식이 잘못되면 ValueError 를 발생시킵니다.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, community_id = raw.rsplit(",", 1)
+        return datetime.fromisoformat(created_at), int(community_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+def list_feed(db: Session, cursor: Optional[str] = None, limit: int = 20, writer_id: Optional[int] = None) -> Dict:
+    """
+    게시물을 최신순((created_at, id) 내림차순)으로 keyset 페이지네이션해 작성자 이름/아바타와 함께 조회합니다.
+    writer_id 를 주면 그 사용자의 게시물만 (writer_id, created_at, id) 인덱스로 읽습니다.
+    """
+    query = (
+        select(
+            *Community.__table__.c,
+            User.name.label("writer_name"),
+            User.avatar.label("writer_avatar"),
+        )
+        .join(User, User.id == Community.writer_id)
+        .order_by(Community.created_at.desc(), Community.id.desc())
+        .limit(limit + 1)
+    )
+    if writer_id is not None:
+        query = query.where(Community.writer_id == writer_id)
+    if cursor:
+        created_at, community_id = decode_feed_cursor(cursor)
+        query = query.where(tuple_(Community.created_at, Community.id) < tuple_(created_at, community_id))
+    rows = db.execute(query).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_feed_cursor(last["created_at"], last["id"])
+    return {"items": rows[:limit], "next_cursor": next_cursor}
+
+def create_answer(db: Session, community_id: int, answer: AnswerCreate, writer: User) -> Optional[Dict]:
+    """
+    답변을 추가하고 같은 트랜잭션에서 게시물의 answer_count 를 1 늘립니다. 게시물이 없으면 None 을 반환합니다.
+    카운트를 먼저 갱신하므로 게시물 행이 잠긴 상태에서 답변이 들어가 동시 추가/삭제에도 수가 어긋나지 않습니다.
+    """
+    result = db.execute(
+        update(Community)
+        .where(Community.id == community_id)
+        .values(answer_count=Community.answer_count + 1)
+    )
+    if not result.rowcount:
+        db.rollback()
+        return None
+    db_answer = CommunityAnswer(community_id=community_id, writer_id=writer.id, content=answer.content)
+    db.add(db_answer)
+    db.flush()
+    response = {
+        "id": db_answer.id,
+        "community_id": community_id,
+        "writer_id": writer.id,
+        "writer_name": writer.name,
+        "writer_avatar": writer.avatar,
+        "content": db_answer.content,
+        "created_at": db_answer.created_at,
+    }
+    db.commit()
+    return response
+
+def delete_answer(db: Session, community_id: int, answer_id: int, current_id: int):
+    """
+    본인 답변을 삭제하고 같은 트랜잭션에서 answer_count 를 1 줄입니다.
+    삭제되면 True, 답변이 없으면 None 을 반환하고 남의 답변이면 403 을 발생시킵니다.
+    """
+    result = db.execute(
+        delete(CommunityAnswer).where(
+            CommunityAnswer.id == answer_id,
+            CommunityAnswer.community_id == community_id,
+            CommunityAnswer.writer_id == current_id,
+        )
+    )
+    if not result.rowcount:
+        db.rollback()
+        exists = db.scalar(
+            select(CommunityAnswer.id).where(
+                CommunityAnswer.id == answer_id, CommunityAnswer.community_id == community_id
+            )
+        )
+        if exists is None:
+            return None
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="권한이 없습니다.")
+    db.execute(
+        update(Community)
+        .where(Community.id == community_id)
+        .values(answer_count=Community.answer_count - 1)
+    )
+    db.commit()
+    return True
+
+def list_answers(db: Session, community_id: int, after: Optional[int] = None, limit: int = 20) -> Optional[Dict]:
+    """
+    게시물의 답변을 오래된 순으로 keyset 페이지네이션해 작성자 정보와 함께 조회합니다.
+    after 는 이전 페이지의 next_cursor 입니다. 게시물이 없으면 None 을 반환합니다.
+    """
+    query = (
+        select(
+            *CommunityAnswer.__table__.c,
+            User.name.label("writer_name"),
+            User.avatar.label("writer_avatar"),
+        )
+        .join(User, User.id == CommunityAnswer.writer_id)
+        .where(CommunityAnswer.community_id == community_id)
+        .order_by(CommunityAnswer.id)
+        .limit(limit + 1)
+    )
+    if after is not None:
+        query = query.where(CommunityAnswer.id > after)
+    rows = db.execute(query).mappings().all()
+    # 첫 페이지가 비었을 때만 게시물 존재 여부를 따로 확인합니다
+    if not rows and after is None and get_community_id(db, community_id) is None:
+        return None
+    next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+    return {"items": rows[:limit], "next_cursor": next_cursor}
+
+def get_community_id(db: Session, community_id: int) -> Optional[int]:
+    return db.scalar(select(Community.id).where(Community.id == community_id))
+
+def bulk_create_communities(db: Session, items: List[CommunityBulkCreateItem], writer_id: int) -> List[Dict]:
+    """
+    여러 커뮤니티 게시물을 하나의 트랜잭션에서 생성합니다. 하나라도 실패하면 전체가 롤백됩니다.
+    """
+    communities = [
+        Community(title=item.title, content=item.content, writer_id=writer_id)
+        for item in items
+    ]
+    try:
+        db.add_all(communities)
+        db.flush()
+        # 커밋 후에는 객체가 만료되므로 id 를 미리 읽어 둡니다
+        ids = [community.id for community in communities]
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return [
+        {"index": index, "id": community_id, "status": "created"}
+        for index, community_id in enumerate(ids)
+    ]
+
+def _load_writers(db: Session, ids: List[int]) -> Dict[int, int]:
+    # 소유권 확인용 (id -> writer_id) 을 한 번의 IN 조회로 가져옵니다
+    rows = db.execute(select(Community.id, Community.writer_id).where(Community.id.in_(ids))).all()
+    return {row.id: row.writer_id for row in rows}
+
+def _check_writer(index: int, community_id: int, writers: Dict[int, int], current_id: int) -> Optional[Dict]:
+    if community_id not in writers:
+        return {"index": index, "id": community_id, "status": "not_found", "detail": "게시물을 찾을 수 없습니다."}
+    if writers[community_id] != current_id:
+        return {"index": index, "id": community_id, "status": "forbidden", "detail": "권한이 없습니다."}
+    return None
+
+def bulk_update_communities(db: Session, items: List[CommunityBulkUpdateItem], current_id: int) -> List[Dict]:
+    """
+    여러 커뮤니티 게시물을 하나의 트랜잭션에서 수정합니다. 항목별 결과를 반환합니다.
+    """
+    writers = _load_writers(db, [item.id for item in items])
+    results, updates = [], []
+    for index, item in enumerate(items):
+        failure = _check_writer(index, item.id, writers, current_id)
+        if failure:
+            results.append(failure)
+            continue
+        values = item.dict(exclude_unset=True)
+        if len(values) > 1:
+            updates.append(values)
+        results.append({"index": index, "id": item.id, "status": "updated"})
+    try:
+        if updates:
+            db.execute(update(Community), updates)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return results
+
+def bulk_delete_communities(db: Session, ids: List[int], current_id: int) -> List[Dict]:
+    """
+    여러 커뮤니티 게시물을 하나의 트랜잭션에서 삭제합니다. 항목별 결과를 반환합니다.
+    """
+    writers = _load_writers(db, ids)
+    results, deletable = [], []
+    for index, community_id in enumerate(ids):
+        failure = _check_writer(index, community_id, writers, current_id)
+        if failure:
+            results.append(failure)
+            continue
+        deletable.append(community_id)
+        results.append({"index": index, "id": community_id, "status": "deleted"})
+    try:
+        if deletable:
+            db.execute(delete(Community).where(Community.id.in_(deletable)))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return results
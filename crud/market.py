@@ -1,11 +1,211 @@
 from fastapi import HTTPException, status
+from sqlalchemy import and_, func, or_, select, update, delete, tuple_
 from sqlalchemy.orm import Session
-from models.market import Market
-from schemas.market import MarketCreate, MarketUpdate
-from typing import Optional
+from config import settings
+from database import greatest, least, supports_returning, upsert
+import analytics
+import geo
+import lazy
+from models.market import Market, MarketSimilar, MarketTag, PriceBucket, PriceStat, TagCount
+from schemas.market import MarketCreate, MarketUpdate, MarketBulkUpdateItem
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import Counter, defaultdict
+import heapq
 
-def create_market(db: Session, market_data: MarketCreate):
-    market = Market(
+# 유사 게시물 추천은 NumPy 를 쓰므로 첫 게시물 변경 때 임포트합니다
+recommendations = lazy.module("recommendations")
+
+def _normalize_tags(hashtags: Optional[Iterable[str]]) -> List[str]:
+    # "#유기농", " 유기농 " 을 같은 태그로 취급 (순서 유지, 중복 제거)
+    tags = []
+    for raw in hashtags or []:
+        tag = raw.strip().lstrip("#").strip().lower()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+def _sync_tags(db: Session, market_id: int, old_hashtags, new_hashtags):
+    """
+    market_tag 색인과 tag_count 집계를 변경분(delta)만큼 갱신합니다. 커밋은 호출자가 합니다.
+    """
+    _sync_tags_many(db, [(market_id, old_hashtags, new_hashtags)])
+
+def _sync_tags_many(db: Session, changes: Iterable[Tuple[int, Optional[list], Optional[list]]]):
+    # 여러 게시물의 태그 변경을 모아 문장 수가 게시물 수와 무관하도록 처리합니다
+    deltas: Counter = Counter()
+    added_rows = []
+    removed_keys = []
+    for market_id, old_hashtags, new_hashtags in changes:
+        old_tags = set(_normalize_tags(old_hashtags))
+        new_tags = set(_normalize_tags(new_hashtags))
+        for tag in new_tags - old_tags:
+            added_rows.append(MarketTag(market_id=market_id, tag=tag))
+            deltas[tag] += 1
+        for tag in old_tags - new_tags:
+            removed_keys.append((market_id, tag))
+            deltas[tag] -= 1
+
+    if removed_keys:
+        db.execute(
+            delete(MarketTag).where(tuple_(MarketTag.market_id, MarketTag.tag).in_(removed_keys))
+        )
+    if added_rows:
+        db.add_all(added_rows)
+
+    deltas = {tag: delta for tag, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    existing = set(db.scalars(select(TagCount.tag).where(TagCount.tag.in_(list(deltas)))))
+    tags_by_delta = defaultdict(list)
+    for tag in existing:
+        tags_by_delta[deltas[tag]].append(tag)
+    for delta, tags in tags_by_delta.items():
+        db.execute(
+            update(TagCount)
+            .where(TagCount.tag.in_(tags))
+            .values(count=TagCount.count + delta)
+        )
+    # 새 태그의 첫 행은 다른 요청이 동시에 넣을 수 있으므로 키 충돌 시 개수를 더하는 upsert 로 넣습니다
+    upsert(
+        db,
+        TagCount.__table__,
+        [{"tag": tag, "count": delta} for tag, delta in deltas.items() if tag not in existing and delta > 0],
+        lambda new: {"count": TagCount.__table__.c.count + new.count},
+    )
+
+# 가격 통계에 필요한 (crop, location, price)
+PRICE_FIELDS = ("crop", "location", "price")
+
+def _price_point(row) -> Tuple[Optional[str], Optional[str], Optional[int]]:
+    return (row["crop"], row["location"], row["price"])
+
+def _sync_prices(db: Session, old, new):
+    """
+    price_stat / price_bucket 집계를 변경분만큼 갱신합니다. market 쓰기 이후에 호출해야 하며 커밋은 호출자가 합니다.
+    """
+    _sync_prices_many(db, [(old, new)])
+
+def _sync_prices_many(db: Session, changes: Iterable[Tuple[Optional[tuple], Optional[tuple]]]):
+    # (old, new) 는 _price_point 값이거나 None(생성/삭제). 그룹 수만큼만 읽고 씁니다
+    count_deltas: Counter = Counter()
+    total_deltas: Counter = Counter()
+    added: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    removed: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    bucket_deltas: Counter = Counter()
+    for old, new in changes:
+        if old == new:
+            continue
+        for point, sign in ((old, -1), (new, 1)):
+            if point is None or point[2] is None:
+                continue
+            crop, location, price = point
+            for key in analytics.price_keys(crop, location):
+                count_deltas[key] += sign
+                total_deltas[key] += sign * price
+                bucket_deltas[key + (analytics.bucket_of(price),)] += sign
+                (added if sign > 0 else removed)[key].append(price)
+
+    keys = list(set(added) | set(removed))
+    if not keys:
+        return
+    existing = {
+        (stat.dimension, stat.key): stat
+        for stat in db.execute(
+            select(PriceStat.dimension, PriceStat.key, PriceStat.count, PriceStat.total,
+                   PriceStat.min_price, PriceStat.max_price)
+            .where(tuple_(PriceStat.dimension, PriceStat.key).in_(keys))
+            .with_for_update()
+        ).all()
+    }
+    updates, inserts = [], []
+    for key in keys:
+        dimension, value = key
+        stat = existing.get(key)
+        count = (stat.count if stat else 0) + count_deltas[key]
+        if stat is None and count <= 0:
+            # 집계를 채우기 전(python -m analytics)의 게시물은 건너뜁니다
+            continue
+        prices = added[key] + ([stat.min_price, stat.max_price] if stat and stat.min_price is not None else [])
+        low, high = min(prices, default=None), max(prices, default=None)
+        if stat is not None and stat.min_price is not None:
+            if any(price <= stat.min_price or price >= stat.max_price for price in removed[key]):
+                # 최소/최대값이 빠졌을 수 있으면 그 그룹만 (crop|location, price) 인덱스로 다시 구합니다
+                column = getattr(Market, dimension)
+                low, high = db.execute(
+                    select(func.min(Market.price), func.max(Market.price))
+                    .where(column == value, Market.price.isnot(None))
+                ).one()
+        values = {
+            "dimension": dimension,
+            "key": value,
+            "count": max(count, 0),
+            "total": (stat.total if stat else 0) + total_deltas[key],
+            "min_price": low if count > 0 else None,
+            "max_price": high if count > 0 else None,
+        }
+        (updates if stat is not None else inserts).append(values)
+    if updates:
+        # 잠금 조회한 행이므로 계산된 값으로 기본 키 기준 ORM bulk UPDATE
+        db.execute(update(PriceStat), updates)
+    if inserts:
+        # 잠금 조회는 이미 있는 행만 잠그므로, 같은 새 그룹의 첫 행을 다른 요청이 먼저 넣었으면 그 행에 합칩니다
+        stat_table = PriceStat.__table__
+        upsert(db, stat_table, inserts, lambda new: {
+            "count": stat_table.c.count + new.count,
+            "total": stat_table.c.total + new.total,
+            "min_price": least(db, func.coalesce(stat_table.c.min_price, new.min_price), new.min_price),
+            "max_price": greatest(db, func.coalesce(stat_table.c.max_price, new.max_price), new.max_price),
+        })
+
+    bucket_deltas = {key: delta for key, delta in bucket_deltas.items() if delta}
+    if not bucket_deltas:
+        return
+    bucket_columns = tuple_(PriceBucket.dimension, PriceBucket.key, PriceBucket.bucket)
+    existing_buckets = set(
+        db.execute(
+            select(PriceBucket.dimension, PriceBucket.key, PriceBucket.bucket)
+            .where(bucket_columns.in_(list(bucket_deltas)))
+        ).all()
+    )
+    buckets_by_delta = defaultdict(list)
+    for key in existing_buckets:
+        buckets_by_delta[bucket_deltas[tuple(key)]].append(tuple(key))
+    for delta, bucket_keys in buckets_by_delta.items():
+        db.execute(
+            update(PriceBucket)
+            .where(bucket_columns.in_(bucket_keys))
+            .values(count=PriceBucket.count + delta)
+        )
+    bucket_table = PriceBucket.__table__
+    upsert(
+        db,
+        bucket_table,
+        [
+            {"dimension": key[0], "key": key[1], "bucket": key[2], "count": delta}
+            for key, delta in bucket_deltas.items()
+            if key not in existing_buckets and delta > 0
+        ],
+        lambda new: {"count": bucket_table.c.count + new.count},
+    )
+
+def _locate(values: Dict) -> Dict:
+    """
+    생성/수정할 필드에 좌표와 geohash 를 채워 돌려줍니다.
+    좌표를 직접 주면 그대로 쓰고(둘 다 null 이면 좌표 삭제), 좌표 없이 location 을 주면 지오코딩합니다.
+    """
+    if "latitude" in values or "longitude" in values:
+        latitude, longitude = values.get("latitude"), values.get("longitude")
+        if (latitude is None) != (longitude is None) or "latitude" not in values or "longitude" not in values:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="위도와 경도는 함께 지정해야 합니다.")
+    elif "location" in values:
+        latitude, longitude = geo.geocode(values["location"]) or (None, None)
+    else:
+        return {}
+    return {"latitude": latitude, "longitude": longitude, "geohash": geo.locate(latitude, longitude)}
+
+def _new_market(market_data: MarketCreate) -> Market:
+    coordinates = _locate(market_data.dict(exclude_unset=True))
+    return Market(
         title=market_data.title,
         content=market_data.content,
         crop=market_data.crop,
@@ -14,37 +214,286 @@ def create_market(db: Session, market_data: MarketCreate):
         farm_name=market_data.farm_name,
         cultivation_period=market_data.cultivation_period,
         hashtags=market_data.hashtags,
-        writer_id=market_data.writer_id
+        writer_id=market_data.writer_id,
+        **coordinates
     )
+
+def create_market(db: Session, market_data: MarketCreate):
+    market = _new_market(market_data)
     db.add(market)
+    db.flush()
+    _sync_tags(db, market.id, None, market.hashtags)
+    _sync_prices(db, None, (market.crop, market.location, market.price))
     db.commit()
+    recommendations.mark_changed([market.id])
     db.refresh(market)
     return market
 
-def update_market(db: Session, market_id: int, market_update: MarketUpdate, current_id: int):
-    market = db.query(Market).filter(Market.id == market_id).first()
-    if not market:
+def _market_not_updated(db: Session, market_id: int):
+    # 조건부 UPDATE/DELETE 가 0 행일 때만 실행: 없는 게시물(None)인지 남의 게시물(403)인지 구분
+    db.rollback()
+    if db.scalar(select(Market.id).where(Market.id == market_id)) is None:
         return None
-    if market.writer_id != current_id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="권한이 없습니다.")
-    for key, value in market_update.dict(exclude_unset=True).items():
-        setattr(market, key, value)
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="권한이 없습니다.")
+
+def update_market(db: Session, market_id: int, market_update: MarketUpdate, current_id: int):
+    """
+    소유권 조건을 WHERE 절에 넣은 UPDATE 한 문장으로 게시물을 수정하고, 수정된 행을 dict 로 반환합니다.
+    RETURNING 을 지원하지 않는 방언(MySQL)에서는 수정 후 한 번 더 조회합니다.
+    해시태그나 가격 통계 필드를 바꾸는 경우에는 태그 색인/가격 통계 갱신을 위해 기존 값을 먼저 잠금 조회합니다.
+    """
+    market_table = Market.__table__
+    owned = (market_table.c.id == market_id) & (market_table.c.writer_id == current_id)
+    update_data = market_update.dict(exclude_unset=True)
+    update_data.update(_locate(update_data))
+
+    old = None
+    prices_changed = any(field in update_data for field in PRICE_FIELDS)
+    if "hashtags" in update_data or prices_changed:
+        old = db.execute(
+            select(market_table.c.hashtags, *(market_table.c[field] for field in PRICE_FIELDS))
+            .where(owned)
+            .with_for_update()
+        ).mappings().first()
+        if old is None:
+            return _market_not_updated(db, market_id)
+        if "hashtags" in update_data:
+            _sync_tags(db, market_id, old["hashtags"], update_data["hashtags"])
+
+    if not update_data:
+        row = db.execute(select(*market_table.c).where(owned)).mappings().first()
+    elif supports_returning(db, "update"):
+        row = db.execute(
+            update(market_table).where(owned).values(**update_data).returning(*market_table.c)
+        ).mappings().first()
+    else:
+        result = db.execute(update(market_table).where(owned).values(**update_data))
+        row = None
+        if result.rowcount:
+            row = db.execute(
+                select(*market_table.c).where(market_table.c.id == market_id)
+            ).mappings().first()
+    if row is None:
+        return _market_not_updated(db, market_id)
+    if prices_changed:
+        _sync_prices(db, _price_point(old), _price_point(row))
     db.commit()
-    db.refresh(market)
-    return market
+    if recommendations.affects_features(update_data):
+        recommendations.mark_changed([market_id])
+    return dict(row)
+
+def list_nearby_markets(db: Session, latitude: float, longitude: float, radius_km: float, limit: int) -> List[Dict]:
+    """
+    (latitude, longitude) 에서 radius_km 안의 게시물을 가까운 순으로 조회합니다.
+    경계 상자를 덮는 geohash 칸들의 범위를 (geohash, latitude, longitude) 인덱스로 읽어 후보를 고르고,
+    정확한 거리로 거른 뒤 상위 limit 개만 전체 행을 읽습니다.
+    """
+    cells = geo.covering_cells(latitude, longitude, radius_km, settings.NEARBY_MAX_CELLS)
+    south, north, west, east = geo.bounding_box(latitude, longitude, radius_km)
+    query = select(Market.id, Market.latitude, Market.longitude).where(
+        or_(*[and_(Market.geohash >= cell, Market.geohash < cell + "~") for cell in cells]),
+        Market.latitude.between(south, north),
+    )
+    if -180 <= west and east <= 180:
+        query = query.where(Market.longitude.between(west, east))
+    nearest = []
+    for row in db.execute(query):
+        distance = geo.distance_km(latitude, longitude, row.latitude, row.longitude)
+        if distance <= radius_km:
+            nearest.append((distance, row.id))
+    nearest = heapq.nsmallest(limit, nearest)
+    rows = get_markets_by_ids(db, [market_id for _, market_id in nearest])
+    return [
+        {**rows[market_id], "distance_km": round(distance, 3)}
+        for distance, market_id in nearest
+        if market_id in rows
+    ]
+
+def export_query():
+    """
+    전체 덤프(export.stream)용 쿼리. 내부 색인 컬럼(geohash)은 제외합니다.
+    """
+    return select(*[column for column in Market.__table__.c if column.name != "geohash"]).order_by(Market.id)
 
 def get_market(db: Session, market_id: int):
     return db.query(Market).filter(Market.id == market_id).first()
 
-def delete_market(db: Session, market_id: int):
-    market = db.query(Market).filter(Market.id == market_id).first()
-    if market:
-        db.delete(market)
-        db.commit()
-    return market
+def get_markets_by_ids(db: Session, ids: List[int]) -> Dict[int, Dict]:
+    """
+    여러 게시물을 한 번의 IN 쿼리로 조회해 {id: 행} 으로 반환합니다.
+    """
+    if not ids:
+        return {}
+    rows = db.execute(select(*Market.__table__.c).where(Market.id.in_(ids))).mappings().all()
+    return {row["id"]: row for row in rows}
+
+def list_similar_markets(db: Session, market_id: int, limit: int = 10) -> Optional[List[Dict]]:
+    """
+    미리 계산된 유사 게시물 목록(market_similar)을 게시물 정보와 함께 유사한 순으로 조회합니다.
+    게시물이 없으면 None 을 반환합니다.
+    """
+    rows = db.execute(
+        select(*Market.__table__.c, MarketSimilar.score.label("similarity"))
+        .join(MarketSimilar, MarketSimilar.similar_id == Market.id)
+        .where(MarketSimilar.market_id == market_id)
+        .order_by(MarketSimilar.rank)
+        .limit(limit)
+    ).mappings().all()
+    if not rows and db.scalar(select(Market.id).where(Market.id == market_id)) is None:
+        return None
+    return rows
+
+def delete_market(db: Session, market_id: int, writer_id: int):
+    """
+    소유권 조건을 WHERE 절에 넣은 DELETE 로 게시물을 삭제하고, 삭제된 행의 해시태그와 가격 통계 필드를 돌려받아
+    태그 색인과 가격 통계를 갱신합니다. DELETE ... RETURNING 을 지원하지 않는 방언에서는 기존 값을 먼저 조회합니다.
+    없는 게시물이면 None, 남의 게시물이면 403 입니다.
+    """
+    market_table = Market.__table__
+    target = (market_table.c.id == market_id) & (market_table.c.writer_id == writer_id)
+    columns = (market_table.c.hashtags, *(market_table.c[field] for field in PRICE_FIELDS))
+    if supports_returning(db, "delete"):
+        row = db.execute(delete(market_table).where(target).returning(*columns)).first()
+    else:
+        row = db.execute(select(*columns).where(target).with_for_update()).first()
+        if row is not None:
+            db.execute(delete(market_table).where(target))
+    if row is None:
+        return _market_not_updated(db, market_id)
+    _sync_tags(db, market_id, row.hashtags, None)
+    _sync_prices(db, _price_point(row._mapping), None)
+    db.commit()
+    recommendations.mark_changed([market_id])
+    return row
 
-def list_markets(db: Session, keyword: Optional[str] = None):
+def list_markets(
+    db: Session,
+    keyword: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    match: str = "any",
+):
     query = db.query(Market)
     if keyword:
         query = query.filter(Market.title.contains(keyword) | Market.content.contains(keyword))
+    tags = _normalize_tags(tags)
+    if tags:
+        # 태그 색인(tag, market_id)만으로 후보 게시물 id 를 구합니다
+        tagged = select(MarketTag.market_id).where(MarketTag.tag.in_(tags))
+        if match == "all":
+            tagged = tagged.group_by(MarketTag.market_id).having(
+                func.count(MarketTag.tag) == len(tags)
+            )
+        query = query.filter(Market.id.in_(tagged))
     return query.all()
+
+def list_popular_tags(db: Session, limit: int = 20):
+    return (
+        db.query(TagCount)
+        .filter(TagCount.count > 0)
+        .order_by(TagCount.count.desc(), TagCount.tag)
+        .limit(limit)
+        .all()
+    )
+
+def bulk_create_markets(db: Session, items: List[MarketCreate], writer_id: int) -> List[Dict]:
+    """
+    여러 마켓 게시물을 하나의 트랜잭션에서 생성합니다. 하나라도 실패하면 전체가 롤백됩니다.
+    """
+    markets = []
+    for item in items:
+        item.writer_id = writer_id
+        markets.append(_new_market(item))
+    try:
+        db.add_all(markets)
+        db.flush()
+        _sync_tags_many(db, [(market.id, None, market.hashtags) for market in markets])
+        _sync_prices_many(db, [(None, (market.crop, market.location, market.price)) for market in markets])
+        # 커밋 후에는 객체가 만료되므로 id 를 미리 읽어 둡니다
+        ids = [market.id for market in markets]
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    recommendations.mark_changed(ids)
+    return [
+        {"index": index, "id": market_id, "status": "created"}
+        for index, market_id in enumerate(ids)
+    ]
+
+def _load_owned(db: Session, ids: List[int]):
+    # 소유권 확인과 태그/가격 통계 갱신에 필요한 컬럼만 한 번의 IN 조회로 가져옵니다
+    rows = db.execute(
+        select(Market.id, Market.writer_id, Market.hashtags, Market.crop, Market.location, Market.price)
+        .where(Market.id.in_(ids))
+        .with_for_update()
+    ).all()
+    return {row.id: row for row in rows}
+
+def _check_owner(index: int, market_id: int, row, current_id: int) -> Optional[Dict]:
+    if row is None:
+        return {"index": index, "id": market_id, "status": "not_found", "detail": "게시물을 찾을 수 없습니다."}
+    if row.writer_id != current_id:
+        return {"index": index, "id": market_id, "status": "forbidden", "detail": "권한이 없습니다."}
+    return None
+
+def bulk_update_markets(db: Session, items: List[MarketBulkUpdateItem], current_id: int) -> List[Dict]:
+    """
+    여러 마켓 게시물을 하나의 트랜잭션에서 수정합니다. 항목별 결과를 반환합니다.
+    """
+    rows = _load_owned(db, [item.id for item in items])
+    results, updates, tag_changes, price_changes, changed = [], [], [], [], []
+    for index, item in enumerate(items):
+        row = rows.get(item.id)
+        failure = _check_owner(index, item.id, row, current_id)
+        if failure:
+            results.append(failure)
+            continue
+        values = item.dict(exclude_unset=True)
+        values.update(_locate(values))
+        if "hashtags" in values:
+            tag_changes.append((item.id, row.hashtags, values["hashtags"]))
+        if any(field in values for field in PRICE_FIELDS):
+            old = _price_point(row._mapping)
+            price_changes.append((old, _price_point({**row._mapping, **values})))
+        if len(values) > 1:
+            updates.append(values)
+        if recommendations.affects_features(values):
+            changed.append(item.id)
+        results.append({"index": index, "id": item.id, "status": "updated"})
+    try:
+        if updates:
+            # 기본 키 기준 ORM bulk UPDATE (같은 컬럼 조합끼리 executemany 로 묶임)
+            db.execute(update(Market), updates)
+        _sync_tags_many(db, tag_changes)
+        _sync_prices_many(db, price_changes)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    recommendations.mark_changed(changed)
+    return results
+
+def bulk_delete_markets(db: Session, ids: List[int], current_id: int) -> List[Dict]:
+    """
+    여러 마켓 게시물을 하나의 트랜잭션에서 삭제합니다. 항목별 결과를 반환합니다.
+    """
+    rows = _load_owned(db, ids)
+    results, deletable = [], []
+    for index, market_id in enumerate(ids):
+        failure = _check_owner(index, market_id, rows.get(market_id), current_id)
+        if failure:
+            results.append(failure)
+            continue
+        deletable.append(market_id)
+        results.append({"index": index, "id": market_id, "status": "deleted"})
+    try:
+        if deletable:
+            _sync_tags_many(db, [(market_id, rows[market_id].hashtags, None) for market_id in deletable])
+            db.execute(delete(Market).where(Market.id.in_(deletable)))
+            _sync_prices_many(db, [(_price_point(rows[market_id]._mapping), None) for market_id in deletable])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    recommendations.mark_changed(deletable)
+    return results
@@ -1,12 +1,20 @@
 # app/crud/user.py
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from models.user import User, UserLink
 from schemas.user import UserCreate, UserLinkCreate
 from config import settings
-from passlib.context import CryptContext
-from typing import Dict
+from cache import LRUCache
+import database
+from passlib.context import LazyCryptContext
+from typing import Dict, Iterable
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 해시 백엔드는 첫 해시/검증 때 불러옵니다 (임포트 시간 단축)
+pwd_context = LazyCryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# user_id -> {"id", "name", "avatar"}. update_user 에서 무효화합니다. 캐시는 워커 프로세스마다 있으므로 다른 워커의
+# 무효화는 USER_PROFILE_CACHE_TTL_SECONDS 가 지나야 반영됩니다
+profile_cache = LRUCache("user_profile", settings.USER_PROFILE_CACHE_SIZE, settings.USER_PROFILE_CACHE_TTL_SECONDS)
 
 
 def get_user_by_email(db: Session, email: str):
@@ -16,6 +24,34 @@ def get_user_by_id(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
 
 
+def get_user_profiles(db: Session, user_ids: Iterable[int]) -> Dict[int, Dict]:
+    """
+    여러 사용자의 공개 프로필(id, name, avatar)을 {user_id: 프로필} 로 반환합니다.
+    캐시에 없는 사용자만 IN (...) 쿼리 한 번으로 읽고, 존재하지 않는 id 는 결과에서 빠집니다.
+    캐시에 넣을 값은 항상 primary 에서 읽습니다. 지연된 replica 에서 읽으면 update_user 가 무효화한 직후의
+    옛 이름/아바타가 다시 캐시되어 TTL 동안 남기 때문입니다.
+    """
+    user_ids = set(user_ids)
+    profiles = profile_cache.get_many(user_ids)
+    missing = user_ids - profiles.keys()
+    if missing:
+        generation = profile_cache.generation
+        query = select(User.id, User.name, User.avatar).where(User.id.in_(missing))
+        if db.get_bind() is database.engine:
+            rows = db.execute(query).all()
+        else:
+            with database.SessionLocal() as primary:
+                rows = primary.execute(query).all()
+        loaded = {row.id: {"id": row.id, "name": row.name, "avatar": row.avatar} for row in rows}
+        profile_cache.set_many(loaded, generation=generation)
+        profiles.update(loaded)
+    return profiles
+
+
+def get_user_profile(db: Session, user_id: int):
+    return get_user_profiles(db, [user_id]).get(user_id)
+
+
 def create_user(db: Session, user: UserCreate):
     hashed_password = pwd_context.hash(user.password)
     db_user = User(email=user.email, name=user.name, password=hashed_password)
@@ -31,6 +67,7 @@ def update_user(db: Session, user_id: int, update_data: Dict):
     for key, value in update_data.items():
         setattr(user, key, value)
     db.commit()
+    profile_cache.invalidate(user_id)
     db.refresh(user)
     return user
 
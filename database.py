@@ -1,14 +1,45 @@
 # app/database.py
-from sqlalchemy import create_engine
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from fastapi import Request
+from sqlalchemy import create_engine, event, func, insert
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
+import metrics
 
 # Database connection
 engine = create_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Read replica connection (설정된 경우에만)
+replica_engine = (
+    create_engine(settings.replica_database_url, pool_pre_ping=True)
+    if settings.replica_database_url
+    else None
+)
+ReplicaSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    if replica_engine is not None
+    else None
+)
+
+if replica_engine is not None and replica_engine.dialect.name == "mysql":
+    @event.listens_for(replica_engine, "connect")
+    def _set_read_only(dbapi_connection, connection_record):
+        # replica 세션에서 실수로 쓰기가 실행되지 않도록 막습니다
+        cursor = dbapi_connection.cursor()
+        cursor.execute("SET SESSION TRANSACTION READ ONLY")
+        cursor.close()
+
+DB_READ_ROUTING = metrics.REGISTRY.counter("db_read_routing_total", "Read-only sessions handed out, by target database.")
+
+STICKY_COOKIE = "plkit_primary_until"
+
 
 def get_db():
     db = SessionLocal()
@@ -16,3 +47,181 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+class ReplicaLagMonitor:
+    """
+    replica 의 복제 지연을 주기적으로(최대 interval 초마다 한 번) 확인해 캐시합니다.
+    MySQL 이 아닌 방언은 지연 측정을 지원하지 않으므로 지연 0 으로 간주합니다.
+    """
+
+    def __init__(self, engine, max_lag: float, interval: float):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.interval = interval
+        self.lag: Optional[float] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def measure(self) -> Optional[float]:
+        if self.engine.dialect.name != "mysql":
+            return 0.0
+        try:
+            with self.engine.connect() as conn:
+                try:
+                    row = conn.exec_driver_sql("SHOW REPLICA STATUS").mappings().first()
+                except Exception:
+                    # MySQL 8.0.22 이전
+                    row = conn.exec_driver_sql("SHOW SLAVE STATUS").mappings().first()
+        except Exception:
+            return None
+        if row is None:
+            return None
+        lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+        return float(lag) if lag is not None else None
+
+    def healthy(self) -> bool:
+        now = time.monotonic()
+        # 다른 스레드가 측정 중이면 기다리지 않고 마지막 값을 씁니다
+        if now - self._checked_at >= self.interval and self._lock.acquire(blocking=False):
+            try:
+                self.lag = self.measure()
+                self._checked_at = time.monotonic()
+            finally:
+                self._lock.release()
+        return self.lag is not None and self.lag <= self.max_lag
+
+
+replica_monitor = (
+    ReplicaLagMonitor(replica_engine, settings.REPLICA_MAX_LAG_SECONDS, settings.REPLICA_LAG_CHECK_INTERVAL)
+    if replica_engine is not None
+    else None
+)
+
+# 쿠키를 보내지 않는 클라이언트를 위해 인증 토큰 기준으로도 sticky 기간을 기억합니다 (프로세스 단위)
+_sticky_clients: Dict[str, float] = {}
+_sticky_lock = threading.Lock()
+
+
+def _client_key(authorization: Optional[str]) -> Optional[str]:
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode()).hexdigest()
+
+
+def _is_sticky(request: Request) -> bool:
+    now = time.time()
+    try:
+        if float(request.cookies.get(STICKY_COOKIE, 0)) > now:
+            return True
+    except ValueError:
+        pass
+    key = _client_key(request.headers.get("authorization"))
+    return key is not None and _sticky_clients.get(key, 0) > now
+
+
+def get_read_session_factory(request: Request):
+    """
+    읽기 전용 엔드포인트용 세션 팩토리. replica 가 설정되어 있고, 복제 지연이 허용 범위이며,
+    이 클라이언트가 최근에 쓰기를 하지 않았으면 replica 를, 아니면 primary 를 사용합니다.
+    (스트리밍 응답처럼 요청 의존성보다 오래 사는 세션이 필요할 때 직접 씁니다)
+    """
+    use_replica = (
+        ReplicaSessionLocal is not None
+        and not _is_sticky(request)
+        and replica_monitor.healthy()
+    )
+    DB_READ_ROUTING.inc(target="replica" if use_replica else "primary")
+    return ReplicaSessionLocal if use_replica else SessionLocal
+
+
+def get_read_db(request: Request):
+    """
+    읽기 전용 엔드포인트용 세션. (get_read_session_factory 참고)
+    """
+    db = get_read_session_factory(request)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class StickyPrimaryMiddleware:
+    """
+    성공한 쓰기 요청(GET/HEAD/OPTIONS 외) 뒤 STICKY_PRIMARY_SECONDS 동안 같은 클라이언트의 읽기를
+    primary 로 보내도록 쿠키를 설정하고 인증 토큰을 기억합니다. (자신이 쓴 데이터를 바로 읽을 수 있게)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or replica_engine is None or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + settings.STICKY_PRIMARY_SECONDS
+                cookie = (
+                    f"{STICKY_COOKIE}={until:.3f}; Max-Age={int(settings.STICKY_PRIMARY_SECONDS)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+                authorization = dict(scope["headers"]).get(b"authorization")
+                key = _client_key(authorization.decode("latin-1") if authorization else None)
+                if key is not None:
+                    with _sticky_lock:
+                        _sticky_clients[key] = until
+                        if len(_sticky_clients) > 10000:
+                            now = time.time()
+                            for stale in [k for k, v in _sticky_clients.items() if v <= now]:
+                                del _sticky_clients[stale]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def supports_returning(db, statement: str) -> bool:
+    """
+    현재 세션의 DB 방언이 `statement`("insert" / "update" / "delete") 의 RETURNING 을 지원하는지 반환합니다.
+    (SQLite 3.35+, MariaDB DELETE 등은 지원하고 MySQL 은 지원하지 않습니다)
+    """
+    return bool(getattr(db.get_bind().dialect, f"{statement}_returning", False))
+
+
+def upsert(db, table, rows: List[Dict], on_conflict: Callable[[object], Dict]):
+    """
+    rows 를 넣고, 기본 키가 이미 있는 행은 on_conflict(새 값) 이 돌려준 컬럼 값으로 갱신하는 문장을 실행합니다.
+    on_conflict 에 넘기는 `새 값` 은 MySQL 의 VALUES(...) / SQLite·PostgreSQL 의 excluded 에 해당합니다.
+    다른 트랜잭션이 같은 키의 첫 행을 먼저 넣어도 IntegrityError 없이 합쳐집니다. 커밋은 호출자가 합니다.
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        statement = mysql.insert(table).values(rows)
+        statement = statement.on_duplicate_key_update(**on_conflict(statement.inserted))
+    elif dialect in ("sqlite", "postgresql"):
+        statement = (sqlite if dialect == "sqlite" else postgresql).insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(table.primary_key.columns), set_=on_conflict(statement.excluded)
+        )
+    else:
+        statement = insert(table).values(rows)
+    db.execute(statement)
+
+
+
+def least(db, *values):
+    # SQLite 는 LEAST/GREATEST 대신 여러 인자를 받는 min()/max() 를 씁니다
+    return (func.min if db.get_bind().dialect.name == "sqlite" else func.least)(*values)
+
+
+def greatest(db, *values):
+    return (func.max if db.get_bind().dialect.name == "sqlite" else func.greatest)(*values)
+
+
+def char_length(db, value):
+    # MySQL 의 LENGTH() 는 바이트 수이므로 글자 수는 CHAR_LENGTH() 로 셉니다 (SQLite 의 length() 는 글자 수)
+    return (func.length if db.get_bind().dialect.name == "sqlite" else func.char_length)(value)
@@ -0,0 +1,197 @@
+# app/devices.py
+"""
+ESP32 장치와의 양방향 WebSocket 채널 (/statuses/devices/{device_id}/ws).
+
+장치는 연결을 유지한 채 센서 데이터를 올려 보내고, 대시보드가 보낸 제어 명령은 같은 연결로 바로 내려갑니다.
+장치가 GET /statuses/data 를 주기적으로 폴링할 필요가 없습니다. 메시지는 모두 JSON 텍스트 프레임입니다.
+
+서버 -> 장치
+- {"type": "hello", "epoch": "...", "ack": n}: 연결 직후. epoch 는 서버 프로세스마다 바뀌며, 바뀌면 장치는
+  마지막으로 적용한 명령 seq 를 0 으로 되돌립니다. ack 는 서버가 마지막으로 받은 업링크 seq 입니다.
+- {"type": "control", "seq": n, "controls": {...}}: 제어 명령. seq 는 장치마다 1 씩 증가합니다.
+- {"type": "ack", "seq": n}: 업링크 데이터 수신 확인.
+
+장치 -> 서버
+- {"type": "data", "seq": n, "sensors": {...}, "controls": {...}}: 센서/제어 상태. 장치별 상태 저장소(sensor_state)에
+  저장하고 ack 로 답합니다. 저장할 수 없으면(크기 초과 등) {"type": "error", "seq": n, "detail": "..."} 로 답합니다.
+  seq 는 1 부터 1 씩 늘립니다. 이미 확인된 seq 이하의 프레임(재전송)은 저장하지 않고 ack 만 다시 보내며,
+  재부팅한 장치는 seq 1 부터 다시 시작하면 됩니다.
+- {"type": "ack", "seq": n}: 누적 확인. seq 이하의 명령을 모두 적용했다는 뜻입니다.
+
+확인되지 않은 명령은 DEVICE_ACK_TIMEOUT_SECONDS 마다, 그리고 재연결 시 순서대로 다시 보냅니다.
+장치는 이미 적용한 seq 이하의 명령을 무시하면 됩니다. 장치마다 최대 DEVICE_PENDING_LIMIT 개까지 보관하고
+넘으면 가장 오래된 명령부터 버립니다.
+
+채널 상태는 워커 프로세스 메모리에 있으므로, 워커가 여러 개면 장치 연결과 제어 명령 요청이
+같은 워커로 가도록 device_id 기준으로 라우팅해야 합니다. 서버가 재시작(재배포)될 때는 연결을
+1012(Service Restart) 로 닫으므로, 장치는 잠시 뒤 다시 연결하고 새 epoch 의 hello 를 받으면 됩니다.
+"""
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from fastapi import WebSocket
+
+import metrics
+from config import settings
+
+# 라벨 카디널리티를 제한하기 위해 장치별 경로 대신 라우트 템플릿을 씁니다
+WS_PATH = "/statuses/devices/{device_id}/ws"
+
+DEVICE_COMMANDS = metrics.REGISTRY.counter(
+    "device_commands_total", "Device control commands, by result (sent, queued, retransmitted, acked, dropped)."
+)
+DEVICE_ACK_LATENCY = metrics.REGISTRY.histogram(
+    "device_command_ack_seconds", "Time from a control command being issued to the device acknowledging it."
+)
+
+
+@dataclass
+class Command:
+    seq: int
+    controls: Dict[str, Any]
+    created_at: float
+    sent_at: Optional[float] = None
+    acked_at: Optional[float] = None
+    acked: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def status(self) -> str:
+        if self.acked_at is not None:
+            return "acked"
+        return "sent" if self.sent_at is not None else "queued"
+
+    def message(self) -> str:
+        return json.dumps({"type": "control", "seq": self.seq, "controls": self.controls}, ensure_ascii=False)
+
+
+class DeviceChannel:
+    """
+    장치 하나의 연결과 명령 상태. 이벤트 루프 안에서만 사용합니다.
+    """
+
+    def __init__(self, device_id: str):
+        self.device_id = device_id
+        self.websocket: Optional[WebSocket] = None
+        self.last_seq = 0  # 마지막으로 발급한 명령 seq
+        self.last_uplink_seq = 0
+        self.pending: "OrderedDict[int, Command]" = OrderedDict()
+        self.connected_at: Optional[float] = None
+        self.last_seen: Optional[float] = None
+        # 명령 전송과 재전송, 업링크 ack 가 같은 소켓에 동시에 쓰지 않도록 합니다
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, text: str) -> bool:
+        websocket = self.websocket
+        if websocket is None:
+            return False
+        async with self._send_lock:
+            try:
+                await websocket.send_text(text)
+            except Exception:
+                # 끊긴 연결. 수신 루프가 detach 하고, 명령은 재연결 때 다시 보냅니다
+                return False
+        metrics.WS_FRAMES.inc(path=WS_PATH, direction="out")
+        metrics.WS_BYTES.inc(len(text), path=WS_PATH, direction="out")
+        return True
+
+    async def deliver(self, command: Command, retransmit: bool = False):
+        if await self.send(command.message()):
+            command.sent_at = time.time()
+            DEVICE_COMMANDS.inc(result="retransmitted" if retransmit else "sent")
+
+    async def resend_due(self):
+        """
+        보낸 지 DEVICE_ACK_TIMEOUT_SECONDS 가 지나도록 확인되지 않은 명령을 순서대로 다시 보냅니다.
+        """
+        deadline = time.time() - settings.DEVICE_ACK_TIMEOUT_SECONDS
+        for command in list(self.pending.values()):
+            if command.sent_at is None or command.sent_at <= deadline:
+                await self.deliver(command, retransmit=command.sent_at is not None)
+
+    def ack(self, seq: int):
+        now = time.time()
+        while self.pending:
+            first = next(iter(self.pending))
+            if first > seq:
+                break
+            command = self.pending.pop(first)
+            command.acked_at = now
+            command.acked.set()
+            DEVICE_COMMANDS.inc(result="acked")
+            DEVICE_ACK_LATENCY.observe(now - command.created_at)
+
+
+class DeviceHub:
+    """
+    장치 id -> DeviceChannel. 한 장치는 연결을 하나만 가지며, 새로 연결하면 이전 연결을 닫습니다.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.channels: Dict[str, DeviceChannel] = {}
+
+    def channel(self, device_id: str) -> DeviceChannel:
+        channel = self.channels.get(device_id)
+        if channel is None:
+            channel = self.channels[device_id] = DeviceChannel(device_id)
+        return channel
+
+    async def attach(self, device_id: str, websocket: WebSocket) -> DeviceChannel:
+        channel = self.channel(device_id)
+        previous = channel.websocket
+        channel.websocket = websocket
+        channel.connected_at = channel.last_seen = time.time()
+        metrics.WS_CONNECTIONS.inc(path=WS_PATH)
+        if previous is not None:
+            try:
+                await previous.close(code=4000, reason="replaced by a new connection")
+            except Exception:
+                pass
+        await channel.send(json.dumps({"type": "hello", "epoch": self.epoch, "ack": channel.last_uplink_seq}))
+        for command in list(channel.pending.values()):
+            await channel.deliver(command, retransmit=command.sent_at is not None)
+        return channel
+
+    def detach(self, channel: DeviceChannel, websocket: WebSocket):
+        metrics.WS_CONNECTIONS.dec(path=WS_PATH)
+        if channel.websocket is websocket:
+            channel.websocket = None
+            channel.connected_at = None
+
+    async def command(self, device_id: str, controls: Dict[str, Any]) -> Command:
+        """
+        제어 명령을 발급합니다. 장치가 연결되어 있으면 바로 보내고, 아니면 연결될 때 보냅니다.
+        """
+        channel = self.channel(device_id)
+        channel.last_seq += 1
+        command = Command(seq=channel.last_seq, controls=controls, created_at=time.time())
+        channel.pending[command.seq] = command
+        while len(channel.pending) > settings.DEVICE_PENDING_LIMIT:
+            channel.pending.popitem(last=False)
+            DEVICE_COMMANDS.inc(result="dropped")
+        await channel.deliver(command)
+        if command.sent_at is None:
+            DEVICE_COMMANDS.inc(result="queued")
+        return command
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "device_id": channel.device_id,
+                "connected": channel.websocket is not None,
+                "connected_at": channel.connected_at,
+                "last_seen": channel.last_seen,
+                "last_seq": channel.last_seq,
+                "last_uplink_seq": channel.last_uplink_seq,
+                "pending": len(channel.pending),
+            }
+            for channel in self.channels.values()
+        ]
+
+
+hub = DeviceHub()
@@ -0,0 +1,120 @@
+# app/export.py
+"""
+마켓/커뮤니티 전체 덤프를 NDJSON 또는 CSV 로 스트리밍합니다.
+
+행은 서버 측 커서(stream_results + yield_per)로 EXPORT_BATCH_SIZE 개씩 읽고, 배치마다 인코딩해 바로 보냅니다.
+메모리 사용량은 전체 행 수와 무관하게 배치 하나 크기로 일정하고, 첫 배치를 읽자마자 응답이 시작됩니다.
+gzip 옵션은 zlib 스트림 압축기로 배치 단위로 압축합니다.
+
+StreamingResponse 의 본문은 요청 의존성(get_read_db)이 닫힌 뒤에 소비되므로 제너레이터가 세션을 직접 엽니다.
+동기 제너레이터라 Starlette 가 스레드풀에서 돌리므로 DB 읽기가 이벤트 루프를 막지 않습니다.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Callable, Iterable, Iterator, List, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+import metrics
+from config import settings
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+
+EXPORT_ROWS = metrics.REGISTRY.counter("export_rows_total", "Rows streamed by export endpoints, by kind and format.")
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _ndjson(columns: Sequence[str], batches: Iterable[List[Sequence]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_default) + "\n" for row in batch
+        ).encode()
+
+
+def _csv_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv(columns: Sequence[str], batches: Iterable[List[Sequence]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+ENCODERS = {"ndjson": _ndjson, "csv": _csv}
+
+
+def _gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(settings.EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31 = gzip 헤더
+    for chunk in chunks:
+        # 배치마다 flush 해서 압축기가 데이터를 붙잡고 있지 않게 합니다
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _batches(session_factory: Callable[[], Session], query: Select, batch_size: int, counter: dict) -> Iterator[List[Sequence]]:
+    db = session_factory()
+    try:
+        result = db.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+        for partition in result.partitions():
+            counter["rows"] += len(partition)
+            yield partition
+    finally:
+        db.close()
+
+
+def stream(
+    session_factory: Callable[[], Session],
+    query: Select,
+    kind: str,
+    format: str,
+    gzip: bool = False,
+) -> StreamingResponse:
+    """
+    query 결과를 format("ndjson" / "csv") 으로 스트리밍하는 응답을 만듭니다. gzip 이면 .gz 파일로 내려줍니다.
+    """
+    media_type, extension = FORMATS[format]
+    columns = [column.name for column in query.selected_columns]
+    counter = {"rows": 0}
+
+    def body() -> Iterator[bytes]:
+        try:
+            chunks = ENCODERS[format](columns, _batches(session_factory, query, settings.EXPORT_BATCH_SIZE, counter))
+            yield from _gzip(chunks) if gzip else chunks
+        finally:
+            EXPORT_ROWS.inc(counter["rows"], kind=kind, format=format)
+
+    filename = f"{kind}.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", filename + ".gz"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,281 @@
+# app/geo.py
+"""
+마켓 위치 검색용 좌표 유틸리티.
+
+- 외부 지오코딩 서비스 없이 시/도, 시/군 중심 좌표 표(REGIONS)로 market.location 문자열을 좌표로 바꿉니다.
+- 좌표는 geohash(GEOHASH_PRECISION 자리)로 market.geohash 에 저장합니다. geohash 는 앞자리가 같으면
+  같은 격자 칸이므로, 반경 검색은 주변 칸들의 접두사 범위(geohash >= 칸, geohash < 칸 + "~")를 인덱스로 읽은 뒤
+  정확한 거리로 거릅니다.
+
+마이그레이션 적용 후 기존 게시물의 좌표를 한 번 채워야 합니다.
+
+    python -m geo
+"""
+import math
+from typing import Dict, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+
+GEOHASH_PRECISION = 9  # 약 4.8m x 4.8m
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# 시/도 (약칭 포함). 시/군 표에서 찾지 못했을 때 사용합니다
+PROVINCES: Dict[str, Tuple[float, float]] = {
+    "서울": (37.5665, 126.9780),
+    "부산": (35.1796, 129.0756),
+    "대구": (35.8714, 128.6014),
+    "인천": (37.4563, 126.7052),
+    "광주": (35.1595, 126.8526),
+    "대전": (36.3504, 127.3845),
+    "울산": (35.5384, 129.3114),
+    "세종": (36.4800, 127.2890),
+    "경기": (37.4138, 127.5183),
+    "강원": (37.8228, 128.1555),
+    "충북": (36.8000, 127.7000),
+    "충청북도": (36.8000, 127.7000),
+    "충남": (36.5184, 126.8000),
+    "충청남도": (36.5184, 126.8000),
+    "전북": (35.7175, 127.1530),
+    "전라북도": (35.7175, 127.1530),
+    "전남": (34.8679, 126.9910),
+    "전라남도": (34.8679, 126.9910),
+    "경북": (36.4919, 128.8889),
+    "경상북도": (36.4919, 128.8889),
+    "경남": (35.4606, 128.2132),
+    "경상남도": (35.4606, 128.2132),
+    "제주": (33.4890, 126.4983),
+}
+
+# 시/군 (시청/군청 좌표). 여러 도에 같은 이름이 있는 곳은 QUALIFIED 에만 둡니다
+CITIES: Dict[str, Tuple[float, float]] = {
+    # 경기
+    "수원": (37.2636, 127.0286), "성남": (37.4200, 127.1265), "고양": (37.6584, 126.8320),
+    "용인": (37.2411, 127.1776), "부천": (37.5034, 126.7660), "안산": (37.3219, 126.8309),
+    "안양": (37.3943, 126.9568), "남양주": (37.6360, 127.2165), "화성": (37.1995, 126.8312),
+    "평택": (36.9921, 127.1129), "의정부": (37.7381, 127.0337), "시흥": (37.3800, 126.8030),
+    "파주": (37.7600, 126.7800), "김포": (37.6153, 126.7156), "광명": (37.4786, 126.8646),
+    "군포": (37.3617, 126.9352), "하남": (37.5393, 127.2149), "오산": (37.1498, 127.0772),
+    "이천": (37.2720, 127.4350), "안성": (37.0080, 127.2797), "의왕": (37.3447, 126.9683),
+    "양주": (37.7853, 127.0458), "포천": (37.8949, 127.2003), "여주": (37.2983, 127.6370),
+    "동두천": (37.9036, 127.0606), "과천": (37.4292, 126.9876), "구리": (37.5943, 127.1296),
+    "가평": (37.8315, 127.5105), "양평": (37.4918, 127.4876), "연천": (38.0966, 127.0748),
+    # 강원
+    "춘천": (37.8813, 127.7298), "원주": (37.3422, 127.9202), "강릉": (37.7519, 128.8761),
+    "동해": (37.5247, 129.1143), "속초": (38.2070, 128.5918), "삼척": (37.4500, 129.1650),
+    "태백": (37.1641, 128.9856), "홍천": (37.6970, 127.8888), "횡성": (37.4918, 127.9850),
+    "평창": (37.3705, 128.3903), "정선": (37.3806, 128.6609), "철원": (38.1467, 127.3133),
+    "화천": (38.1062, 127.7082), "양구": (38.1100, 127.9896), "인제": (38.0697, 128.1707),
+    "영월": (37.1837, 128.4617), "양양": (38.0754, 128.6190),
+    # 충북
+    "청주": (36.6424, 127.4890), "충주": (36.9910, 127.9259), "제천": (37.1326, 128.1909),
+    "보은": (36.4894, 127.7295), "옥천": (36.3064, 127.5713), "영동": (36.1750, 127.7764),
+    "진천": (36.8553, 127.4356), "괴산": (36.8153, 127.7867), "음성": (36.9403, 127.6905),
+    "단양": (36.9845, 128.3655), "증평": (36.7853, 127.5814),
+    # 충남
+    "천안": (36.8151, 127.1139), "공주": (36.4465, 127.1190), "보령": (36.3333, 126.6127),
+    "아산": (36.7898, 127.0019), "서산": (36.7845, 126.4503), "논산": (36.1872, 127.0987),
+    "계룡": (36.2745, 127.2489), "당진": (36.8898, 126.6459), "금산": (36.1089, 127.4881),
+    "부여": (36.2757, 126.9098), "서천": (36.0803, 126.6919), "청양": (36.4591, 126.8024),
+    "홍성": (36.6013, 126.6608), "예산": (36.6826, 126.8450), "태안": (36.7456, 126.2980),
+    # 전북
+    "전주": (35.8242, 127.1480), "군산": (35.9676, 126.7366), "익산": (35.9483, 126.9577),
+    "정읍": (35.5699, 126.8560), "남원": (35.4164, 127.3904), "김제": (35.8036, 126.8809),
+    "완주": (35.9046, 127.1621), "진안": (35.7917, 127.4249), "무주": (36.0068, 127.6608),
+    "장수": (35.6474, 127.5211), "임실": (35.6178, 127.2890), "순창": (35.3744, 127.1374),
+    "고창": (35.4358, 126.7020), "부안": (35.7318, 126.7335),
+    # 전남
+    "목포": (34.8118, 126.3922), "여수": (34.7604, 127.6622), "순천": (34.9507, 127.4872),
+    "나주": (35.0160, 126.7108), "광양": (34.9407, 127.6959), "담양": (35.3211, 126.9882),
+    "곡성": (35.2819, 127.2920), "구례": (35.2025, 127.4627), "고흥": (34.6111, 127.2855),
+    "보성": (34.7715, 127.0800), "화순": (35.0646, 126.9865), "장흥": (34.6817, 126.9070),
+    "강진": (34.6420, 126.7672), "해남": (34.5733, 126.5993), "영암": (34.8002, 126.6968),
+    "무안": (34.9904, 126.4817), "함평": (35.0660, 126.5166), "영광": (35.2772, 126.5120),
+    "장성": (35.3018, 126.7849), "완도": (34.3110, 126.7550), "진도": (34.4868, 126.2635),
+    "신안": (34.8335, 126.3512),
+    # 경북
+    "포항": (36.0190, 129.3435), "경주": (35.8562, 129.2247), "김천": (36.1398, 128.1136),
+    "안동": (36.5684, 128.7294), "구미": (36.1195, 128.3446), "영주": (36.8057, 128.6241),
+    "영천": (35.9733, 128.9386), "상주": (36.4109, 128.1590), "문경": (36.5865, 128.1867),
+    "경산": (35.8251, 128.7414), "의성": (36.3527, 128.6971), "청송": (36.4360, 129.0571),
+    "영양": (36.6667, 129.1124), "영덕": (36.4150, 129.3653), "청도": (35.6474, 128.7341),
+    "고령": (35.7261, 128.2629), "성주": (35.9192, 128.2829), "칠곡": (35.9956, 128.4017),
+    "예천": (36.6578, 128.4528), "봉화": (36.8932, 128.7324), "울진": (36.9930, 129.4004),
+    "울릉": (37.4844, 130.9057),
+    # 경남
+    "창원": (35.2281, 128.6811), "진주": (35.1800, 128.1076), "통영": (34.8544, 128.4332),
+    "사천": (35.0037, 128.0642), "김해": (35.2285, 128.8894), "밀양": (35.5037, 128.7467),
+    "거제": (34.8806, 128.6211), "양산": (35.3350, 129.0378), "의령": (35.3222, 128.2617),
+    "함안": (35.2725, 128.4065), "창녕": (35.5444, 128.4923), "남해": (34.8377, 127.8925),
+    "하동": (35.0674, 127.7513), "산청": (35.4155, 127.8734), "함양": (35.5205, 127.7251),
+    "거창": (35.6867, 127.9095), "합천": (35.5666, 128.1659),
+    # 제주
+    "서귀포": (33.2541, 126.5601),
+}
+
+# 도 이름을 붙여야 구분되는 시/군 (공백을 뺀 문자열과 비교)
+QUALIFIED: Dict[str, Tuple[float, float]] = {
+    "경기광주": (37.4292, 127.2550),
+    "경기도광주": (37.4292, 127.2550),
+    "강원고성": (38.3806, 128.4679),
+    "강원도고성": (38.3806, 128.4679),
+    "경남고성": (34.9730, 128.3223),
+    "경상남도고성": (34.9730, 128.3223),
+}
+
+_CITY_NAMES = sorted(CITIES, key=len, reverse=True)
+_PROVINCE_NAMES = sorted(PROVINCES, key=len, reverse=True)
+_QUALIFIED_NAMES = sorted(QUALIFIED, key=len, reverse=True)
+
+
+def geocode(location: Optional[str]) -> Optional[Tuple[float, float]]:
+    """
+    자유 입력 지역 문자열(예: "경기 수원시 영통구")을 가장 구체적인 지역의 중심 좌표로 바꿉니다. 모르면 None.
+    """
+    if not location:
+        return None
+    compact = location.replace(" ", "")
+    for name in _QUALIFIED_NAMES:
+        if name in compact:
+            return QUALIFIED[name]
+    # 시/군 이름은 원문에서 찾습니다 ("전남 해남" 이 "남해" 로 잡히지 않도록)
+    for name in _CITY_NAMES:
+        if name in location:
+            return CITIES[name]
+    for name in _PROVINCE_NAMES:
+        if name in compact:
+            return PROVINCES[name]
+    return None
+
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        target, span = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (span[0] + span[1]) / 2
+        value <<= 1
+        if target >= mid:
+            value |= 1
+            span[0] = mid
+        else:
+            span[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """
+    precision 자리 geohash 칸의 (위도 높이, 경도 너비) 도 단위 크기.
+    """
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    두 좌표 사이의 대원 거리 (haversine).
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    반경 radius_km 원을 감싸는 (남, 북, 서, 동) 경계. 극 근처에서는 경도 전체를 씁니다.
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = max(-90.0, latitude - dlat), min(90.0, latitude + dlat)
+    widest = max(abs(south), abs(north))
+    if widest >= 89.9:
+        return south, north, -180.0, 180.0
+    dlon = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(widest))))
+    if dlon >= 180:
+        return south, north, -180.0, 180.0
+    return south, north, longitude - dlon, longitude + dlon
+
+
+def covering_cells(latitude: float, longitude: float, radius_km: float, max_cells: int) -> List[str]:
+    """
+    반경 검색의 경계 상자를 덮는 geohash 칸 목록. 칸 수가 max_cells 이하인 가장 작은 칸 크기를 고릅니다.
+    """
+    south, north, west, east = bounding_box(latitude, longitude, radius_km)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        first_row = math.floor((south + 90) / height)
+        last_row = min(math.floor((north + 90) / height), round(180 / height) - 1)
+        first_col = math.floor((west + 180) / width)
+        last_col = math.floor((east + 180) / width)
+        columns = round(360 / width)
+        if last_col - first_col + 1 > columns:
+            first_col, last_col = 0, columns - 1
+        if (last_row - first_row + 1) * (last_col - first_col + 1) <= max_cells or precision == 1:
+            break
+    cells = set()
+    for row in range(first_row, last_row + 1):
+        center_lat = -90 + (row + 0.5) * height
+        for col in range(first_col, last_col + 1):
+            center_lon = -180 + ((col % columns) + 0.5) * width
+            cells.add(encode(center_lat, center_lon, precision))
+    return sorted(cells)
+
+
+def locate(latitude: Optional[float], longitude: Optional[float]) -> Optional[str]:
+    if latitude is None or longitude is None:
+        return None
+    return encode(latitude, longitude)
+
+
+def backfill(db, batch_size: int = 1000) -> Dict[str, int]:
+    """
+    좌표가 없는 게시물을 location 으로 지오코딩하고, geohash 가 빠진 게시물을 채웁니다. id 순으로 한 번 훑습니다.
+    """
+    from sqlalchemy import select, update
+    from models.market import Market
+
+    last_id, scanned, located = 0, 0, 0
+    while True:
+        rows = db.execute(
+            select(Market.id, Market.location, Market.latitude, Market.longitude)
+            .where(Market.id > last_id, Market.geohash.is_(None))
+            .order_by(Market.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            point = (row.latitude, row.longitude)
+            if None in point:
+                point = geocode(row.location)
+            if point is not None:
+                updates.append({"id": row.id, "latitude": point[0], "longitude": point[1], "geohash": encode(*point)})
+        if updates:
+            db.execute(update(Market), updates)
+        db.commit()
+        scanned += len(rows)
+        located += len(updates)
+        last_id = rows[-1].id
+    return {"scanned": scanned, "located": located}
+
+
+def main():
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(backfill(db))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# app/images.py
+"""
+업로드 이미지의 크기별 파생본(thumb / medium).
+
+- 파생본은 uploads/derivatives/<업로드 디렉터리>/<원본 이름>.<size>.<webp|jpg> 에 저장하고 계속 재사용합니다.
+  원본 파일 이름이 업로드마다 새 uuid 이므로 파생본은 바뀌지 않고, 응답에 immutable 캐시 헤더를 붙입니다.
+- 업로드 후 작업 큐(tasks.make_derivatives)가 WebP 파생본을 미리 만듭니다. 아직 없거나 WebP 를 받지 않는
+  클라이언트용 JPEG 이 필요하면 첫 요청 때 스레드풀에서 만들고(IMAGE_RENDER_CONCURRENCY 개까지 동시에) 저장합니다.
+- JPEG 원본은 draft 모드로 디코딩 단계에서 줄여 읽으므로 큰 사진도 빠르게 줄일 수 있습니다.
+"""
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import FileResponse
+from PIL import Image, ImageOps, UnidentifiedImageError
+from starlette.concurrency import run_in_threadpool
+
+import metrics
+from config import settings
+
+DERIVATIVE_ROOT = Path("uploads/derivatives")
+
+# size -> 긴 변 최대 픽셀
+SIZES: Dict[str, int] = {"thumb": settings.IMAGE_THUMB_SIZE, "medium": settings.IMAGE_MEDIUM_SIZE}
+# format -> (Pillow 형식, 확장자, media type)
+FORMATS = {
+    "webp": ("WEBP", "webp", "image/webp"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+}
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# 원본을 이미지로 읽을 수 없을 때 Pillow 가 내는 예외
+UNREADABLE = (UnidentifiedImageError, OSError, Image.DecompressionBombError)
+
+IMAGE_RENDERS = metrics.REGISTRY.counter("image_derivative_renders_total", "Image derivatives rendered, by size and format.")
+IMAGE_REQUESTS = metrics.REGISTRY.counter(
+    "image_derivative_requests_total", "Image derivative requests, by size and result (hit, rendered, fallback)."
+)
+
+_render_slots = threading.BoundedSemaphore(settings.IMAGE_RENDER_CONCURRENCY)
+# 같은 파생본을 동시에 두 번 만들지 않도록 경로별 잠금
+_locks: Dict[Path, threading.Lock] = {}
+_locks_lock = threading.Lock()
+
+
+def derivative_path(directory: Path, filename: str, size: str, format: str) -> Path:
+    return DERIVATIVE_ROOT / directory.name / f"{filename}.{size}.{FORMATS[format][1]}"
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    return "webp" if accept and "image/webp" in accept else "jpeg"
+
+
+def _render(source: Path, target: Path, size: str, format: str):
+    limit = SIZES[size]
+    with Image.open(source) as image:
+        image.draft("RGB", (limit, limit))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((limit, limit), Image.Resampling.LANCZOS)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        if format == "jpeg" or not has_alpha:
+            image = image.convert("RGB")
+        elif image.mode != "RGBA":
+            image = image.convert("RGBA")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # 임시 파일에 쓰고 바꿔치기해서 읽는 쪽이 반쯤 쓴 파일을 보지 않게 합니다
+        temporary = target.with_name(f"{target.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            if format == "webp":
+                image.save(temporary, "WEBP", quality=settings.IMAGE_QUALITY, method=4)
+            else:
+                image.save(temporary, "JPEG", quality=settings.IMAGE_QUALITY, optimize=True, progressive=True)
+            os.replace(temporary, target)
+        finally:
+            temporary.unlink(missing_ok=True)
+    IMAGE_RENDERS.inc(size=size, format=format)
+
+
+def ensure(directory: Path, filename: str, size: str, format: str) -> Path:
+    """
+    파생본 경로를 반환합니다. 없으면 만듭니다. 원본이 이미지가 아니면 UnidentifiedImageError 등이 발생합니다.
+    """
+    target = derivative_path(directory, filename, size, format)
+    if target.exists():
+        return target
+    with _locks_lock:
+        lock = _locks.setdefault(target, threading.Lock())
+    try:
+        with lock:
+            if not target.exists():
+                with _render_slots:
+                    _render(directory / filename, target, size, format)
+    finally:
+        with _locks_lock:
+            _locks.pop(target, None)
+    return target
+
+
+def generate(directory: Path, filename: str):
+    """
+    모든 크기의 WebP 파생본을 미리 만듭니다. (업로드 후 작업 큐에서 실행)
+    """
+    for size in SIZES:
+        ensure(directory, filename, size, "webp")
+
+
+def delete_derivatives(directory: Path, filename: str):
+    for size in SIZES:
+        for format in FORMATS:
+            derivative_path(directory, filename, size, format).unlink(missing_ok=True)
+
+
+async def respond(request: Request, directory: Path, filename: str, size: str) -> FileResponse:
+    """
+    size 가 full 이면 원본을, 아니면 Accept 헤더에 맞는 형식의 파생본을 FileResponse 로 반환합니다.
+    원본이 아직 검증되지 않은 이미지가 아닌 파일이면 원본을 그대로 반환합니다.
+    """
+    source = directory / filename
+    if size == "full":
+        return FileResponse(source)
+    format = negotiate_format(request.headers.get("accept"))
+    target = derivative_path(directory, filename, size, format)
+    if target.exists():
+        IMAGE_REQUESTS.inc(size=size, result="hit")
+    else:
+        try:
+            target = await run_in_threadpool(ensure, directory, filename, size, format)
+        except UNREADABLE:
+            IMAGE_REQUESTS.inc(size=size, result="fallback")
+            return FileResponse(source)
+        IMAGE_REQUESTS.inc(size=size, result="rendered")
+    return FileResponse(
+        target,
+        media_type=FORMATS[format][2],
+        headers={"Cache-Control": IMMUTABLE, "Vary": "Accept"},
+    )
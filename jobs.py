@@ -0,0 +1,286 @@
+# app/jobs.py
+"""
+요청 뒤에 처리할 작업을 위한 로컬 백그라운드 작업 큐.
+
+- 작업은 SQLite 파일(JOBS_DB_PATH)에 저장되므로 프로세스가 재시작돼도 사라지지 않고, 외부 브로커가 필요 없습니다.
+  여러 워커 프로세스가 같은 파일을 공유해도 BEGIN IMMEDIATE 로 한 작업을 한 워커만 가져갑니다.
+- 워커 스레드 JOBS_CONCURRENCY 개가 실행 시각(run_at)이 된 작업을 가져와 실행합니다. 가져간 작업은
+  JOBS_LEASE_SECONDS 동안 잠기고, 실행 중에는 heartbeat 스레드가 lease 의 1/3 마다 연장합니다. 프로세스가 죽어
+  연장이 끊긴 작업만 lease 가 끝난 뒤 다른 워커가 다시 가져갑니다.
+- 실패하면 지수 백오프(JOBS_BACKOFF_SECONDS * 2^(시도-1), 최대 JOBS_BACKOFF_MAX_SECONDS, 지터 포함)로
+  다시 시도하고, max_attempts 를 넘기면 status='failed' 로 남겨 둡니다. 마지막 시도 중에 프로세스가 죽은 작업도
+  다시 실행하지 않고 'failed' 로 바꿉니다.
+- 작업이 끝난 직후(삭제 전) 프로세스가 죽으면 같은 작업이 한 번 더 실행될 수 있으므로, 작업 함수는 같은 인자로
+  두 번 실행돼도 결과가 같아야 합니다.
+- 성공한 작업은 바로 지웁니다.
+
+작업 함수는 @register("이름") 으로 등록하고(tasks.py), 라우트에서는 enqueue("이름", 인자=값) 으로 넣습니다.
+"""
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import metrics
+from config import settings
+
+logger = logging.getLogger("plkit.jobs")
+
+JOBS_ENQUEUED = metrics.REGISTRY.counter("jobs_enqueued_total", "Background jobs enqueued, by name.")
+JOBS_FINISHED = metrics.REGISTRY.counter(
+    "jobs_finished_total", "Background job attempts, by name and result (ok, retry, failed)."
+)
+JOBS_DURATION = metrics.REGISTRY.histogram(
+    "jobs_duration_seconds", "Background job run time, by name.", (0.005, 0.025, 0.1, 0.5, 2.5, 10, 60)
+)
+JOBS_WAITING = metrics.REGISTRY.gauge("jobs_waiting", "Background jobs in the queue, by status.")
+
+_handlers: Dict[str, Callable[..., Any]] = {}
+_max_attempts: Dict[str, int] = {}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS job (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_job_status_run_at ON job (status, run_at);
+"""
+
+
+def register(name: str, max_attempts: Optional[int] = None):
+    """
+    작업 함수를 이름으로 등록하는 데코레이터. 함수는 enqueue 에 넘긴 키워드 인자를 받습니다.
+    """
+    def decorator(func):
+        _handlers[name] = func
+        _max_attempts[name] = max_attempts or settings.JOBS_MAX_ATTEMPTS
+        return func
+    return decorator
+
+
+class JobQueue:
+    """
+    SQLite 작업 테이블과 워커 스레드 풀. 워커는 start() 또는 첫 enqueue 때 시작됩니다.
+    """
+
+    def __init__(self, path: str, concurrency: int, lease: float, poll_interval: float):
+        self.path = path
+        self.concurrency = concurrency
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._running: Set[int] = set()  # 이 프로세스에서 실행 중인 작업 id (heartbeat 가 lease 를 연장)
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # 스레드마다 연결 하나 (sqlite3 연결은 스레드 간 공유하지 않습니다)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._initialized:
+                conn.executescript(SCHEMA)
+                self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, name: str, delay: float = 0.0, **payload) -> int:
+        if name not in _handlers:
+            _load_tasks()
+        if name not in _handlers:
+            raise ValueError(f"등록되지 않은 작업입니다: {name}")
+        now = time.time()
+        cursor = self._connect().execute(
+            "INSERT INTO job (name, payload, max_attempts, run_at, created_at) VALUES (?, ?, ?, ?, ?)",
+            (name, json.dumps(payload, ensure_ascii=False), _max_attempts[name], now + delay, now),
+        )
+        JOBS_ENQUEUED.inc(name=name)
+        self.start()
+        with self._wake:
+            self._wake.notify()
+        return cursor.lastrowid
+
+    def start(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            _load_tasks()
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name=f"jobs-worker-{i}", daemon=True)
+                for i in range(self.concurrency)
+            ]
+            self._threads.append(threading.Thread(target=self._heartbeat, name="jobs-heartbeat", daemon=True))
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        새 작업을 가져오지 않게 하고 실행 중인 작업이 끝날 때까지 기다립니다. (애플리케이션 종료 시)
+        남은 작업은 파일에 남아 다음 실행 때 처리됩니다.
+        """
+        self._stop.set()
+        with self._wake:
+            self._wake.notify_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except Exception:
+                logger.exception("job claim failed")
+                job = None
+            if job is None:
+                self._update_gauge()
+                with self._wake:
+                    self._wake.wait(self.poll_interval)
+                continue
+            with self._lock:
+                self._running.add(job[0])
+            try:
+                self._execute(*job)
+            finally:
+                with self._lock:
+                    self._running.discard(job[0])
+
+    def _heartbeat(self):
+        # 실행 중인 작업의 lease 를 연장해서, 오래 걸리는 작업을 다른 워커가 중복 실행하지 않게 합니다
+        while not self._stop.wait(self.lease / 3):
+            with self._lock:
+                running = list(self._running)
+            if not running:
+                continue
+            try:
+                self._connect().executemany(
+                    "UPDATE job SET run_at = ? WHERE id = ? AND status = 'running'",
+                    [(time.time() + self.lease, job_id) for job_id in running],
+                )
+            except sqlite3.Error:
+                logger.exception("job heartbeat failed")
+
+    def _claim(self):
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # 마지막 시도 중에 워커가 죽은 작업은 다시 실행하지 않습니다
+            conn.execute(
+                "UPDATE job SET status = 'failed', last_error = ? "
+                "WHERE status = 'running' AND run_at <= ? AND attempts >= max_attempts",
+                ("lease expired on the last attempt", now),
+            )
+            # 대기 중이거나, 실행 중이었지만 lease 가 끝난(워커가 죽은) 작업
+            row = conn.execute(
+                "SELECT id, name, payload, attempts, max_attempts FROM job "
+                "WHERE status IN ('queued', 'running') AND run_at <= ? AND attempts < max_attempts "
+                "ORDER BY run_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is not None:
+                # 실행 중에는 run_at 을 lease 만료 시각으로 씁니다
+                conn.execute(
+                    "UPDATE job SET status = 'running', attempts = attempts + 1, run_at = ? WHERE id = ?",
+                    (now + self.lease, row[0]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        job_id, name, payload, attempts, max_attempts = row
+        return job_id, name, json.loads(payload), attempts + 1, max_attempts
+
+    def _execute(self, job_id: int, name: str, payload: Dict, attempt: int, max_attempts: int):
+        handler = _handlers.get(name)
+        started = time.perf_counter()
+        try:
+            if handler is None:
+                raise LookupError(f"등록되지 않은 작업입니다: {name}")
+            handler(**payload)
+        except Exception as exc:
+            JOBS_DURATION.observe(time.perf_counter() - started, name=name)
+            error = f"{type(exc).__name__}: {exc}"
+            if attempt >= max_attempts:
+                logger.exception("job %s #%s failed permanently", name, job_id)
+                JOBS_FINISHED.inc(name=name, result="failed")
+                self._connect().execute(
+                    "UPDATE job SET status = 'failed', last_error = ? WHERE id = ?", (error, job_id)
+                )
+            else:
+                delay = min(settings.JOBS_BACKOFF_MAX_SECONDS, settings.JOBS_BACKOFF_SECONDS * 2 ** (attempt - 1))
+                delay *= random.uniform(0.5, 1.0)
+                logger.warning("job %s #%s failed (attempt %s), retrying in %.1fs: %s", name, job_id, attempt, delay, error)
+                JOBS_FINISHED.inc(name=name, result="retry")
+                self._connect().execute(
+                    "UPDATE job SET status = 'queued', run_at = ?, last_error = ? WHERE id = ?",
+                    (time.time() + delay, error, job_id),
+                )
+            return
+        JOBS_DURATION.observe(time.perf_counter() - started, name=name)
+        JOBS_FINISHED.inc(name=name, result="ok")
+        self._connect().execute("DELETE FROM job WHERE id = ?", (job_id,))
+
+    def _update_gauge(self):
+        try:
+            counts = dict(self._connect().execute("SELECT status, COUNT(*) FROM job GROUP BY status").fetchall())
+        except sqlite3.Error:
+            return
+        for status in ("queued", "running", "failed"):
+            JOBS_WAITING.set(counts.get(status, 0), status=status)
+
+    def wait_idle(self, timeout: float = 10.0) -> bool:
+        """
+        지금 실행할 수 있는 작업이 모두 끝날 때까지 기다립니다. (벤치마크/점검용)
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            pending = self._connect().execute(
+                "SELECT COUNT(*) FROM job WHERE status = 'running' OR (status = 'queued' AND run_at <= ?)",
+                (time.time(),),
+            ).fetchone()[0]
+            if not pending:
+                return True
+            time.sleep(0.01)
+        return False
+
+
+def _load_tasks():
+    # 작업 함수 등록 (tasks.py 가 라우트/모델을 임포트하므로 처음 필요할 때 불러옵니다)
+    import tasks  # noqa: F401
+
+
+queue = JobQueue(
+    settings.JOBS_DB_PATH,
+    settings.JOBS_CONCURRENCY,
+    settings.JOBS_LEASE_SECONDS,
+    settings.JOBS_POLL_INTERVAL_SECONDS,
+)
+
+
+def enqueue(name: str, delay: float = 0.0, **payload) -> int:
+    """
+    작업을 큐에 넣고 id 를 반환합니다. payload 는 JSON 으로 저장할 수 있는 값이어야 합니다.
+    """
+    return queue.enqueue(name, delay, **payload)
@@ -0,0 +1,42 @@
+# app/lazy.py
+"""
+처음 쓸 때 임포트하는 모듈 대리 객체.
+
+NumPy/Pillow 를 쓰거나 백그라운드 스레드와 버퍼를 가진 모듈(recommendations, anomaly, archive, trending, jobs,
+images, profiler)은 워커 시작 시간을 늘리므로, 임포트하는 쪽에서 다음처럼 씁니다.
+
+    recommendations = lazy.module("recommendations")
+    recommendations.mark_changed([market_id])  # 여기서 처음 임포트
+
+처음 속성에 접근하기 전에는 sys.modules 에 없으므로, 종료 단계에서는 loaded(name) 으로 실제로 쓰인 모듈만 정리합니다.
+"""
+import importlib
+import sys
+from types import ModuleType
+from typing import Optional
+
+
+class LazyModule:
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def __getattr__(self, attr: str):
+        # _name, _module 은 인스턴스 속성이라 여기로 오지 않습니다
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self._name!r}{' (loaded)' if self._module is not None else ''}>"
+
+
+def module(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def loaded(name: str) -> Optional[ModuleType]:
+    """
+    이미 임포트된 모듈이면 돌려주고, 아직 쓰이지 않았으면 None 을 돌려줍니다.
+    """
+    return sys.modules.get(name)
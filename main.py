@@ -1,24 +1,129 @@
+# app/main.py
+import time
+
+# 임포트 시간 측정 (serve.py 가 시작 로그로 보고합니다)
+_import_started = time.perf_counter()
+
 # fastapi 기본 임포트
 from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html, get_swagger_ui_oauth2_redirect_html
+from fastapi.responses import FileResponse, HTMLResponse, PlainTextResponse
 from datetime import datetime
+from contextlib import asynccontextmanager
 from typing import Dict, Any
 from pydantic import BaseModel
 import asyncio
+import json
+import logging
 
 # dummy_routes.py에서 라우트 가져오기
-from routers import dummies, statuses, auth, communities, markets, users
+from routers import dummies, statuses, auth, communities, markets, users, profiles
+import admission
+import compression
+import database
+import lazy
+import metrics
+from config import settings
+
+# 무거운 모듈(NumPy 등)과 백그라운드 스레드를 가진 모듈은 처음 쓸 때 임포트합니다 (lazy.py)
+jobs = lazy.module("jobs")
+
+logger = logging.getLogger("plkit.main")
+
+APP_STARTUP_SECONDS = metrics.REGISTRY.gauge(
+    "app_startup_seconds", "Seconds spent importing the app and running lifespan startup, by phase."
+)
 
-app = FastAPI()
 
-# CORS 설정 추가 - 모든 도메인 허용
+def _run_step(name: str, step):
+    # 종료 단계 하나가 실패해도 나머지 버퍼 플러시와 풀 정리는 계속합니다
+    try:
+        step()
+    except Exception:
+        logger.exception("shutdown step %s failed", name)
+
+
+def _stop_loaded(name: str, stop):
+    # 이 워커에서 한 번도 쓰이지 않은 모듈은 버퍼도 스레드도 없으므로 임포트하지 않고 건너뜁니다
+    module = lazy.loaded(name)
+    if module is not None:
+        _run_step(name, lambda: stop(module))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    임포트 시점에는 파일/DB/백그라운드 스레드를 건드리지 않고, 서버가 요청을 받기 직전에 초기화합니다.
+    종료 시에는 서버가 새 연결을 막고 WebSocket 을 1012(Service Restart) 로 닫은 뒤 이 블록의 뒷부분이 실행됩니다.
+    """
+    started = time.perf_counter()
+    # 업로드 디렉터리
+    for directory in (users.UPLOAD_DIR, markets.UPLOAD_DIR, communities.UPLOAD_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
+    # 이전 실행에서 남은 작업도 처리하도록 시작 시 워커를 띄웁니다
+    jobs.queue.start()
+    APP_STARTUP_SECONDS.set(time.perf_counter() - started, phase="startup")
+    logger.info(
+        "app ready: import %.0f ms, startup %.0f ms",
+        APP_STARTUP_SECONDS.value(phase="import") * 1000,
+        APP_STARTUP_SECONDS.value(phase="startup") * 1000,
+    )
+    yield
+    # 실행 중인 작업만 마무리하고, 대기 중인 작업은 파일에 남겨 다음 실행 때 처리합니다
+    _run_step("jobs", lambda: jobs.queue.stop(timeout=settings.JOBS_LEASE_SECONDS))
+    # 큐에 남은 센서 읽기값을 종료 전에 평가합니다
+    _stop_loaded("anomaly", lambda module: module.detector.stop())
+    # 버퍼에 남은 센서 읽기값을 종료 전에 보관소 파일에 덧붙입니다
+    _stop_loaded("archive", lambda module: module.store.stop())
+    # 버퍼에 남은 조회수/상호작용을 종료 전에 반영합니다
+    _stop_loaded("trending", lambda module: module.tracker.stop())
+    # 아직 처리하지 않은 게시물 변경을 종료 전에 유사 목록에 반영합니다
+    _stop_loaded("recommendations", lambda module: module.recommender.stop())
+    # DB 를 쓰는 플러시가 모두 끝난 뒤 풀의 연결을 닫습니다
+    _run_step("engine", database.engine.dispose)
+    if database.replica_engine is not None:
+        _run_step("replica_engine", database.replica_engine.dispose)
+
+
+# /openapi.json 은 아래에서 미리 압축한 본문으로 직접 제공합니다 (/docs, /redoc 도 함께 등록)
+app = FastAPI(openapi_url=None, docs_url=None, redoc_url=None, lifespan=lifespan)
+
+# Accept-Encoding 협상으로 큰 JSON/CSV 응답을 brotli 또는 gzip 으로 압축 (이미지, WebSocket 제외)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(compression.CompressionMiddleware)
+# 쓰기 직후에는 같은 클라이언트의 읽기를 primary 로 고정 (read replica 사용 시)
+app.add_middleware(database.StickyPrimaryMiddleware)
+# 비싼 엔드포인트(로그인, 업로드, 목록/일괄 작업)의 동시 실행 수 제한. 메트릭 미들웨어 안쪽이라 503 도 집계됩니다
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(admission.AdmissionControlMiddleware)
+# 라우트별 지연/상태 코드/SQL 문장 수 메트릭 수집
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(database.engine)
+if database.replica_engine is not None:
+    metrics.instrument_engine(database.replica_engine)
+# 개발/스테이징에서만 켜는 N+1 / 느린 쿼리 검사기
+if settings.QUERY_INSPECTOR_ENABLED:
+    import query_inspector
+
+    app.add_middleware(query_inspector.QueryInspectorMiddleware)
+    query_inspector.instrument_engine(database.engine)
+    if database.replica_engine is not None:
+        query_inspector.instrument_engine(database.replica_engine)
+# 헤더/쿼리 토큰 또는 샘플링으로 선택된 요청만 프로파일링 (둘 다 꺼져 있으면 선택될 요청이 없으므로 등록하지 않습니다)
+if settings.PROFILING_TOKEN or settings.PROFILING_SAMPLE_RATE > 0:
+    import profiler
+
+    app.add_middleware(profiler.ProfilingMiddleware)
+# CORS 설정 추가 - 모든 도메인 허용. 가장 바깥에 두어야 승인 제어의 503 / 로그인 제한의 429 에도 CORS 헤더가 붙어
+# 브라우저가 응답과 Retry-After 를 읽을 수 있습니다 (add_middleware 는 나중에 추가한 것이 바깥쪽입니다)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # 모든 도메인 허용
     allow_credentials=True,
     allow_methods=["*"],  # 모든 HTTP 메소드 허용 (GET, POST, PUT, DELETE 등)
     allow_headers=["*"],  # 모든 헤더 허용
+    expose_headers=["Retry-After"],
 )
 
 
@@ -27,6 +132,42 @@ def read_root():
     return {"PLKIT": "DEV"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics():
+    """
+    Prometheus 텍스트 형식의 메트릭을 반환합니다.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# OpenAPI 문서는 프로세스 동안 바뀌지 않으므로 한 번만 만들어 최고 수준으로 압축해 둡니다
+openapi_payload = compression.Precompressed(
+    lambda: json.dumps(app.openapi(), ensure_ascii=False).encode(), "application/json"
+)
+
+
+@app.get("/openapi.json", include_in_schema=False)
+def read_openapi(request: Request):
+    return openapi_payload.response(request)
+
+
+@app.get("/docs", include_in_schema=False)
+def read_docs():
+    return get_swagger_ui_html(
+        openapi_url="/openapi.json", title=f"{app.title} - Swagger UI", oauth2_redirect_url="/docs/oauth2-redirect"
+    )
+
+
+@app.get("/docs/oauth2-redirect", include_in_schema=False)
+def read_docs_oauth2_redirect():
+    return get_swagger_ui_oauth2_redirect_html()
+
+
+@app.get("/redoc", include_in_schema=False)
+def read_redoc():
+    return get_redoc_html(openapi_url="/openapi.json", title=f"{app.title} - ReDoc")
+
+
 # dummy 관련 라우트 추가
 app.include_router(dummies.router, prefix="/dummy", tags=["Dummies"])
 # status 관련 라우트 추가
@@ -36,6 +177,7 @@ app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(communities.router)
 app.include_router(markets.router)
+app.include_router(profiles.router)
 
 
 # 연결된 클라이언트를 관리하기 위한 매니저 클래스
@@ -46,13 +188,18 @@ class ConnectionManager:
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
         self.active_connections.append(websocket)
+        metrics.WS_CONNECTIONS.inc(path=websocket.url.path)
 
     def disconnect(self, websocket: WebSocket):
         self.active_connections.remove(websocket)
+        metrics.WS_CONNECTIONS.dec(path=websocket.url.path)
 
     async def broadcast(self, data: bytes):
+        connections = list(self.active_connections)
+        metrics.WS_FRAMES.inc(len(connections), path="broadcast", direction="out")
+        metrics.WS_BYTES.inc(len(data) * len(connections), path="broadcast", direction="out")
         await asyncio.gather(
-            *[connection.send_bytes(data) for connection in self.active_connections],
+            *[connection.send_bytes(data) for connection in connections],
             return_exceptions=True  # 예외 처리를 위해 추가
         )
 
@@ -67,6 +214,8 @@ async def video_feed_endpoint(websocket: WebSocket):
     try:
         while True:
             data = await websocket.receive_bytes()
+            metrics.WS_FRAMES.inc(path="/ws/video_feed", direction="in")
+            metrics.WS_BYTES.inc(len(data), path="/ws/video_feed", direction="in")
             await manager.broadcast(data)
     except WebSocketDisconnect:
         manager.disconnect(websocket)
@@ -82,3 +231,6 @@ async def video_endpoint(websocket: WebSocket):
             await websocket.receive_text()
     except WebSocketDisconnect:
         manager.disconnect(websocket)
+
+
+APP_STARTUP_SECONDS.set(time.perf_counter() - _import_started, phase="import")
@@ -0,0 +1,269 @@
+# app/metrics.py
+"""
+프로세스 내 메트릭 수집과 Prometheus 텍스트 형식 출력.
+
+- MetricsMiddleware: 라우트별 지연 히스토그램, 상태 코드별 요청 수, 처리 중인 요청 수
+- instrument_engine: 요청별 SQL 문장 수와 DB 시간 (SQLAlchemy 엔진 이벤트)
+- WebSocket 연결 수와 프레임 처리량은 main.ConnectionManager 와 devices.DeviceHub 가 갱신합니다.
+
+값은 워커 프로세스마다 따로 집계되므로 Prometheus 에서 인스턴스별로 합산해야 합니다.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # labels -> [버킷별 누적 전 개수..., 합계, 개수]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            state[bisect_left(self.buckets, value)] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        lines = self.header()
+        for key, state in items:
+            cumulative = 0.0
+            for index, bound in enumerate(self.buckets):
+                cumulative += state[index]
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {_format_value(state[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self.register(Counter(name, documentation))
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self.register(Gauge(name, documentation))
+
+    def histogram(self, name: str, documentation: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests by method, route and status code.")
+HTTP_LATENCY = REGISTRY.histogram("http_request_duration_seconds", "HTTP request latency by method and route.")
+HTTP_IN_PROGRESS = REGISTRY.gauge("http_requests_in_progress", "HTTP requests currently being processed.")
+REQUEST_DB_QUERIES = REGISTRY.histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request.", QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_SECONDS = REGISTRY.histogram("http_request_db_seconds", "Time spent in SQL statements per HTTP request.")
+DB_QUERIES = REGISTRY.counter("db_queries_total", "SQL statements executed, by originating route.")
+DB_SECONDS = REGISTRY.counter("db_query_seconds_total", "Time spent in SQL statements, by originating route.")
+WS_CONNECTIONS = REGISTRY.gauge("websocket_connections", "Open WebSocket connections by path.")
+WS_FRAMES = REGISTRY.counter("websocket_frames_total", "WebSocket frames by path and direction.")
+WS_BYTES = REGISTRY.counter("websocket_bytes_total", "WebSocket payload bytes by path and direction.")
+
+
+class RequestStats:
+    __slots__ = ("route", "queries", "db_seconds")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# 현재 요청의 통계 (SQLAlchemy 이벤트 핸들러가 여기에 누적합니다)
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def route_template(scope) -> str:
+    """
+    요청 경로 대신 라우트 템플릿("/markets/{market_id}")을 라벨로 써서 카디널리티를 제한합니다.
+    한 번 계산한 값은 scope 에 저장해 다른 미들웨어가 재사용합니다.
+    """
+    cached = scope.get("plkit.route_template")
+    if cached is not None:
+        return cached
+    app = scope.get("app")
+    template = "unmatched"
+    if app is not None:
+        partial = None
+        for route in app.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                template = route.path
+                break
+            if match == Match.PARTIAL and partial is None:
+                partial = route.path
+        else:
+            template = partial or "unmatched"
+    scope["plkit.route_template"] = template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    HTTP 요청마다 지연 시간, 상태 코드, 처리 중인 요청 수, SQL 문장 수/시간을 기록하는 ASGI 미들웨어.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        stats = RequestStats(route)
+        token = current_request.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc(method=method, route=route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_PROGRESS.dec(method=method, route=route)
+            HTTP_REQUESTS.inc(method=method, route=route, status=str(status_code))
+            HTTP_LATENCY.observe(elapsed, method=method, route=route)
+            REQUEST_DB_QUERIES.observe(stats.queries, method=method, route=route)
+            REQUEST_DB_SECONDS.observe(stats.db_seconds, method=method, route=route)
+            current_request.reset(token)
+
+
+def instrument_engine(engine):
+    """
+    엔진에 cursor 이벤트 훅을 걸어 SQL 문장 수와 실행 시간을 현재 요청에 누적합니다.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        elapsed = time.perf_counter() - started
+        stats = current_request.get()
+        route = stats.route if stats else "none"
+        if stats:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+        DB_QUERIES.inc(route=route)
+        DB_SECONDS.inc(elapsed, route=route)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("metrics_started"):
+            connection.info["metrics_started"].pop()
+
+
+def render() -> str:
+    return REGISTRY.render()
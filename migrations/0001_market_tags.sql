@@ -0,0 +1,26 @@
+-- market.hashtags(JSON) 의 정규화된 태그 색인과 인기 태그 집계 테이블
+CREATE TABLE IF NOT EXISTS market_tag (
+    market_id INT NOT NULL,
+    tag VARCHAR(100) NOT NULL,
+    PRIMARY KEY (market_id, tag),
+    INDEX ix_market_tag_tag_market_id (tag, market_id),
+    CONSTRAINT fk_market_tag_market FOREIGN KEY (market_id) REFERENCES market (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS tag_count (
+    tag VARCHAR(100) NOT NULL PRIMARY KEY,
+    count INT NOT NULL DEFAULT 0,
+    INDEX ix_tag_count_count (count)
+);
+
+-- 기존 게시물의 해시태그 백필 (crud.market._normalize_tags 와 같은 규칙: '#' 제거, 공백 제거, 소문자)
+INSERT IGNORE INTO market_tag (market_id, tag)
+SELECT m.id, LOWER(TRIM(TRIM(LEADING '#' FROM TRIM(jt.tag))))
+FROM market m,
+     JSON_TABLE(m.hashtags, '$[*]' COLUMNS (tag VARCHAR(100) PATH '$')) AS jt
+WHERE m.hashtags IS NOT NULL
+  AND LOWER(TRIM(TRIM(LEADING '#' FROM TRIM(jt.tag)))) <> '';
+
+INSERT INTO tag_count (tag, count)
+SELECT tag, COUNT(*) FROM market_tag GROUP BY tag
+ON DUPLICATE KEY UPDATE count = VALUES(count);
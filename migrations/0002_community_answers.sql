@@ -0,0 +1,13 @@
+-- 커뮤니티 답변 테이블과 게시물별 답변 수(비정규화) 컬럼
+ALTER TABLE community ADD COLUMN answer_count INT NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS community_answer (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    community_id INT NOT NULL,
+    writer_id INT NOT NULL,
+    content TEXT NOT NULL,
+    created_at DATETIME NULL,
+    INDEX ix_community_answer_community_id_id (community_id, id),
+    CONSTRAINT fk_community_answer_community FOREIGN KEY (community_id) REFERENCES community (id) ON DELETE CASCADE,
+    CONSTRAINT fk_community_answer_writer FOREIGN KEY (writer_id) REFERENCES user (id)
+);
@@ -0,0 +1,3 @@
+-- 최신순 커뮤니티 피드와 작성자별 게시물 목록용 인덱스 ((created_at, id) keyset 페이지네이션)
+CREATE INDEX ix_community_created_at_id ON community (created_at, id);
+CREATE INDEX ix_community_writer_id_created_at_id ON community (writer_id, created_at, id);
@@ -0,0 +1,11 @@
+-- 게시물별 조회수/상호작용 수와 시간 감쇠 hot 점수 (trending.py)
+CREATE TABLE IF NOT EXISTS content_stat (
+    kind VARCHAR(20) NOT NULL,
+    content_id INT NOT NULL,
+    views BIGINT NOT NULL DEFAULT 0,
+    interactions BIGINT NOT NULL DEFAULT 0,
+    score DOUBLE NOT NULL,
+    updated_at DATETIME NULL,
+    PRIMARY KEY (kind, content_id),
+    INDEX ix_content_stat_kind_score (kind, score)
+);
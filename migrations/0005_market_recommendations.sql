@@ -0,0 +1,17 @@
+-- 마켓 유사 게시물 추천용 특징 벡터와 게시물별 상위 N 목록 (recommendations.py)
+-- 적용 후 `python -m recommendations` 로 전체 빌드를 한 번 실행해야 합니다.
+CREATE TABLE IF NOT EXISTS market_vector (
+    market_id INT NOT NULL PRIMARY KEY,
+    vector BLOB NULL,
+    updated_at DOUBLE NOT NULL,
+    INDEX ix_market_vector_updated_at (updated_at)
+);
+
+CREATE TABLE IF NOT EXISTS market_similar (
+    market_id INT NOT NULL,
+    `rank` INT NOT NULL,
+    similar_id INT NOT NULL,
+    score FLOAT NOT NULL,
+    PRIMARY KEY (market_id, `rank`),
+    INDEX ix_market_similar_similar_id (similar_id)
+);
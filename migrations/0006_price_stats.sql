@@ -0,0 +1,23 @@
+-- 마켓 작물별/지역별 가격 통계 집계 테이블과 근사 중앙값용 버킷 히스토그램 (analytics.py)
+-- 적용 후 `python -m analytics` 로 기존 게시물 집계를 한 번 채워야 합니다.
+CREATE INDEX ix_market_crop_price ON market (crop, price);
+CREATE INDEX ix_market_location_price ON market (location, price);
+
+CREATE TABLE IF NOT EXISTS price_stat (
+    dimension VARCHAR(20) NOT NULL,
+    `key` VARCHAR(100) NOT NULL,
+    count INT NOT NULL DEFAULT 0,
+    total BIGINT NOT NULL DEFAULT 0,
+    min_price INT NULL,
+    max_price INT NULL,
+    PRIMARY KEY (dimension, `key`),
+    INDEX ix_price_stat_dimension_count (dimension, count)
+);
+
+CREATE TABLE IF NOT EXISTS price_bucket (
+    dimension VARCHAR(20) NOT NULL,
+    `key` VARCHAR(100) NOT NULL,
+    bucket INT NOT NULL,
+    count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, `key`, bucket)
+);
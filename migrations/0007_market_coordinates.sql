@@ -0,0 +1,8 @@
+-- 마켓 좌표와 반경 검색용 geohash (geo.py)
+-- 적용 후 `python -m geo` 로 기존 게시물의 좌표를 한 번 채워야 합니다.
+ALTER TABLE market
+    ADD COLUMN latitude DOUBLE NULL,
+    ADD COLUMN longitude DOUBLE NULL,
+    ADD COLUMN geohash VARCHAR(12) NULL;
+
+CREATE INDEX ix_market_geohash ON market (geohash, latitude, longitude);
@@ -1,5 +1,5 @@
 # app/models/community.py
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -13,6 +13,27 @@ class Community(Base):
     image = Column(String, nullable=True)
     writer_id = Column(Integer, ForeignKey("user.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
+    # 답변 수 (비정규화). 답변 추가/삭제와 같은 트랜잭션에서 answer_count = answer_count ± 1 로 갱신합니다
+    answer_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     # writer 관계 설정
     writer = relationship("User", back_populates="communities")
+
+    # 최신순 피드와 작성자별 최신순 목록을 (created_at, id) keyset 으로 읽기 위한 인덱스
+    __table_args__ = (
+        Index("ix_community_created_at_id", "created_at", "id"),
+        Index("ix_community_writer_id_created_at_id", "writer_id", "created_at", "id"),
+    )
+
+
+class CommunityAnswer(Base):
+    __tablename__ = "community_answer"
+
+    id = Column(Integer, primary_key=True)
+    community_id = Column(Integer, ForeignKey("community.id", ondelete="CASCADE"), nullable=False)
+    writer_id = Column(Integer, ForeignKey("user.id"), nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # 게시물별 답변을 id 순으로 keyset 페이지네이션
+    __table_args__ = (Index("ix_community_answer_community_id_id", "community_id", "id"),)
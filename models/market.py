@@ -1,5 +1,5 @@
 # app/models/market.py
-from sqlalchemy import Column, Integer, String, Text, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Text, JSON, ForeignKey, Index, LargeBinary, Double, Float
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -17,3 +17,87 @@ class Market(Base):
     hashtags = Column(JSON, nullable=True)
     image = Column(String, nullable=True)
     writer_id = Column(Integer)
+    # 좌표 (직접 지정하거나 location 으로 지오코딩, geo.py) 와 반경 검색용 geohash
+    latitude = Column(Double, nullable=True)
+    longitude = Column(Double, nullable=True)
+    geohash = Column(String(12), nullable=True)
+
+    # 가격 통계의 최소/최대값이 지워졌을 때 해당 그룹만 인덱스로 다시 구하기 위한 인덱스
+    # (geohash, latitude, longitude) 는 반경 검색 후보를 테이블을 읽지 않고 인덱스만으로 거르기 위한 인덱스
+    __table_args__ = (
+        Index("ix_market_crop_price", "crop", "price"),
+        Index("ix_market_location_price", "location", "price"),
+        Index("ix_market_geohash", "geohash", "latitude", "longitude"),
+    )
+
+class MarketTag(Base):
+    """
+    market.hashtags 의 정규화된 역색인 (태그 -> 게시물)
+    """
+    __tablename__ = "market_tag"
+
+    market_id = Column(Integer, ForeignKey("market.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String(100), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_market_tag_tag_market_id", "tag", "market_id"),
+    )
+
+class TagCount(Base):
+    """
+    태그별 게시물 수 (인기 태그 조회용, 증분 갱신)
+    """
+    __tablename__ = "tag_count"
+
+    tag = Column(String(100), primary_key=True)
+    count = Column(Integer, nullable=False, default=0, index=True)
+
+class MarketVector(Base):
+    """
+    추천용 특징 벡터 (float32 바이트열). vector 가 NULL 이면 삭제된 게시물입니다.
+    updated_at(유닉스 초)으로 다른 워커가 바꾼 벡터를 증분 동기화합니다.
+    """
+    __tablename__ = "market_vector"
+
+    market_id = Column(Integer, primary_key=True)
+    vector = Column(LargeBinary, nullable=True)
+    updated_at = Column(Double, nullable=False, index=True)
+
+class MarketSimilar(Base):
+    """
+    게시물별로 미리 계산한 유사 게시물 상위 N 개 (rank 0 이 가장 유사)
+    """
+    __tablename__ = "market_similar"
+
+    market_id = Column(Integer, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    similar_id = Column(Integer, nullable=False, index=True)
+    score = Column(Float, nullable=False)
+
+class PriceStat(Base):
+    """
+    작물별(dimension='crop') / 지역별(dimension='location') 가격 집계 (증분 갱신)
+    """
+    __tablename__ = "price_stat"
+
+    dimension = Column(String(20), primary_key=True)
+    key = Column(String(100), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(BigInteger, nullable=False, default=0)
+    min_price = Column(Integer, nullable=True)
+    max_price = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_price_stat_dimension_count", "dimension", "count"),
+    )
+
+class PriceBucket(Base):
+    """
+    근사 중앙값용 로그 버킷 히스토그램 (analytics.bucket_of 참고)
+    """
+    __tablename__ = "price_bucket"
+
+    dimension = Column(String(20), primary_key=True)
+    key = Column(String(100), primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,21 @@
+# app/models/trending.py
+from sqlalchemy import BigInteger, Column, DateTime, Double, Index, Integer, String
+from datetime import datetime
+from database import Base
+
+class ContentStat(Base):
+    """
+    게시물(community / market)별 조회수, 상호작용 수와 시간 감쇠 hot 점수.
+    score 는 trending.forward_score 로 계산한 로그 값이라 시간이 지나도 다시 계산할 필요가 없습니다.
+    """
+    __tablename__ = "content_stat"
+
+    kind = Column(String(20), primary_key=True)
+    content_id = Column(Integer, primary_key=True)
+    views = Column(BigInteger, nullable=False, default=0)
+    interactions = Column(BigInteger, nullable=False, default=0)
+    score = Column(Double, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # 종류별 점수 상위 K 개를 정렬 없이 인덱스로 읽습니다
+    __table_args__ = (Index("ix_content_stat_kind_score", "kind", "score"),)
@@ -0,0 +1,314 @@
+# app/profiler.py
+"""
+요청 단위 온디맨드 프로파일링.
+
+다음 중 하나에 해당하는 요청을 cProfile 과 스택 샘플러로 실행하고 결과를 저장합니다.
+- `X-Profile: <PROFILING_TOKEN>` 헤더 또는 `?__profile=<PROFILING_TOKEN>` 쿼리
+- PROFILING_SAMPLE_RATE 비율로 무작위 선택된 요청
+
+결과는 호출 트리(pstats 텍스트 / .pstats 바이너리)와 flame graph 용 collapsed stack 입니다.
+PROFILING_DIR 를 지정하면 디렉터리에, 아니면 메모리 링 버퍼에 최근 PROFILING_MAX_PROFILES 개만 보관합니다.
+프로파일 대상 요청은 진행 중인 다른 HTTP 요청이 끝나기를 기다렸다가 혼자 실행되고, 그동안 들어온 요청은 프로파일이
+끝날 때까지 대기합니다. 그래서 호출 트리와 flame graph 에는 그 요청의 코드만 잡힙니다. (WebSocket 핸들러는 멈추지 않습니다)
+결과 정리(pstats 출력)와 저장은 스레드풀에서 합니다.
+"""
+import asyncio
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import List, Optional
+from urllib.parse import parse_qs
+
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+from metrics import route_template
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = "__profile"
+
+
+@dataclass
+class ProfileInfo:
+    id: str
+    created_at: str
+    method: str
+    path: str
+    route: str
+    status: int
+    duration_ms: float
+    trigger: str
+    samples: int
+
+
+@dataclass
+class Profile:
+    info: ProfileInfo
+    call_tree: str
+    pstats_data: bytes
+    collapsed: str
+
+
+class MemoryProfileStore:
+    """
+    최근 프로파일을 메모리 링 버퍼에 보관합니다.
+    """
+
+    def __init__(self, max_profiles: int):
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[str, Profile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: Profile):
+        with self._lock:
+            self._profiles[profile.info.id] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def list(self) -> List[ProfileInfo]:
+        with self._lock:
+            return [profile.info for profile in reversed(self._profiles.values())]
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+
+class DirectoryProfileStore:
+    """
+    프로파일을 디렉터리에 파일로 보관하고 오래된 것부터 지워 max_profiles 개를 유지합니다.
+    파일: <id>.json (메타), <id>.txt (호출 트리), <id>.pstats, <id>.collapsed
+    """
+
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, profile_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}{suffix}")
+
+    def add(self, profile: Profile):
+        profile_id = profile.info.id
+        with self._lock:
+            with open(self._path(profile_id, ".txt"), "w", encoding="utf-8") as f:
+                f.write(profile.call_tree)
+            with open(self._path(profile_id, ".pstats"), "wb") as f:
+                f.write(profile.pstats_data)
+            with open(self._path(profile_id, ".collapsed"), "w", encoding="utf-8") as f:
+                f.write(profile.collapsed)
+            # 메타 파일을 마지막에 써서 목록에는 완성된 프로파일만 보이게 합니다
+            with open(self._path(profile_id, ".json"), "w", encoding="utf-8") as f:
+                json.dump(asdict(profile.info), f, ensure_ascii=False)
+            for stale in self._meta_files()[self.max_profiles:]:
+                stale_id = os.path.basename(stale)[: -len(".json")]
+                for suffix in (".json", ".txt", ".pstats", ".collapsed"):
+                    try:
+                        os.remove(self._path(stale_id, suffix))
+                    except FileNotFoundError:
+                        pass
+
+    def _meta_files(self) -> List[str]:
+        paths = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".json")
+        ]
+        return sorted(paths, key=os.path.getmtime, reverse=True)
+
+    def list(self) -> List[ProfileInfo]:
+        infos = []
+        for path in self._meta_files():
+            try:
+                with open(path, encoding="utf-8") as f:
+                    infos.append(ProfileInfo(**json.load(f)))
+            except (FileNotFoundError, ValueError):
+                continue
+        return infos
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        if not profile_id.isalnum():
+            return None
+        try:
+            with open(self._path(profile_id, ".json"), encoding="utf-8") as f:
+                info = ProfileInfo(**json.load(f))
+            with open(self._path(profile_id, ".txt"), encoding="utf-8") as f:
+                call_tree = f.read()
+            with open(self._path(profile_id, ".pstats"), "rb") as f:
+                pstats_data = f.read()
+            with open(self._path(profile_id, ".collapsed"), encoding="utf-8") as f:
+                collapsed = f.read()
+        except FileNotFoundError:
+            return None
+        return Profile(info, call_tree, pstats_data, collapsed)
+
+
+def create_store():
+    if settings.PROFILING_DIR:
+        return DirectoryProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES)
+    return MemoryProfileStore(settings.PROFILING_MAX_PROFILES)
+
+
+store = create_store()
+
+
+class StackSampler:
+    """
+    대상 스레드의 스택을 주기적으로 샘플링해 collapsed stack("a;b;c 횟수") 을 만듭니다.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        self._thread.join()
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+
+def _trigger(scope) -> Optional[str]:
+    token = settings.PROFILING_TOKEN
+    if token:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER and secrets.compare_digest(value, token.encode()):
+                return "header"
+        if scope.get("query_string"):
+            values = parse_qs(scope["query_string"].decode("latin-1")).get(PROFILE_QUERY, [])
+            if any(secrets.compare_digest(value.encode(), token.encode()) for value in values):
+                return "query"
+    if settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    프로파일 대상 요청만 cProfile 과 스택 샘플러로 감싸 실행합니다. 응답에 X-Profile-Id 헤더를 붙입니다.
+    한 번에 한 요청만 프로파일링하며, 이미 진행 중이면 그냥 처리합니다.
+    프로파일 중에는 다른 HTTP 요청을 받지 않고 기다리게 해서 결과에 섞이지 않게 합니다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._busy = threading.Lock()
+        self._in_flight = 0
+        # 프로파일이 진행 중일 때만 있습니다. _gate 는 프로파일이 끝나면, _idle 은 진행 중인 요청이 모두 끝나면 set
+        self._gate: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = _trigger(scope)
+        if trigger is None or not self._busy.acquire(blocking=False):
+            await self._run(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send, trigger)
+        finally:
+            self._busy.release()
+
+    async def _run(self, scope, receive, send):
+        # 프로파일 중인 요청이 있으면 끝날 때까지 기다렸다가 처리합니다
+        while self._gate is not None:
+            await self._gate.wait()
+        self._in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._in_flight -= 1
+            if self._in_flight == 0 and self._idle is not None:
+                self._idle.set()
+
+    async def _profile(self, scope, receive, send, trigger: str):
+        profile_id = secrets.token_hex(8)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        # 새 요청은 _gate 에서 기다리게 하고, 이미 진행 중인 요청이 끝나면 시작합니다
+        self._gate = asyncio.Event()
+        try:
+            if self._in_flight:
+                self._idle = asyncio.Event()
+                await self._idle.wait()
+            profile = cProfile.Profile()
+            sampler = StackSampler(threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL_MS / 1000)
+            started = time.perf_counter()
+            sampler.start()
+            profile.enable()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profile.disable()
+                collapsed = sampler.stop()
+                duration_ms = (time.perf_counter() - started) * 1000
+                self._open_gate()
+                # pstats 정리와 파일 저장은 이벤트 루프를 막지 않도록 스레드풀에서 합니다
+                info = ProfileInfo(
+                    id=profile_id,
+                    created_at=datetime.utcnow().isoformat(),
+                    method=scope["method"],
+                    path=scope["path"],
+                    route=route_template(scope),
+                    status=status_code,
+                    duration_ms=round(duration_ms, 3),
+                    trigger=trigger,
+                    samples=sum(sampler.samples.values()),
+                )
+                await run_in_threadpool(lambda: store.add(_build_profile(profile, collapsed, info)))
+        finally:
+            # 기다리는 중에 취소된 경우에도 막아 둔 요청을 풀어 줍니다
+            self._open_gate()
+
+    def _open_gate(self):
+        if self._gate is not None:
+            gate, self._gate, self._idle = self._gate, None, None
+            gate.set()
+
+
+def _build_profile(profile: cProfile.Profile, collapsed: str, info: ProfileInfo) -> Profile:
+    profile.create_stats()
+    # pstats.Stats 가 profile.stats 를 비우므로 먼저 직렬화합니다
+    pstats_data = marshal.dumps(profile.stats)
+    text = io.StringIO()
+    stats = pstats.Stats(profile, stream=text)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(60)
+    stats.print_callees(30)
+    return Profile(info=info, call_tree=text.getvalue(), pstats_data=pstats_data, collapsed=collapsed)
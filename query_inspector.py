@@ -0,0 +1,214 @@
+# app/query_inspector.py
+"""
+개발/스테이징용 SQL 검사기 (기본 비활성, QUERY_INSPECTOR_ENABLED=true 로 활성화).
+
+- 요청마다 정규화한 SQL 별로 실행 횟수를 묶어, 같은 문장이 임계값보다 많이 반복되면 N+1 의심으로 로그를 남깁니다.
+- 설정한 시간보다 느린 문장은 라우트와 호출 위치(파일:줄)와 함께 로그를 남깁니다.
+- 테스트에서는 query_budget() 으로 블록 안의 SQL 문장 수 상한을 강제할 수 있습니다. 블록과 그 안에서 보낸
+  TestClient 요청(컨텍스트가 복사되는 이벤트 루프/스레드풀)의 문장만 세고, flush/작업 스레드의 문장은 세지 않습니다.
+
+    with query_inspector.query_budget(3):
+        client.get("/communities/")
+"""
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+from metrics import route_template
+
+logger = logging.getLogger("plkit.queries")
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|:\w+|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    리터럴과 바인드 파라미터를 `?` 로, IN (?, ?, ...) 목록을 `(?...)` 로 바꿔 같은 모양의 문장을 묶습니다.
+    """
+    text = _WHITESPACE.sub(" ", statement).strip()
+    text = _STRING_LITERAL.sub("?", text)
+    text = _PLACEHOLDER.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    return _IN_LIST.sub("(?...)", text)
+
+
+def caller_location() -> str:
+    """
+    SQLAlchemy/라이브러리 프레임을 건너뛰고 이 프로젝트 코드 중 가장 안쪽 호출 위치를 반환합니다.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if (
+            filename.startswith(PROJECT_ROOT)
+            and filename != os.path.abspath(__file__)
+            and "site-packages" not in filename
+        ):
+            return f"{os.path.relpath(filename, PROJECT_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class QueryGroup:
+    __slots__ = ("statement", "count", "seconds", "location")
+
+    def __init__(self, statement: str, location: str):
+        self.statement = statement
+        self.count = 0
+        self.seconds = 0.0
+        self.location = location
+
+
+class RequestQueries:
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.groups: Dict[str, QueryGroup] = {}
+        self.total = 0
+
+    def repeated(self, threshold: int) -> List[QueryGroup]:
+        return [group for group in self.groups.values() if group.count > threshold]
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryBudget:
+    def __init__(self, max_queries: int):
+        self.max_queries = max_queries
+        self.count = 0
+        self.statements: List[str] = []
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("query_inspector_request", default=None)
+# 현재 컨텍스트에서 진행 중인 query_budget 블록들 (중첩 가능). 백그라운드 스레드는 빈 컨텍스트로 시작하므로 제외됩니다
+_budgets: ContextVar[Tuple[QueryBudget, ...]] = ContextVar("query_inspector_budgets", default=())
+_budgets_lock = threading.Lock()
+_instrumented = set()
+
+# 마지막으로 감지된 N+1 의심 목록 (테스트에서 확인용, 최근 100개)
+violations: List[str] = []
+
+
+def _record_violation(message: str):
+    violations.append(message)
+    del violations[:-100]
+    logger.warning(message)
+
+
+class QueryInspectorMiddleware:
+    """
+    요청 단위로 SQL 을 묶고, 요청이 끝나면 반복 횟수가 임계값을 넘은 문장을 보고하는 ASGI 미들웨어.
+    """
+
+    def __init__(self, app, repeat_threshold: Optional[int] = None):
+        self.app = app
+        self.repeat_threshold = repeat_threshold or settings.QUERY_REPEAT_THRESHOLD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = RequestQueries(scope["method"], route_template(scope))
+        token = _current.set(request)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
+            for group in request.repeated(self.repeat_threshold):
+                _record_violation(
+                    f"N+1 suspected: {request.method} {request.route} executed {group.count}x "
+                    f"({group.seconds * 1000:.1f} ms) at {group.location}: {group.statement}"
+                )
+
+
+def instrument_engine(engine):
+    """
+    엔진에 cursor 이벤트 훅을 겁니다. 같은 엔진에 여러 번 호출해도 한 번만 걸립니다.
+    """
+    from sqlalchemy import event
+
+    if id(engine) in _instrumented:
+        return
+    _instrumented.add(id(engine))
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("inspector_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("inspector_started")
+        if not started:
+            # 다른 스레드의 문장 실행 도중에 훅이 걸린 경우
+            return
+        elapsed = time.perf_counter() - started.pop()
+        request = _current.get()
+        if request is not None:
+            normalized = normalize_sql(statement)
+            group = request.groups.get(normalized)
+            if group is None:
+                group = request.groups[normalized] = QueryGroup(normalized, caller_location())
+            group.count += 1
+            group.seconds += elapsed
+            request.total += 1
+        if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+            route = f"{request.method} {request.route}" if request else "no request"
+            logger.warning(
+                "slow query: %.1f ms on %s at %s: %s",
+                elapsed * 1000, route, caller_location(), normalize_sql(statement),
+            )
+        budgets = _budgets.get()
+        if budgets:
+            # 블록 안에서 여러 요청을 동시에 보내면 같은 예산을 여러 스레드가 셉니다
+            with _budgets_lock:
+                for budget in budgets:
+                    budget.count += 1
+                    budget.statements.append(statement)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("inspector_started"):
+            connection.info["inspector_started"].pop()
+
+
+@contextmanager
+def query_budget(max_queries: int, engine=None):
+    """
+    블록 안에서 실행된 SQL 문장 수가 max_queries 를 넘으면 QueryBudgetExceeded 를 발생시킵니다.
+    TestClient 요청처럼 이 컨텍스트를 물려받은 다른 스레드의 문장은 세고, 같은 시각에 돌아가는
+    trending/recommendations flush 나 작업 큐 스레드의 문장은 세지 않습니다.
+    """
+    if engine is None:
+        import database
+        engine = database.engine
+    instrument_engine(engine)
+    budget = QueryBudget(max_queries)
+    token = _budgets.set(_budgets.get() + (budget,))
+    try:
+        yield budget
+    finally:
+        _budgets.reset(token)
+    if budget.count > max_queries:
+        shapes = {}
+        for statement in budget.statements:
+            normalized = normalize_sql(statement)
+            shapes[normalized] = shapes.get(normalized, 0) + 1
+        top = sorted(shapes.items(), key=lambda item: -item[1])[:5]
+        details = "\n".join(f"  {count}x {statement}" for statement, count in top)
+        raise QueryBudgetExceeded(f"{budget.count} queries executed, budget is {max_queries}:\n{details}")
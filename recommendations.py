@@ -0,0 +1,414 @@
+# app/recommendations.py
+"""
+마켓 게시물 "비슷한 상품" 추천.
+
+- 특징 벡터: title / content / crop / hashtags / location 을 토큰(단어, 한글 2-gram, 필드 접두사 토큰)으로 나누고
+  feature hashing 으로 RECOMMEND_DIM 차원 float32 벡터를 만든 뒤 L2 정규화합니다. (코사인 유사도 = 내적)
+- 게시물별 상위 RECOMMEND_TOP_N 개를 market_similar 에 저장하므로 조회는 인덱스 lookup 입니다.
+- crud.market 이 게시물을 쓰면 mark_changed() 로 표시하고, 백그라운드 스레드가 모아서 처리합니다.
+  1) 바뀐 게시물의 벡터를 market_vector 에 저장
+  2) market_vector 에서 다른 워커가 바꾼 벡터까지 메모리 행렬에 반영
+  3) 바뀐 게시물, 그 게시물을 목록에 가진 게시물, 그 게시물과 가장 가까운 게시물들의 목록을
+     NumPy 행렬 곱으로 배치 재계산
+  3) 의 마지막 범위는 근사입니다. 정확한 전체 재계산은 `python -m recommendations` 로 실행합니다.
+
+처음 설치하거나 RECOMMEND_DIM 을 바꾼 뒤에는 한 번 전체 빌드가 필요합니다.
+
+    python -m recommendations
+"""
+import argparse
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import delete, insert, select, update
+
+import metrics
+from config import settings
+from models.market import Market, MarketSimilar, MarketVector
+
+logger = logging.getLogger("plkit.recommendations")
+
+# 벡터에 영향을 주는 컬럼. 이 컬럼이 바뀔 때만 다시 계산합니다
+FEATURE_FIELDS = ("title", "content", "crop", "hashtags", "location")
+
+# 필드별 가중치 (같은 작물/태그가 본문의 흔한 단어보다 강하게 작용하도록)
+FIELD_WEIGHTS = {"title": 2.0, "content": 1.0, "crop": 3.0, "tag": 2.0, "loc": 1.0}
+
+# 동기화할 때 다른 호스트와의 시계 차이를 감안해 다시 읽는 구간 (초)
+SYNC_SKEW_SECONDS = 5.0
+
+_WORD = re.compile(r"[0-9a-zA-Z가-힣]+")
+_HANGUL = re.compile(r"[가-힣]")
+
+RECOMMEND_REFRESHES = metrics.REGISTRY.counter("recommend_refreshes_total", "Recommendation refresh cycles, by result.")
+RECOMMEND_REFRESH_SECONDS = metrics.REGISTRY.histogram("recommend_refresh_seconds", "Time per recommendation refresh cycle.")
+RECOMMEND_INDEX_SIZE = metrics.REGISTRY.gauge("recommend_index_size", "Listings held in the in-memory similarity matrix.")
+
+
+def _words(text: Optional[str]) -> List[str]:
+    tokens = []
+    for word in _WORD.findall((text or "").lower()):
+        tokens.append(word)
+        # 형태소 분석 없이 조사가 붙은 형태("딸기를", "딸기가")도 겹치도록 한글 2-gram 을 더합니다
+        if len(word) > 2 and _HANGUL.match(word):
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def tokenize(row) -> Counter:
+    """
+    게시물 행(title, content, crop, hashtags, location 속성/키)을 {토큰: 가중치} 로 바꿉니다.
+    """
+    from crud.market import _normalize_tags
+
+    get = row.get if isinstance(row, dict) else lambda name: getattr(row, name)
+    weights: Counter = Counter()
+    for token in _words(get("title")):
+        weights[f"w:{token}"] += FIELD_WEIGHTS["title"]
+    for token in _words(get("content")):
+        weights[f"w:{token}"] += FIELD_WEIGHTS["content"]
+    if get("crop"):
+        weights[f"crop:{get('crop').strip().lower()}"] += FIELD_WEIGHTS["crop"]
+    for tag in _normalize_tags(get("hashtags")):
+        weights[f"tag:{tag}"] += FIELD_WEIGHTS["tag"]
+    location = (get("location") or "").split()
+    # "경기 수원" -> loc:경기, loc:경기 수원
+    for depth in range(1, len(location) + 1):
+        weights[f"loc:{' '.join(location[:depth])}"] += FIELD_WEIGHTS["loc"]
+    return weights
+
+
+def _bucket(token: str, dim: int) -> Tuple[int, float]:
+    # 프로세스마다 달라지는 hash() 대신 고정된 해시를 씁니다 (저장된 벡터와 호환)
+    digest = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+    return digest % dim, (1.0 if digest >> 63 else -1.0)
+
+
+def vectorize(row, dim: int) -> np.ndarray:
+    """
+    feature hashing 벡터 (가중치는 1 + log(가중치) 로 완만하게). L2 정규화된 float32 를 반환합니다.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for token, weight in tokenize(row).items():
+        index, sign = _bucket(token, dim)
+        vector[index] += sign * (1.0 + math.log(weight))
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+class SimilarityIndex:
+    """
+    게시물 벡터를 담은 메모리 행렬. 행 삭제는 마지막 행과 자리를 바꿔 O(D) 로 처리합니다.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.matrix = np.zeros((0, dim), dtype=np.float32)
+        self.rows: Dict[int, int] = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self, needed: int):
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        ids = np.zeros(capacity, dtype=np.int64)
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        ids[: self._size] = self.ids[: self._size]
+        matrix[: self._size] = self.matrix[: self._size]
+        self.ids, self.matrix = ids, matrix
+
+    def upsert(self, market_id: int, vector: np.ndarray):
+        row = self.rows.get(market_id)
+        if row is None:
+            self._grow(self._size + 1)
+            row = self._size
+            self._size += 1
+            self.rows[market_id] = row
+            self.ids[row] = market_id
+        self.matrix[row] = vector
+
+    def remove(self, market_id: int):
+        row = self.rows.pop(market_id, None)
+        if row is None:
+            return
+        last = self._size - 1
+        if row != last:
+            moved = int(self.ids[last])
+            self.ids[row] = moved
+            self.matrix[row] = self.matrix[last]
+            self.rows[moved] = row
+        self._size = last
+
+    def vectors(self, market_ids: Sequence[int]) -> np.ndarray:
+        return self.matrix[[self.rows[market_id] for market_id in market_ids]]
+
+    def nearest(self, market_ids: Sequence[int], top_n: int) -> Dict[int, List[Tuple[int, float]]]:
+        """
+        각 게시물과 코사인 유사도가 가장 높은 top_n 개(자기 자신 제외)를 배치 행렬 곱으로 구합니다.
+        메모리를 제한하기 위해 질의는 RECOMMEND_BATCH_SIZE 개씩, 행렬은 RECOMMEND_CHUNK_ROWS 행씩 나눠 곱합니다.
+        """
+        result: Dict[int, List[Tuple[int, float]]] = {}
+        market_ids = [market_id for market_id in market_ids if market_id in self.rows]
+        size = self._size
+        if not market_ids or size < 2:
+            return {market_id: [] for market_id in market_ids}
+        keep = min(top_n, size - 1)
+        ids = self.ids[:size]
+        for start in range(0, len(market_ids), settings.RECOMMEND_BATCH_SIZE):
+            batch = market_ids[start:start + settings.RECOMMEND_BATCH_SIZE]
+            queries = self.vectors(batch)
+            self_rows = np.array([self.rows[market_id] for market_id in batch])
+            best_scores = np.full((len(batch), 0), -np.inf, dtype=np.float32)
+            best_rows = np.zeros((len(batch), 0), dtype=np.int64)
+            for chunk in range(0, size, settings.RECOMMEND_CHUNK_ROWS):
+                end = min(chunk + settings.RECOMMEND_CHUNK_ROWS, size)
+                scores = queries @ self.matrix[chunk:end].T
+                # 자기 자신 제외
+                inside = (self_rows >= chunk) & (self_rows < end)
+                scores[np.nonzero(inside)[0], self_rows[inside] - chunk] = -np.inf
+                rows = np.broadcast_to(np.arange(chunk, end), scores.shape)
+                scores = np.concatenate([best_scores, scores], axis=1)
+                rows = np.concatenate([best_rows, rows], axis=1)
+                if scores.shape[1] > keep:
+                    top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+                    scores = np.take_along_axis(scores, top, axis=1)
+                    rows = np.take_along_axis(rows, top, axis=1)
+                best_scores, best_rows = scores, rows
+            order = np.argsort(-best_scores, axis=1, kind="stable")
+            best_scores = np.take_along_axis(best_scores, order, axis=1)
+            best_rows = np.take_along_axis(best_rows, order, axis=1)
+            for i, market_id in enumerate(batch):
+                result[market_id] = [
+                    (int(ids[row]), float(score))
+                    for row, score in zip(best_rows[i], best_scores[i])
+                    if score > 0
+                ]
+        return result
+
+
+def _load_vectors(db, index: SimilarityIndex, since: Optional[float] = None) -> Tuple[Set[int], float]:
+    """
+    market_vector 를 메모리 행렬에 반영하고 (바뀐 id, 가장 최근 updated_at) 을 반환합니다.
+    """
+    query = select(MarketVector.market_id, MarketVector.vector, MarketVector.updated_at)
+    if since is not None:
+        query = query.where(MarketVector.updated_at >= since - SYNC_SKEW_SECONDS)
+    changed, latest = set(), since or 0.0
+    for row in db.execute(query.execution_options(yield_per=settings.RECOMMEND_BATCH_SIZE * 4)):
+        latest = max(latest, row.updated_at)
+        vector = np.frombuffer(row.vector, dtype=np.float32) if row.vector is not None else None
+        if vector is None or len(vector) != index.dim:
+            index.remove(row.market_id)
+        else:
+            index.upsert(row.market_id, vector)
+        changed.add(row.market_id)
+    return changed, latest
+
+
+def _write_vectors(db, vectors: Dict[int, Optional[np.ndarray]], now: float):
+    existing = set(db.scalars(select(MarketVector.market_id).where(MarketVector.market_id.in_(list(vectors)))))
+    rows = [
+        {"market_id": market_id, "vector": vector.tobytes() if vector is not None else None, "updated_at": now}
+        for market_id, vector in vectors.items()
+    ]
+    updates = [row for row in rows if row["market_id"] in existing]
+    inserts = [row for row in rows if row["market_id"] not in existing]
+    if updates:
+        db.execute(update(MarketVector), updates)
+    if inserts:
+        db.execute(insert(MarketVector), inserts)
+
+
+def _write_lists(db, lists: Dict[int, List[Tuple[int, float]]], removed: Iterable[int] = ()):
+    targets = list(lists) + list(removed)
+    for start in range(0, len(targets), settings.RECOMMEND_BATCH_SIZE * 4):
+        db.execute(delete(MarketSimilar).where(MarketSimilar.market_id.in_(targets[start:start + settings.RECOMMEND_BATCH_SIZE * 4])))
+    rows = [
+        {"market_id": market_id, "rank": rank, "similar_id": similar_id, "score": score}
+        for market_id, neighbours in lists.items()
+        for rank, (similar_id, score) in enumerate(neighbours)
+    ]
+    for start in range(0, len(rows), 10000):
+        db.execute(insert(MarketSimilar), rows[start:start + 10000])
+
+
+class Recommender:
+    """
+    변경 표시, 메모리 행렬 동기화, 증분 재계산을 담당합니다. 백그라운드 스레드는 첫 변경 표시 때 시작됩니다.
+    """
+
+    def __init__(self, session_factory, dim: int, top_n: int, refresh_interval: float):
+        self.session_factory = session_factory
+        self.top_n = top_n
+        self.refresh_interval = refresh_interval
+        self.index = SimilarityIndex(dim)
+        self._dirty: Set[int] = set()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._synced_at: Optional[float] = None
+
+    def mark_changed(self, market_ids: Iterable[int]):
+        with self._lock:
+            self._dirty.update(market_ids)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="recommend-refresh", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("recommendation refresh failed")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.refresh()
+
+    def refresh(self):
+        with self._refresh_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+            if not dirty:
+                return
+            started = time.perf_counter()
+            try:
+                self._refresh(dirty)
+            except Exception:
+                RECOMMEND_REFRESHES.inc(result="error")
+                with self._lock:
+                    self._dirty.update(dirty)
+                raise
+            RECOMMEND_REFRESHES.inc(result="ok")
+            RECOMMEND_REFRESH_SECONDS.observe(time.perf_counter() - started)
+            RECOMMEND_INDEX_SIZE.set(len(self.index))
+
+    def _refresh(self, dirty: Set[int]):
+        db = self.session_factory()
+        try:
+            # 1) 바뀐 게시물의 벡터 계산 (삭제된 게시물은 None)
+            rows = db.execute(
+                select(Market.id, *[getattr(Market, name) for name in FEATURE_FIELDS]).where(Market.id.in_(list(dirty)))
+            ).mappings().all()
+            vectors: Dict[int, Optional[np.ndarray]] = {market_id: None for market_id in dirty}
+            for row in rows:
+                vectors[row["id"]] = vectorize(row, self.index.dim)
+            _write_vectors(db, vectors, time.time())
+            db.commit()
+
+            # 2) 다른 워커의 변경까지 메모리 행렬에 반영
+            _, self._synced_at = _load_vectors(db, self.index, self._synced_at)
+
+            # 3) 재계산 대상: 바뀐 게시물 + 그 게시물을 목록에 가진 게시물 + 바뀐 게시물과 가까운 게시물
+            removed = {market_id for market_id, vector in vectors.items() if vector is None}
+            alive = [market_id for market_id in dirty if market_id not in removed]
+            affected = set(alive)
+            affected.update(db.scalars(
+                select(MarketSimilar.market_id).where(MarketSimilar.similar_id.in_(list(dirty)))
+            ))
+            for neighbours in self.index.nearest(alive, self.top_n * settings.RECOMMEND_REVERSE_FANOUT).values():
+                affected.update(similar_id for similar_id, _ in neighbours)
+            affected -= removed
+            _write_lists(db, self.index.nearest(sorted(affected), self.top_n), removed)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+def rebuild(session_factory, dim: Optional[int] = None, top_n: Optional[int] = None) -> Dict[str, float]:
+    """
+    모든 게시물의 벡터와 유사 목록을 처음부터 다시 만듭니다.
+    """
+    dim = dim or settings.RECOMMEND_DIM
+    top_n = top_n or settings.RECOMMEND_TOP_N
+    index = SimilarityIndex(dim)
+    started = time.perf_counter()
+    db = session_factory()
+    try:
+        db.execute(delete(MarketVector))
+        db.execute(delete(MarketSimilar))
+        query = select(Market.id, *[getattr(Market, name) for name in FEATURE_FIELDS]).order_by(Market.id)
+        for row in db.execute(query.execution_options(yield_per=settings.RECOMMEND_BATCH_SIZE * 4)).mappings():
+            index.upsert(row["id"], vectorize(row, dim))
+        # 스트리밍 커서를 다 읽은 뒤에 씁니다 (MySQL 서버 측 커서는 읽는 도중 다른 문장을 실행할 수 없음)
+        now = time.time()
+        market_ids = [int(market_id) for market_id in index.ids[: len(index)]]
+        for start in range(0, len(market_ids), 10000):
+            db.execute(insert(MarketVector), [
+                {"market_id": market_id, "vector": index.matrix[start + offset].tobytes(), "updated_at": now}
+                for offset, market_id in enumerate(market_ids[start:start + 10000])
+            ])
+        vectorized = time.perf_counter() - started
+
+        step = settings.RECOMMEND_BATCH_SIZE * 16
+        for start in range(0, len(market_ids), step):
+            _write_lists(db, index.nearest(market_ids[start:start + step], top_n))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return {"markets": len(index), "vectorize_seconds": round(vectorized, 2), "total_seconds": round(time.perf_counter() - started, 2)}
+
+
+def _create_recommender() -> Recommender:
+    from database import SessionLocal
+
+    return Recommender(SessionLocal, settings.RECOMMEND_DIM, settings.RECOMMEND_TOP_N, settings.RECOMMEND_REFRESH_INTERVAL_SECONDS)
+
+
+recommender = _create_recommender()
+
+
+def mark_changed(market_ids: Iterable[int]):
+    """
+    crud.market 이 커밋한 뒤 호출합니다. 벡터와 유사 목록은 백그라운드에서 갱신됩니다.
+    """
+    if settings.RECOMMEND_ENABLED:
+        recommender.mark_changed(market_ids)
+
+
+def affects_features(values: Dict) -> bool:
+    return any(name in values for name in FEATURE_FIELDS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="마켓 유사 게시물 인덱스 전체 빌드")
+    parser.add_argument("--dim", type=int, default=settings.RECOMMEND_DIM)
+    parser.add_argument("--top-n", type=int, default=settings.RECOMMEND_TOP_N)
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    print(rebuild(SessionLocal, args.dim, args.top_n))
+
+
+if __name__ == "__main__":
+    main()
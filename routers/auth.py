@@ -2,6 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from datetime import timedelta, datetime
 import jwt
 from pydantic import BaseModel, EmailStr
@@ -10,6 +11,7 @@ import crud, schemas, database
 from config import settings
 from schemas.auth import Token, TokenData, UserResponse, UserCreate
 from database import get_db
+from admission import login_rate_limit, signup_rate_limit
 
 # 설정된 OAuth2PasswordBearer 인스턴스 생성
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
@@ -79,7 +81,7 @@ async def get_current_user(
 
 
 # 로그인 엔드포인트
-@router.post("/token", response_model=Token)
+@router.post("/token", response_model=Token, dependencies=[Depends(login_rate_limit)])
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
 ):
@@ -97,7 +99,10 @@ async def login_for_access_token(
         HTTPException: 사용자의 인증 정보가 올바르지 않을 때 발생.
     """
     user = crud.user.get_user_by_email(db, email=form_data.username)
-    if not user or not crud.user.verify_password(form_data.password, user.password):
+    # bcrypt 검증은 CPU 를 오래 쓰므로 스레드풀에서 실행해 이벤트 루프를 막지 않습니다
+    if not user or not await run_in_threadpool(
+        crud.user.verify_password, form_data.password, user.password
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="이메일 또는 비밀번호가 일치하지 않습니다.",
@@ -111,7 +116,7 @@ async def login_for_access_token(
 
 
 # 회원가입 엔드포인트
-@router.post("/signup", response_model=UserResponse)
+@router.post("/signup", response_model=UserResponse, dependencies=[Depends(signup_rate_limit)])
 async def signup(user: UserCreate, db: Session = Depends(get_db)):
     """
     새로운 사용자를 등록합니다.
@@ -132,5 +137,5 @@ async def signup(user: UserCreate, db: Session = Depends(get_db)):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="이메일이 이미 등록되어 있습니다.",
         )
-    new_user = crud.user.create_user(db=db, user=user)
+    new_user = await run_in_threadpool(crud.user.create_user, db=db, user=user)
     return new_user
@@ -1,21 +1,28 @@
 # app/routers/communities.py
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Request
 from fastapi.responses import FileResponse
 from models.user import User
 from models.community import Community
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import crud, schemas
-from database import get_db
+from config import settings
+from database import get_db, get_read_db, get_read_session_factory
+from schemas.bulk import BulkDeleteRequest, BulkItemResult, reject_duplicate_ids
 from uuid import uuid4
 from pathlib import Path
 from security import get_current_user
+import export
+import lazy
+
+images = lazy.module("images")
+jobs = lazy.module("jobs")
+trending = lazy.module("trending")
 
 router = APIRouter(prefix="/communities", tags=["Community"])
 
-# 이미지 저장 경로 설정
+# 이미지 저장 경로 설정 (디렉터리는 main.lifespan 에서 만듭니다)
 UPLOAD_DIR = Path("uploads/community_images")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 @router.post("/", response_model=schemas.community.CommunityResponse)
 async def create_community(
@@ -31,14 +38,92 @@ async def create_community(
     new_community = crud.community.create_community(db, community)
     return new_community
 
+@router.post("/bulk", response_model=List[BulkItemResult], status_code=status.HTTP_201_CREATED)
+async def bulk_create_communities(
+    payload: schemas.community.CommunityBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    여러 커뮤니티 게시물을 한 번에 생성합니다. (하나의 트랜잭션, 전부 성공하거나 전부 실패)
+    """
+    return crud.community.bulk_create_communities(db, payload.items, current_user.id)
+
+@router.patch("/bulk", response_model=List[BulkItemResult])
+async def bulk_update_communities(
+    payload: schemas.community.CommunityBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    여러 커뮤니티 게시물을 한 번에 수정합니다. 항목별 결과(updated / not_found / forbidden)를 반환합니다.
+    """
+    reject_duplicate_ids([item.id for item in payload.items])
+    return crud.community.bulk_update_communities(db, payload.items, current_user.id)
+
+@router.post("/bulk/delete", response_model=List[BulkItemResult])
+async def bulk_delete_communities(
+    payload: BulkDeleteRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    여러 커뮤니티 게시물을 한 번에 삭제합니다. 항목별 결과(deleted / not_found / forbidden)를 반환합니다.
+    """
+    reject_duplicate_ids(payload.ids)
+    return crud.community.bulk_delete_communities(db, payload.ids, current_user.id)
+
+@router.get("/feed", response_model=schemas.community.CommunityFeedPage)
+async def get_feed(
+    cursor: Optional[str] = Query(None, description="이전 페이지의 next_cursor"),
+    limit: int = Query(20, ge=1, le=100),
+    writer_id: Optional[int] = Query(None, description="지정하면 이 사용자의 게시물만 조회"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    커뮤니티 게시물을 최신순으로 페이지 단위로 조회합니다. 작성자 이름과 프로필 이미지를 포함합니다.
+    """
+    try:
+        return crud.community.list_feed(db, cursor, limit, writer_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="잘못된 cursor 입니다.")
+
+@router.get("/trending", response_model=List[schemas.community.CommunityTrendingItem])
+async def get_trending_communities(
+    limit: int = Query(20, ge=1, le=settings.TRENDING_TOP_K), db: Session = Depends(get_read_db)
+):
+    """
+    조회수와 답변 수를 시간 감쇠해 매긴 hot 점수 순으로 커뮤니티 게시물을 조회합니다.
+    """
+    ranked = trending.trending("community", limit)
+    rows = crud.community.get_communities_by_ids(db, [community_id for community_id, _ in ranked])
+    return [
+        {**rows[community_id], "hot_score": score}
+        for community_id, score in ranked
+        if community_id in rows
+    ]
+
+@router.get("/export")
+async def export_communities(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    session_factory=Depends(get_read_session_factory),
+):
+    """
+    모든 커뮤니티 게시물을 id 순으로 스트리밍합니다. (NDJSON 한 줄에 한 건 또는 CSV)
+    - `gzip=true` 이면 `.gz` 파일로 압축해 내려줍니다.
+    """
+    return export.stream(session_factory, crud.community.export_query(), "communities", format, gzip)
+
 @router.get("/{community_id}", response_model=schemas.community.CommunityResponse)
-async def get_community(community_id: int, db: Session = Depends(get_db)):
+async def get_community(community_id: int, db: Session = Depends(get_read_db)):
     """
     특정 커뮤니티 게시물의 상세 정보를 조회합니다.
     """
     community = crud.community.get_community(db, community_id)
     if not community:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="게시물을 찾을 수 없습니다.")
+    trending.record_view("community", community_id)
     return community
 
 @router.patch("/{community_id}", response_model=schemas.community.CommunityResponse)
@@ -51,23 +136,10 @@ async def update_community(
     """
     특정 커뮤니티 게시물을 수정합니다.
     """
-    # 게시물 조회
-    community = db.query(Community).filter(Community.id == community_id).first()
-    if not community:
+    updated_community = crud.community.update_community(db, community_id, community_update, current_user.id)
+    if not updated_community:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="게시물을 찾을 수 없습니다.")
-
-    # 작성자가 아닌 경우 권한 거부
-    if community.writer_id != current_user.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="권한이 없습니다.")
-
-    # 게시물 업데이트
-    for key, value in community_update.dict(exclude_unset=True).items():
-        setattr(community, key, value)
-
-    db.commit()
-    db.refresh(community)
-
-    return community
+    return updated_community
 
 @router.delete("/{community_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_community(
@@ -78,47 +150,64 @@ async def delete_community(
     """
     특정 커뮤니티 게시물을 삭제합니다.
     """
-    # 게시물 조회
-    community = crud.community.get_community(db, community_id)
-    if not community:
+    deleted = crud.community.delete_community(db, community_id, current_user.id)
+    if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="게시물을 찾을 수 없습니다.")
-    
-    # 작성자가 아닌 경우 권한 거부
-    if community.writer_id != current_user.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="권한이 없습니다.")
-
-    # 게시물 삭제
-    crud.community.delete_community(db, community_id)
     return
 
 @router.get("/", response_model=List[schemas.community.CommunitySearchResponse])
-async def list_communities(keyword: Optional[str] = None, db: Session = Depends(get_db)):
-    """
-    모든 커뮤니티 게시물을 조회하거나 키워드로 필터링합니다.
-    """
-    # 커뮤니티 게시물 목록을 조회합니다
-    communities = crud.community.list_communities(db, keyword)
-
-    # writer 정보를 포함한 응답 데이터 생성
-    response_data = []
-    for community in communities:
-        # writer_id를 기반으로 User를 조회합니다
-        writer = db.query(User).filter(User.id == community.writer_id).first()
-
-        # 응답 데이터에 writer 정보를 추가합니다
-        community_data = {
-            "id": community.id,
-            "title": community.title,
-            "content": community.content,
-            "image": community.image,
-            "created_at": community.created_at,
-            "writer_id": community.writer_id,
-            "writer_name": writer.name,
-            "answers": []  # answers는 현재 빈 리스트로 설정합니다
-        }
-        response_data.append(community_data)
-
-    return response_data
+async def list_communities(keyword: Optional[str] = None, db: Session = Depends(get_read_db)):
+    """
+    모든 커뮤니티 게시물을 최신순으로 조회하거나 키워드로 필터링합니다.
+    """
+    # 작성자 이름은 JOIN 으로 함께 가져오고, 답변은 수(answer_count)만 포함합니다
+    return crud.community.list_communities(db, keyword)
+
+@router.get("/{community_id}/answers", response_model=schemas.community.AnswerPage)
+async def list_answers(
+    community_id: int,
+    after: Optional[int] = Query(None, description="이전 페이지의 next_cursor"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """
+    특정 커뮤니티 게시물의 답변을 오래된 순으로 페이지 단위로 조회합니다.
+    """
+    page = crud.community.list_answers(db, community_id, after, limit)
+    if page is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="게시물을 찾을 수 없습니다.")
+    return page
+
+@router.post("/{community_id}/answers", response_model=schemas.community.AnswerResponse, status_code=status.HTTP_201_CREATED)
+async def create_answer(
+    community_id: int,
+    answer: schemas.community.AnswerCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    특정 커뮤니티 게시물에 답변을 작성합니다.
+    """
+    new_answer = crud.community.create_answer(db, community_id, answer, current_user)
+    if not new_answer:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="게시물을 찾을 수 없습니다.")
+    trending.record_interaction("community", community_id)
+    return new_answer
+
+@router.delete("/{community_id}/answers/{answer_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_answer(
+    community_id: int,
+    answer_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    본인이 작성한 답변을 삭제합니다.
+    """
+    deleted = crud.community.delete_answer(db, community_id, answer_id, current_user.id)
+    if not deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="답변을 찾을 수 없습니다.")
+    return
 
 @router.post("/{community_id}/image", status_code=status.HTTP_201_CREATED)
 async def upload_image(
@@ -148,16 +237,28 @@ async def upload_image(
         buffer.write(file.file.read())
 
     # 이미지 경로를 데이터베이스에 업데이트
+    old_image = community.image
     community.image = image_filename
     db.commit()
 
+    # 이미지 검증과 이전 이미지 삭제는 백그라운드 작업으로 처리합니다
+    jobs.enqueue("verify_image", kind="community", owner_id=community_id, filename=image_filename)
+    if old_image:
+        jobs.enqueue("delete_image", kind="community", filename=old_image)
+
     # 업로드된 이미지의 경로를 반환
     return {"filename": image_filename}
 
 @router.get("/{community_id}/image", response_class=FileResponse)
-async def get_community_image(community_id: int, db: Session = Depends(get_db)):
+async def get_community_image(
+    community_id: int,
+    request: Request,
+    size: str = Query("full", pattern="^(thumb|medium|full)$", description="thumb / medium 은 WebP(또는 JPEG) 파생본"),
+    db: Session = Depends(get_read_db),
+):
     """
     특정 커뮤니티 게시물의 이미지를 반환합니다.
+    - `size`: `thumb`, `medium` 은 축소한 파생본, `full` 은 원본
     """
     # community_id로 커뮤니티 게시물 조회
     community = db.query(Community).filter(Community.id == community_id).first()
@@ -174,5 +275,5 @@ async def get_community_image(community_id: int, db: Session = Depends(get_db)):
     if not image_path.exists():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="이미지를 찾을 수 없습니다.")
 
-    # 이미지 파일 반환
-    return FileResponse(image_path)
+    # 이미지 파일 반환 (파생본은 없으면 만들어 재사용)
+    return await images.respond(request, UPLOAD_DIR, community.image, size)
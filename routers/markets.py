@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File, Request
 from fastapi.responses import FileResponse
 from models.user import User
 from models.market import Market
@@ -6,15 +6,23 @@ from security import get_current_user
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import crud, schemas
-from database import get_db
+from config import settings
+from database import get_db, get_read_db, get_read_session_factory
+from schemas.bulk import BulkDeleteRequest, BulkItemResult, reject_duplicate_ids
 from uuid import uuid4
 from pathlib import Path
+import analytics
+import export
+import lazy
+
+images = lazy.module("images")
+jobs = lazy.module("jobs")
+trending = lazy.module("trending")
 
 router = APIRouter(prefix="/markets", tags=["Market"])
 
-# 이미지 저장 경로 설정
+# 이미지 저장 경로 설정 (디렉터리는 main.lifespan 에서 만듭니다)
 UPLOAD_DIR = Path("uploads/market_images")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 @router.post("/", response_model=schemas.market.MarketResponse)
 async def create_market(
@@ -29,6 +37,41 @@ async def create_market(
     new_market = crud.market.create_market(db, market)
     return new_market
 
+@router.post("/bulk", response_model=List[BulkItemResult], status_code=status.HTTP_201_CREATED)
+async def bulk_create_markets(
+    payload: schemas.market.MarketBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    여러 마켓 게시물을 한 번에 생성합니다. (하나의 트랜잭션, 전부 성공하거나 전부 실패)
+    """
+    return crud.market.bulk_create_markets(db, payload.items, current_user.id)
+
+@router.patch("/bulk", response_model=List[BulkItemResult])
+async def bulk_update_markets(
+    payload: schemas.market.MarketBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    여러 마켓 게시물을 한 번에 수정합니다. 항목별 결과(updated / not_found / forbidden)를 반환합니다.
+    """
+    reject_duplicate_ids([item.id for item in payload.items])
+    return crud.market.bulk_update_markets(db, payload.items, current_user.id)
+
+@router.post("/bulk/delete", response_model=List[BulkItemResult])
+async def bulk_delete_markets(
+    payload: BulkDeleteRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    여러 마켓 게시물을 한 번에 삭제합니다. 항목별 결과(deleted / not_found / forbidden)를 반환합니다.
+    """
+    reject_duplicate_ids(payload.ids)
+    return crud.market.bulk_delete_markets(db, payload.ids, current_user.id)
+
 @router.patch("/{market_id}", response_model=schemas.market.MarketResponse)
 async def update_market(
     market_id: int,
@@ -44,34 +87,121 @@ async def update_market(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="게시물을 찾을 수 없습니다.")
     return updated_market
 
+@router.get("/trending", response_model=List[schemas.market.MarketTrendingItem])
+async def get_trending_markets(
+    limit: int = Query(20, ge=1, le=settings.TRENDING_TOP_K), db: Session = Depends(get_read_db)
+):
+    """
+    조회수를 시간 감쇠해 매긴 hot 점수 순으로 마켓 게시물을 조회합니다.
+    """
+    ranked = trending.trending("market", limit)
+    rows = crud.market.get_markets_by_ids(db, [market_id for market_id, _ in ranked])
+    return [
+        {**rows[market_id], "hot_score": score}
+        for market_id, score in ranked
+        if market_id in rows
+    ]
+
+@router.get("/nearby", response_model=List[schemas.market.NearbyMarketResponse])
+async def get_nearby_markets(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(5.0, gt=0, le=settings.NEARBY_MAX_RADIUS_KM, description="반경 (km)"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+):
+    """
+    주어진 좌표에서 반경 `radius` km 안의 마켓 게시물을 가까운 순으로 조회합니다. (`distance_km` 포함)
+    """
+    return crud.market.list_nearby_markets(db, lat, lon, radius, limit)
+
+@router.get("/export")
+async def export_markets(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    session_factory=Depends(get_read_session_factory),
+):
+    """
+    모든 마켓 게시물을 id 순으로 스트리밍합니다. (NDJSON 한 줄에 한 건 또는 CSV)
+    - `gzip=true` 이면 `.gz` 파일로 압축해 내려줍니다.
+    """
+    return export.stream(session_factory, crud.market.export_query(), "markets", format, gzip)
+
 @router.get("/{market_id}", response_model=schemas.market.MarketResponse)
-async def get_market(market_id: int, db: Session = Depends(get_db)):
+async def get_market(market_id: int, db: Session = Depends(get_read_db)):
     """
     특정 마켓 게시물의 상세 정보를 조회합니다.
     """
     market = crud.market.get_market(db, market_id)
     if not market:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="게시물을 찾을 수 없습니다.")
+    trending.record_view("market", market_id)
     return market
 
+@router.get("/{market_id}/similar", response_model=List[schemas.market.SimilarMarketResponse])
+async def list_similar_markets(
+    market_id: int, limit: int = Query(10, ge=1, le=settings.RECOMMEND_TOP_N), db: Session = Depends(get_read_db)
+):
+    """
+    내용, 작물, 해시태그, 지역이 비슷한 마켓 게시물을 유사한 순으로 조회합니다. (미리 계산된 목록)
+    """
+    similar = crud.market.list_similar_markets(db, market_id, limit)
+    if similar is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="게시물을 찾을 수 없습니다.")
+    return similar
+
 @router.delete("/{market_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_market(market_id: int, db: Session = Depends(get_db)):
+async def delete_market(
+    market_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
     """
-    특정 마켓 게시물을 삭제합니다.
+    특정 마켓 게시물을 삭제합니다. (작성자만 가능)
     """
-    market = crud.market.delete_market(db, market_id)
+    market = crud.market.delete_market(db, market_id, current_user.id)
     if not market:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="게시물을 찾을 수 없습니다.")
     return
 
 @router.get("/", response_model=List[schemas.market.MarketResponse])
-async def list_markets(keyword: Optional[str] = None, db: Session = Depends(get_db)):
+async def list_markets(
+    keyword: Optional[str] = None,
+    tag: Optional[List[str]] = Query(None),
+    match: str = Query("any", pattern="^(any|all)$"),
+    db: Session = Depends(get_read_db),
+):
     """
-    모든 마켓 게시물 목록을 조회하거나 검색어로 필터링합니다.
+    모든 마켓 게시물 목록을 조회하거나 검색어/해시태그로 필터링합니다.
+    - `tag`: 해시태그 (여러 번 지정 가능, 예: `?tag=유기농&tag=딸기`)
+    - `match`: `any` 는 하나라도 포함(OR), `all` 은 모두 포함(AND)
     """
-    markets = crud.market.list_markets(db, keyword)
+    markets = crud.market.list_markets(db, keyword, tags=tag, match=match)
     return markets
 
+@router.get("/tags/popular", response_model=List[schemas.market.TagCountResponse])
+async def list_popular_tags(
+    limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_read_db)
+):
+    """
+    게시물 수가 많은 순으로 인기 해시태그를 조회합니다.
+    """
+    return crud.market.list_popular_tags(db, limit)
+
+@router.get("/analytics/prices", response_model=List[schemas.market.PriceStatsResponse])
+async def get_price_stats(
+    by: str = Query("crop", pattern="^(crop|location)$"),
+    key: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+):
+    """
+    작물별(`by=crop`) 또는 지역별(`by=location`) 가격 통계(개수, 최소, 최대, 평균, 근사 중앙값)를 조회합니다.
+    - `key`: 특정 작물/지역만 조회 (예: `?by=crop&key=딸기`)
+    - 게시물 수가 많은 순으로 최대 `limit` 개를 반환합니다.
+    """
+    return analytics.get_price_stats(db, by, key, limit)
+
 @router.post("/{market_id}/image", status_code=status.HTTP_201_CREATED)
 async def upload_market_image(
     market_id: int,
@@ -101,16 +231,28 @@ async def upload_market_image(
     
 
     # 이미지 경로를 데이터베이스에 업데이트
+    old_image = market.image
     market.image = image_filename
     db.commit()
 
+    # 이미지 검증과 이전 이미지 삭제는 백그라운드 작업으로 처리합니다
+    jobs.enqueue("verify_image", kind="market", owner_id=market_id, filename=image_filename)
+    if old_image:
+        jobs.enqueue("delete_image", kind="market", filename=old_image)
+
     # 업로드된 이미지의 경로를 반환
     return {"filename": image_filename}
 
 @router.get("/{market_id}/image", response_class=FileResponse)
-async def get_market_image(market_id: int, db: Session = Depends(get_db)):
+async def get_market_image(
+    market_id: int,
+    request: Request,
+    size: str = Query("full", pattern="^(thumb|medium|full)$", description="thumb / medium 은 WebP(또는 JPEG) 파생본"),
+    db: Session = Depends(get_read_db),
+):
     """
     특정 마켓 게시물의 이미지를 반환합니다.
+    - `size`: `thumb`, `medium` 은 축소한 파생본, `full` 은 원본
     """
     # market_id로 마켓 게시물 조회
     market = db.query(Market).filter(Market.id == market_id).first()
@@ -127,5 +269,5 @@ async def get_market_image(market_id: int, db: Session = Depends(get_db)):
     if not image_path.exists():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="이미지를 찾을 수 없습니다.")
 
-    # 이미지 파일 반환
-    return FileResponse(image_path)
+    # 이미지 파일 반환 (파생본은 없으면 만들어 재사용)
+    return await images.respond(request, UPLOAD_DIR, market.image, size)
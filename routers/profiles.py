@@ -0,0 +1,62 @@
+# app/routers/profiles.py
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse, Response
+from pydantic import BaseModel
+from typing import List, Optional
+from config import settings
+import lazy
+
+profiler = lazy.module("profiler")
+
+class ProfileInfoResponse(BaseModel):
+    id: str
+    created_at: str
+    method: str
+    path: str
+    route: str
+    status: int
+    duration_ms: float
+    trigger: str
+    samples: int
+
+
+def verify_profile_token(x_profile: Optional[str] = Header(None)):
+    # 토큰이 설정되지 않았으면 엔드포인트 자체를 숨깁니다
+    if not settings.PROFILING_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_profile or not secrets.compare_digest(x_profile.encode(), settings.PROFILING_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="권한이 없습니다.")
+
+
+router = APIRouter(prefix="/profiles", tags=["Profiles"], dependencies=[Depends(verify_profile_token)])
+
+
+@router.get("/", response_model=List[ProfileInfoResponse])
+def list_profiles():
+    """
+    저장된 프로파일 목록을 최신순으로 반환합니다. (`X-Profile` 헤더에 프로파일링 토큰 필요)
+    """
+    return [info.__dict__ for info in profiler.store.list()]
+
+
+@router.get("/{profile_id}")
+def get_profile(profile_id: str, format: str = "text"):
+    """
+    프로파일 하나를 반환합니다.
+    - `format=text`: 누적 시간순 호출 트리 (pstats)
+    - `format=collapsed`: flame graph 용 collapsed stack (flamegraph.pl, speedscope)
+    - `format=pstats`: cProfile 바이너리 (snakeviz, flameprof 등)
+    """
+    profile = profiler.store.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="프로파일을 찾을 수 없습니다.")
+    if format == "collapsed":
+        return PlainTextResponse(profile.collapsed)
+    if format == "pstats":
+        return Response(
+            profile.pstats_data,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.pstats"'},
+        )
+    return PlainTextResponse(profile.call_tree)
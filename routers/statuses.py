@@ -1,13 +1,38 @@
-from fastapi import FastAPI, HTTPException, APIRouter
+from fastapi import FastAPI, HTTPException, APIRouter, Depends, Header, Path, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
+import asyncio
+import json
+import secrets
+import time
+
+from config import settings
+from models.user import User
+from security import get_current_user
+import devices
+import lazy
+import metrics
+import sensor_state
+
+# NumPy 를 쓰는 모듈은 첫 센서 데이터나 조회 때 임포트합니다
+anomaly = lazy.module("anomaly")
+archive = lazy.module("archive")
 
 # APIRouter 인스턴스 생성
 router = APIRouter()
 
-# 최근 센서 및 제어 데이터를 저장할 변수
-latest_data: Dict[str, Any] = {}
+# 장치 id 없이 POST /statuses/data 로 올린 데이터의 장치 id
+DEFAULT_DEVICE_ID = "default"
+# /statuses/latest 한 번에 조회할 수 있는 최대 장치 수
+MAX_LATEST_DEVICES = 500
+# /statuses/alerts/ws 구독자마다 보내지 못하고 쌓아 둘 수 있는 알림 수
+ALERT_STREAM_BUFFER = 256
+ALERTS_WS_PATH = "/statuses/alerts/ws"
+
+DEVICE_ID_PATTERN = r"^[A-Za-z0-9_.:-]{1,64}$"
 
 
 # Pydantic 모델 정의
@@ -16,26 +41,324 @@ class SensorControlData(BaseModel):
     controls: Dict[str, Any]
 
 
+class ControlCommandRequest(BaseModel):
+    controls: Dict[str, Any]
+
+
+class ControlCommandResponse(BaseModel):
+    device_id: str
+    seq: int
+    controls: Dict[str, Any]
+    status: str  # queued: 장치 미연결, sent: 전송됨, acked: 장치가 적용함
+    created_at: datetime
+    acked_at: Optional[datetime] = None
+
+
+class AlertResponse(BaseModel):
+    device_id: str
+    sensor: str
+    value: float
+    mean: float
+    std: float
+    z: float
+    timestamp: datetime
+
+
+class HistoryResponse(BaseModel):
+    device_id: str
+    sensor: str
+    start: datetime
+    end: datetime
+    bucket_seconds: float
+    t: List[int]  # 버킷 시작 시각 (epoch 밀리초)
+    mean: List[float]
+    min: List[float]
+    max: List[float]
+    count: List[int]
+
+
+class DeviceStatusResponse(BaseModel):
+    device_id: str
+    connected: bool
+    connected_at: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
+    last_seq: int
+    last_uplink_seq: int
+    pending: int
+
+
+def _datetime(timestamp: Optional[float]) -> Optional[datetime]:
+    return None if timestamp is None else datetime.fromtimestamp(timestamp)
+
+
+def _store(device_id: str, data: SensorControlData) -> bytes:
+    # 데이터에 타임스탬프 추가
+    record = sensor_state.encode(device_id, datetime.now().isoformat(), data.sensors, data.controls)
+    try:
+        sensor_state.store.put(device_id, record)
+    except sensor_state.RecordTooLarge as exc:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc))
+    except sensor_state.StateStoreError as exc:
+        raise HTTPException(status_code=status.HTTP_507_INSUFFICIENT_STORAGE, detail=str(exc))
+    anomaly.detector.submit(device_id, data.sensors)
+    if settings.SENSOR_ARCHIVE_ENABLED:
+        archive.store.record(device_id, data.sensors)
+    return record
+
+
+def _json(body: bytes) -> Response:
+    # 저장된 레코드는 이미 JSON 이므로 다시 직렬화하지 않습니다
+    return Response(body, media_type="application/json")
+
+
+def _legacy(record: bytes) -> Dict[str, Any]:
+    # 기존 /statuses/data 응답 형태(timestamp, sensors, controls)를 유지합니다. device_id 는 장치별 라우트에만 넣습니다
+    body = json.loads(record)
+    body.pop("device_id", None)
+    return body
+
+
 @router.get("/data", response_model=Dict[str, Any])
 def get_latest_sensor_data():
     """
-    최근 센서 및 제어 데이터를 반환하는 API
+    장치 id 없이 올린(POST /statuses/data) 최근 센서 및 제어 데이터를 반환하는 API
     """
-    if not latest_data:
+    record = sensor_state.store.get(DEFAULT_DEVICE_ID)
+    if record is None:
         raise HTTPException(status_code=404, detail="No sensor data available")
-    return latest_data
+    return _legacy(record)
 
 
 @router.post("/data", response_model=Dict[str, Any])
 def update_sensor_data(data: SensorControlData):
     """
-    센서 및 제어 데이터를 업데이트하는 API
+    센서 및 제어 데이터를 업데이트하는 API (장치 id 는 "default")
     """
-    global latest_data
-    # 데이터에 타임스탬프 추가
-    latest_data = {
-        "timestamp": datetime.now().isoformat(),
-        "sensors": data.sensors,
-        "controls": data.controls,
-    }
-    return latest_data
+    return _legacy(_store(DEFAULT_DEVICE_ID, data))
+
+
+@router.get("/latest", response_model=List[Dict[str, Any]])
+def get_latest_sensor_data_batch(
+    ids: List[str] = Query(..., description="장치 ID 목록 (ids=a,b,c 또는 ids=a&ids=b)"),
+):
+    """
+    여러 장치의 최근 센서 및 제어 데이터를 한 번에 반환합니다.
+    - `ids`: 장치 ID 목록. 요청한 순서대로 반환하며, 데이터가 없는 장치는 제외합니다.
+    """
+    device_ids = list(dict.fromkeys(part.strip() for value in ids for part in value.split(",") if part.strip()))
+    if len(device_ids) > MAX_LATEST_DEVICES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"한 번에 최대 {MAX_LATEST_DEVICES}개 장치까지 조회할 수 있습니다.",
+        )
+    records = sensor_state.store.get_many(device_ids)
+    return _json(sensor_state.join([records[device_id] for device_id in device_ids if device_id in records]))
+
+
+@router.get("/alerts", response_model=List[AlertResponse])
+def list_alerts(
+    device_id: Optional[str] = Query(None, pattern=DEVICE_ID_PATTERN),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    최근 센서 이상치 알림을 최신순으로 반환합니다.
+    - `device_id`: 지정하면 그 장치의 알림만 반환합니다.
+    """
+    return [alert.to_dict() for alert in anomaly.detector.alerts(device_id, limit)]
+
+
+@router.websocket("/alerts/ws")
+async def alert_stream(websocket: WebSocket, device_id: Optional[str] = Query(None, pattern=DEVICE_ID_PATTERN)):
+    """
+    센서 이상치 알림이 생길 때마다 JSON 텍스트 프레임으로 보내는 채널입니다.
+    """
+    await websocket.accept()
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=ALERT_STREAM_BUFFER)
+
+    def push(alerts):
+        # 탐지 스레드에서 호출됩니다. 느린 구독자의 버퍼가 차면 그 알림은 버립니다
+        for alert in alerts:
+            if device_id is None or alert.device_id == device_id:
+                loop.call_soon_threadsafe(_offer, queue, alert)
+
+    unsubscribe = anomaly.detector.subscribe(push)
+    metrics.WS_CONNECTIONS.inc(path=ALERTS_WS_PATH)
+    receiver = asyncio.create_task(websocket.receive_text())
+    getter = None
+    try:
+        while True:
+            # getter 는 알림을 꺼낼 때까지 재사용합니다. 취소하면 같은 순간에 꺼낸 알림을 잃을 수 있습니다
+            if getter is None:
+                getter = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                text = json.dumps(getter.result().to_dict(), ensure_ascii=False)
+                getter = None
+                await websocket.send_text(text)
+                metrics.WS_FRAMES.inc(path=ALERTS_WS_PATH, direction="out")
+                metrics.WS_BYTES.inc(len(text), path=ALERTS_WS_PATH, direction="out")
+            if receiver in done:
+                # 구독자는 보내는 메시지가 없으므로 수신이 끝나면 연결이 닫힌 것입니다
+                receiver.result()
+                receiver = asyncio.create_task(websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        if getter is not None:
+            getter.cancel()
+        unsubscribe()
+        metrics.WS_CONNECTIONS.dec(path=ALERTS_WS_PATH)
+
+
+def _offer(queue: asyncio.Queue, alert):
+    try:
+        queue.put_nowait(alert)
+    except asyncio.QueueFull:
+        pass
+
+
+@router.get("/{device_id}/data", response_model=Dict[str, Any])
+def get_device_sensor_data(device_id: str = Path(..., pattern=DEVICE_ID_PATTERN)):
+    """
+    장치 하나의 최근 센서 및 제어 데이터를 반환합니다.
+    """
+    record = sensor_state.store.get(device_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="No sensor data available")
+    return _json(record)
+
+
+@router.post("/{device_id}/data", response_model=Dict[str, Any])
+def update_device_sensor_data(data: SensorControlData, device_id: str = Path(..., pattern=DEVICE_ID_PATTERN)):
+    """
+    장치 하나의 센서 및 제어 데이터를 업데이트합니다. (WebSocket 채널을 쓰지 않는 장치용)
+    """
+    return _json(_store(device_id, data))
+
+
+@router.get("/{device_id}/history", response_model=HistoryResponse)
+def get_device_sensor_history(
+    device_id: str = Path(..., pattern=DEVICE_ID_PATTERN),
+    sensor: str = Query(..., description="센서 이름 (SENSOR_ARCHIVE_SENSORS 중 하나)"),
+    start: Optional[datetime] = Query(None, description="기본값: end 의 하루 전"),
+    end: Optional[datetime] = Query(None, description="기본값: 현재 시각"),
+    points: int = Query(500, ge=1, le=5000, description="나눌 구간 수 (차트의 점 개수)"),
+):
+    """
+    장기 보관소에 쌓인 장치 센서 기록을 구간별 평균/최소/최대로 집계해 반환합니다.
+    - 시간대가 없는 시각은 서버 현지 시각으로 봅니다. 최근 SENSOR_ARCHIVE_FLUSH_SECONDS 초 이내의 값은 빠질 수 있습니다.
+    """
+    if sensor not in archive.store.sensors:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="보관하지 않는 센서입니다.")
+    # 시간대가 있는 값과 없는 값이 섞여도 비교할 수 있도록 epoch 초로 바꿔서 다룹니다
+    end_at = end.timestamp() if end else time.time()
+    start_at = start.timestamp() if start else end_at - 86400
+    if start_at >= end_at:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start 는 end 보다 앞서야 합니다.")
+    if end_at - start_at > settings.SENSOR_ARCHIVE_MAX_RANGE_DAYS * 86400:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"한 번에 최대 {settings.SENSOR_ARCHIVE_MAX_RANGE_DAYS}일까지 조회할 수 있습니다.",
+        )
+    history = archive.store.query(device_id, sensor, start_at, end_at, points)
+    return {"device_id": device_id, "sensor": sensor, "start": _datetime(start_at), "end": _datetime(end_at), **history}
+
+
+@router.get("/devices", response_model=List[DeviceStatusResponse])
+async def list_devices(current_user: User = Depends(get_current_user)):
+    """
+    이 워커에 알려진 장치의 연결 상태와 미확인 명령 수를 반환합니다.
+    """
+    return [
+        {**device, "connected_at": _datetime(device["connected_at"]), "last_seen": _datetime(device["last_seen"])}
+        for device in devices.hub.snapshot()
+    ]
+
+
+@router.post("/devices/{device_id}/controls", response_model=ControlCommandResponse)
+async def send_control_command(
+    body: ControlCommandRequest,
+    device_id: str = Path(..., pattern=DEVICE_ID_PATTERN),
+    wait: bool = Query(False, description="장치가 확인할 때까지 최대 DEVICE_ACK_WAIT_SECONDS 초 기다립니다."),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    장치에 제어 명령을 보냅니다. 장치가 WebSocket 으로 연결되어 있으면 바로 전달되고,
+    아니면 다음 연결 때 전달됩니다.
+    """
+    command = await devices.hub.command(device_id, body.controls)
+    if wait and command.sent_at is not None:
+        try:
+            await asyncio.wait_for(command.acked.wait(), settings.DEVICE_ACK_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+    return ControlCommandResponse(
+        device_id=device_id,
+        seq=command.seq,
+        controls=command.controls,
+        status=command.status,
+        created_at=_datetime(command.created_at),
+        acked_at=_datetime(command.acked_at),
+    )
+
+
+@router.websocket("/devices/{device_id}/ws")
+async def device_channel(
+    websocket: WebSocket,
+    device_id: str = Path(..., pattern=DEVICE_ID_PATTERN),
+    token: Optional[str] = Query(None),
+    x_device_token: Optional[str] = Header(None),
+):
+    """
+    장치의 센서 업링크와 제어 다운링크 채널. 메시지 형식은 devices.py 를 참고하세요.
+    """
+    # 연결하면 그 장치의 기존 연결을 대신하고 제어 명령을 받게 되므로, DEVICE_TOKEN 이 없으면 아무도 연결할 수 없습니다
+    supplied = token or x_device_token or ""
+    if not settings.DEVICE_TOKEN or not secrets.compare_digest(supplied.encode(), settings.DEVICE_TOKEN.encode()):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    channel = await devices.hub.attach(device_id, websocket)
+    try:
+        while True:
+            try:
+                # 수신이 없어도 미확인 명령의 재전송 시각을 놓치지 않도록 타임아웃의 절반마다 깨어납니다
+                text = await asyncio.wait_for(websocket.receive_text(), settings.DEVICE_ACK_TIMEOUT_SECONDS / 2)
+            except asyncio.TimeoutError:
+                await channel.resend_due()
+                continue
+            metrics.WS_FRAMES.inc(path=devices.WS_PATH, direction="in")
+            metrics.WS_BYTES.inc(len(text), path=devices.WS_PATH, direction="in")
+            channel.last_seen = time.time()
+            try:
+                message = json.loads(text)
+                kind = message["type"]
+                seq = int(message.get("seq", 0))
+                if kind == "data":
+                    data = SensorControlData(sensors=message.get("sensors"), controls=message.get("controls"))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                await channel.send(json.dumps({"type": "error", "detail": "잘못된 메시지입니다."}))
+                continue
+            if kind == "data":
+                if 0 < seq <= channel.last_uplink_seq and not (seq == 1 and channel.last_uplink_seq > 1):
+                    # ack 가 유실됐거나 재연결 후 다시 보낸 프레임. 이상치 탐지/보관소에 두 번 들어가지 않도록
+                    # 저장하지 않고 확인만 다시 보냅니다 (seq 1 은 재부팅한 장치의 새 시작으로 봅니다)
+                    await channel.send(json.dumps({"type": "ack", "seq": seq}))
+                    continue
+                try:
+                    # 상태 저장소의 파일 잠금/mmap 쓰기가 이벤트 루프를 막지 않도록 스레드 풀에서 실행합니다
+                    await run_in_threadpool(_store, device_id, data)
+                except HTTPException as exc:
+                    await channel.send(json.dumps({"type": "error", "seq": seq, "detail": exc.detail}, ensure_ascii=False))
+                    continue
+                channel.last_uplink_seq = seq
+                await channel.send(json.dumps({"type": "ack", "seq": seq}))
+            elif kind == "ack":
+                channel.ack(seq)
+            await channel.resend_due()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        devices.hub.detach(channel, websocket)
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Query, Request
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 import crud, schemas, database
-from schemas.user import UserResponse, UserLinkCreate, UserLinkResponse
+import lazy
+from schemas.user import UserResponse, UserLinkCreate, UserLinkResponse, UserProfile
 import jwt
 from typing import List, Optional
 from config import settings
@@ -11,11 +12,16 @@ from pathlib import Path
 from models.user import User, UserLink
 from security import get_current_user
 
+images = lazy.module("images")
+jobs = lazy.module("jobs")
+
 router = APIRouter(prefix="/users", tags=["Users"])
 
-# 프로필 이미지 저장 경로 설정
+# 프로필 이미지 저장 경로 설정 (디렉터리는 main.lifespan 에서 만듭니다)
 UPLOAD_DIR = Path("uploads/avatars")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+
+# /users/batch 한 번에 조회할 수 있는 최대 사용자 수
+MAX_BATCH_USERS = 200
 
 @router.get("/me", response_model=UserResponse)
 async def read_user_me(
@@ -63,23 +69,26 @@ async def update_user_avatar(
     with open(avatar_path, "wb") as buffer:
         buffer.write(avatar.file.read())
     
-    # 기존 프로필 이미지 삭제 (옵션)
-    if current_user.avatar:
-        old_avatar_path = Path(current_user.avatar)
-        if old_avatar_path.exists():
-            old_avatar_path.unlink()
-
     # DB에 저장할 경로
+    old_avatar = current_user.avatar
     update_data = {"avatar": str(avatar_filename)}
     updated_user = crud.user.update_user(db, user_id=current_user.id, update_data=update_data)
+
+    # 이미지 검증과 기존 프로필 이미지 삭제는 백그라운드 작업으로 처리합니다
+    jobs.enqueue("verify_image", kind="avatar", owner_id=current_user.id, filename=avatar_filename)
+    if old_avatar:
+        jobs.enqueue("delete_image", kind="avatar", filename=old_avatar)
     return updated_user
 
 @router.get("/me/avatar", response_class=FileResponse)
 async def get_user_avatar(
+    request: Request,
+    size: str = Query("full", pattern="^(thumb|medium|full)$", description="thumb / medium 은 WebP(또는 JPEG) 파생본"),
     current_user: schemas.user.UserResponse = Depends(get_current_user),
 ):
     """
     현재 로그인된 사용자의 프로필 이미지를 반환합니다.
+    - `size`: `thumb`, `medium` 은 축소한 파생본, `full` 은 원본
     """
     if not current_user.avatar:
         raise HTTPException(
@@ -92,52 +101,88 @@ async def get_user_avatar(
             status_code=status.HTTP_404_NOT_FOUND, detail="프로필 이미지를 찾을 수 없습니다."
         )
     
-    return FileResponse(avatar_path)
+    return await images.respond(request, UPLOAD_DIR, current_user.avatar, size)
 
 @router.get("/{id}/avatar", response_class=FileResponse)
 async def get_user_avatar_by_id(
-    id: int, db: Session = Depends(database.get_db)
+    id: int,
+    request: Request,
+    size: str = Query("full", pattern="^(thumb|medium|full)$", description="thumb / medium 은 WebP(또는 JPEG) 파생본"),
+    db: Session = Depends(database.get_read_db),
 ):
     """
     특정 사용자의 프로필 이미지를 반환합니다.
     - `id`: 사용자 ID
+    - `size`: `thumb`, `medium` 은 축소한 파생본, `full` 은 원본
     """
     
-    # 사용자 조회
-    user = crud.user.get_user_by_id(db, user_id=id)   
+    # 사용자 조회 (프로필 캐시)
+    user = crud.user.get_user_profile(db, user_id=id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="사용자를 찾을 수 없습니다."
         )
 
     # 프로필 이미지 경로 확인
-    if not user.avatar:
+    if not user["avatar"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="프로필 이미지가 설정되지 않았습니다."
         )
 
-    avatar_path = UPLOAD_DIR / user.avatar
+    avatar_path = UPLOAD_DIR / user["avatar"]
     if not avatar_path.exists():
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="프로필 이미지를 찾을 수 없습니다."
         )
 
-    return FileResponse(avatar_path)
+    return await images.respond(request, UPLOAD_DIR, user["avatar"], size)
 
 @router.get("/{id}/name", response_model=dict)
 async def get_user_name_by_id(
-    id: int, db: Session = Depends(database.get_db)
+    id: int, db: Session = Depends(database.get_read_db)
 ):
     """
     특정 사용자의 이름을 반환합니다.
     - `id`: 사용자 ID
     """
-    user = crud.user.get_user_by_id(db, user_id=id)
+    user = crud.user.get_user_profile(db, user_id=id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="사용자를 찾을 수 없습니다."
         )
-    return {"name": user.name}
+    return {"name": user["name"]}
+
+@router.get("/batch", response_model=List[UserProfile])
+async def get_user_profiles(
+    ids: List[str] = Query(..., description="사용자 ID 목록 (ids=1,2,3 또는 ids=1&ids=2)"),
+    db: Session = Depends(database.get_read_db),
+):
+    """
+    여러 사용자의 이름과 프로필 이미지 URL 을 한 번에 반환합니다.
+    - `ids`: 사용자 ID 목록. 요청한 순서대로 반환하며, 존재하지 않는 사용자는 제외합니다.
+    """
+    try:
+        user_ids = [int(part) for value in ids for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="사용자 ID 는 정수여야 합니다."
+        )
+    user_ids = list(dict.fromkeys(user_ids))
+    if len(user_ids) > MAX_BATCH_USERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"한 번에 최대 {MAX_BATCH_USERS}명까지 조회할 수 있습니다.",
+        )
+    profiles = crud.user.get_user_profiles(db, user_ids)
+    return [
+        UserProfile(
+            id=user_id,
+            name=profiles[user_id]["name"],
+            avatar_url=f"/users/{user_id}/avatar" if profiles[user_id]["avatar"] else None,
+        )
+        for user_id in user_ids
+        if user_id in profiles
+    ]
 
 ### 1. POST: Add a new user link
 @router.post("/link", response_model=UserLinkResponse, status_code=status.HTTP_201_CREATED)
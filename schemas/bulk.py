@@ -0,0 +1,21 @@
+# app/schemas/bulk.py
+from fastapi import HTTPException, status
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+# 한 번의 요청으로 처리할 수 있는 최대 항목 수
+MAX_BULK_ITEMS = 1000
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: str  # created | updated | deleted | not_found | forbidden
+    detail: Optional[str] = None
+
+def reject_duplicate_ids(ids: List[int]):
+    # 같은 id 를 두 번 수정/삭제하면 항목별 결과가 모호해지므로 요청 전체를 거부합니다
+    if len(ids) != len(set(ids)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="중복된 게시물 id 가 있습니다.")
@@ -1,7 +1,8 @@
 # app/schemas/community.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import List, Optional
+from schemas.bulk import MAX_BULK_ITEMS
 
 class WriterResponse(BaseModel):
     id: int
@@ -24,7 +25,7 @@ class CommunityResponse(BaseModel):
     content: str
     created_at: datetime
     image: Optional[str] = None
-    answers: List[dict] = []
+    answer_count: int = 0
 
     class Config:
         orm_mode = True
@@ -37,11 +38,22 @@ class CommunitySearchResponse(BaseModel):
     content: str
     image: Optional[str] = None
     created_at: datetime
-    answers: List[dict] = []
+    answer_count: int = 0
 
     class Config:
         orm_mode = True
         
+class CommunityFeedItem(CommunitySearchResponse):
+    writer_avatar: Optional[str] = None
+
+class CommunityTrendingItem(CommunityFeedItem):
+    hot_score: float
+
+class CommunityFeedPage(BaseModel):
+    items: List[CommunityFeedItem]
+    # 다음 페이지 요청 시 cursor 로 넘길 값 (마지막 페이지면 None)
+    next_cursor: Optional[str] = None
+        
 class CommunityUpdate(BaseModel):
     title: Optional[str] = None
     content: Optional[str] = None
@@ -49,3 +61,35 @@ class CommunityUpdate(BaseModel):
     class Config:
         orm_mode = True
 
+class AnswerCreate(BaseModel):
+    content: str = Field(..., min_length=1)
+
+class AnswerResponse(BaseModel):
+    id: int
+    community_id: int
+    writer_id: int
+    writer_name: str
+    writer_avatar: Optional[str] = None
+    content: str
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class AnswerPage(BaseModel):
+    items: List[AnswerResponse]
+    # 다음 페이지 요청 시 after 로 넘길 값 (마지막 페이지면 None)
+    next_cursor: Optional[int] = None
+
+class CommunityBulkCreateItem(BaseModel):
+    title: str
+    content: str
+
+class CommunityBulkUpdateItem(CommunityUpdate):
+    id: int
+
+class CommunityBulkCreate(BaseModel):
+    items: List[CommunityBulkCreateItem] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+class CommunityBulkUpdate(BaseModel):
+    items: List[CommunityBulkUpdateItem] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
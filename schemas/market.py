@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
+from schemas.bulk import MAX_BULK_ITEMS
 
 class MarketBase(BaseModel):
     title: Optional[str] = None
@@ -11,6 +12,9 @@ class MarketBase(BaseModel):
     cultivation_period: Optional[str] = None
     hashtags: Optional[List[str]] = None
     image: Optional[str] = None
+    # 생략하면 location 으로 지오코딩합니다. 위도와 경도는 함께 지정해야 합니다
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 class MarketCreate(MarketBase):
     title: str
@@ -31,3 +35,37 @@ class MarketResponse(MarketBase):
     
     class Config:
         orm_mode = True
+
+class MarketTrendingItem(MarketResponse):
+    hot_score: float
+
+class SimilarMarketResponse(MarketResponse):
+    similarity: float
+
+class NearbyMarketResponse(MarketResponse):
+    distance_km: float
+
+class TagCountResponse(BaseModel):
+    tag: str
+    count: int
+
+    class Config:
+        orm_mode = True
+
+class PriceStatsResponse(BaseModel):
+    dimension: str
+    key: str
+    count: int
+    min: Optional[int] = None
+    max: Optional[int] = None
+    mean: float
+    median: Optional[float] = None  # 로그 버킷 히스토그램 근사값 (상대 오차 PRICE_SKETCH_ACCURACY 이내)
+
+class MarketBulkUpdateItem(MarketUpdate):
+    id: int
+
+class MarketBulkCreate(BaseModel):
+    items: List[MarketCreate] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
+
+class MarketBulkUpdate(BaseModel):
+    items: List[MarketBulkUpdateItem] = Field(..., min_length=1, max_length=MAX_BULK_ITEMS)
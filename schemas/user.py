@@ -20,6 +20,11 @@ class UserResponse(UserBase):
 class UserUpdate(UserBase):
     pass
 
+class UserProfile(BaseModel):
+    id: int
+    name: Optional[str]
+    avatar_url: Optional[str]  # 프로필 이미지가 없으면 None
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -0,0 +1,225 @@
+# app/sensor_state.py
+"""
+장치별 최신 센서/제어 상태 저장소.
+
+레코드는 장치마다 하나이고, 응답 본문 그대로의 JSON 바이트
+({"device_id", "timestamp", "sensors", "controls"}) 로 저장합니다. 장치 수천 개를 두어도 장치당 객체가
+bytes 하나뿐이고, 조회는 다시 직렬화하지 않고 저장된 바이트를 이어 붙여 바로 내려줍니다.
+쓰기는 레코드 전체를 한 번에 바꾸므로 읽는 쪽은 항상 한 시점의 완전한 레코드를 봅니다.
+
+백엔드 (SENSOR_STATE_BACKEND)
+- memory: 워커 프로세스 메모리의 dict. 워커가 하나일 때 가장 빠릅니다.
+- mmap: 모든 워커가 공유하는 파일(SENSOR_STATE_PATH)을 메모리 매핑한 고정 크기 해시 테이블.
+  슬롯 SENSOR_STATE_SLOTS 개, 슬롯마다 레코드 최대 SENSOR_STATE_RECORD_BYTES 바이트입니다.
+  쓰기는 파일 배타 잠금, 읽기는 공유 잠금(flock) 안에서 하므로 워커끼리 반쯤 쓴 레코드를 보지 않습니다.
+  파일에 남으므로 재시작해도 마지막 상태가 유지됩니다.
+
+두 백엔드 모두 장치 수(SENSOR_STATE_SLOTS)와 레코드 크기(SENSOR_STATE_RECORD_BYTES) 한도가 같습니다.
+"""
+import json
+import mmap
+from abc import ABC, abstractmethod
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+import metrics
+from config import settings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SENSOR_STATE_UPDATES = metrics.REGISTRY.counter("sensor_state_updates_total", "Device state records written, by backend.")
+
+
+class StateStoreError(Exception):
+    pass
+
+
+class RecordTooLarge(StateStoreError):
+    pass
+
+
+class StoreFull(StateStoreError):
+    pass
+
+
+def encode(device_id: str, timestamp: str, sensors: Dict, controls: Dict) -> bytes:
+    return json.dumps(
+        {"device_id": device_id, "timestamp": timestamp, "sensors": sensors, "controls": controls},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode()
+
+
+class StateStore(ABC):
+    """
+    장치별 최신 상태 레코드 저장소. 백엔드는 put / get_many 를 구현해야 인스턴스를 만들 수 있습니다.
+    """
+
+    backend = ""
+    KEY_BYTES = 64
+
+    def __init__(self, slots: int, record_bytes: int):
+        self.slots = slots
+        self.record_bytes = record_bytes
+
+    def _check(self, key: bytes, record: bytes):
+        # 백엔드와 관계없이 같은 한도를 적용해서, 백엔드를 바꿔도 받아들이는 요청이 달라지지 않게 합니다
+        if len(key) > self.KEY_BYTES:
+            raise StateStoreError(f"장치 id 는 {self.KEY_BYTES}바이트 이하여야 합니다.")
+        if len(record) > self.record_bytes:
+            raise RecordTooLarge(f"장치 상태는 {self.record_bytes}바이트 이하여야 합니다.")
+
+    @abstractmethod
+    def put(self, device_id: str, record: bytes):
+        ...
+
+    @abstractmethod
+    def get_many(self, device_ids: Iterable[str]) -> Dict[str, bytes]:
+        """
+        저장된 장치만 {장치 id: 레코드} 로 반환합니다.
+        """
+
+    def get(self, device_id: str) -> Optional[bytes]:
+        return self.get_many([device_id]).get(device_id)
+
+
+class MemoryStore(StateStore):
+    backend = "memory"
+
+    def __init__(self, slots: int, record_bytes: int):
+        super().__init__(slots, record_bytes)
+        self._records: Dict[str, bytes] = {}
+
+    def put(self, device_id: str, record: bytes):
+        self._check(device_id.encode(), record)
+        if device_id not in self._records and len(self._records) >= self.slots:
+            raise StoreFull("장치 상태 저장소가 가득 찼습니다.")
+        # dict 항목 교체는 GIL 아래에서 원자적이므로 잠금이 필요 없습니다
+        self._records[device_id] = record
+        SENSOR_STATE_UPDATES.inc(backend=self.backend)
+
+    def get_many(self, device_ids: Iterable[str]) -> Dict[str, bytes]:
+        records = self._records
+        return {device_id: records[device_id] for device_id in device_ids if device_id in records}
+
+
+class MmapStore(StateStore):
+    """
+    파일 레이아웃: 헤더(매직, 버전, 슬롯 수, 레코드 크기) 뒤에 고정 크기 슬롯이 이어집니다.
+    슬롯은 [키 길이 u8][키 64바이트][레코드 길이 u32][레코드] 이고, crc32(장치 id) 에서 시작해 선형 탐사합니다.
+    장치 레코드는 지우지 않으므로 탐사는 빈 슬롯을 만나면 끝납니다.
+    """
+
+    backend = "mmap"
+    MAGIC = b"PLSS"
+    VERSION = 1
+    HEADER = struct.Struct("<4sIII")
+    SLOT_HEADER = struct.Struct("<B64sI")
+
+    def __init__(self, path: str, slots: int, record_bytes: int):
+        super().__init__(slots, record_bytes)
+        self.path = path
+        self.slot_size = self.SLOT_HEADER.size + record_bytes
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        self._pid: Optional[int] = None
+        # flock 은 같은 프로세스의 스레드끼리는 막지 않으므로 스레드 잠금을 함께 씁니다
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._map is not None and self._pid == os.getpid():
+            return
+        if fcntl is None:
+            raise RuntimeError("SENSOR_STATE_BACKEND=mmap 은 fcntl 을 지원하는 OS 에서만 사용할 수 있습니다.")
+        size = self.HEADER.size + self.slots * self.slot_size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size == 0:
+                os.ftruncate(fd, size)
+                os.pwrite(fd, self.HEADER.pack(self.MAGIC, self.VERSION, self.slots, self.record_bytes), 0)
+            header = self.HEADER.unpack(os.pread(fd, self.HEADER.size, 0))
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        if header != (self.MAGIC, self.VERSION, self.slots, self.record_bytes):
+            os.close(fd)
+            raise RuntimeError(
+                f"{self.path} 의 레이아웃이 설정(SENSOR_STATE_SLOTS / SENSOR_STATE_RECORD_BYTES)과 다릅니다. "
+                "파일을 지우고 다시 시작하세요."
+            )
+        # fork 된 워커는 부모의 매핑을 쓰지 않고 새로 엽니다
+        self._fd, self._map, self._pid = fd, mmap.mmap(fd, size), os.getpid()
+
+    def _find(self, key: bytes) -> int:
+        """
+        키가 있는 슬롯, 없으면 키를 넣을 빈 슬롯의 오프셋. 테이블이 가득 찼으면 -1. 잠금 안에서 호출합니다.
+        """
+        index = zlib.crc32(key) % self.slots
+        for probe in range(self.slots):
+            offset = self.HEADER.size + ((index + probe) % self.slots) * self.slot_size
+            key_length = self._map[offset]
+            if key_length == 0 or self._map[offset + 1:offset + 1 + key_length] == key:
+                return offset
+        return -1
+
+    @contextmanager
+    def _locked(self, shared: bool):
+        with self._lock:
+            self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def put(self, device_id: str, record: bytes):
+        key = device_id.encode()
+        self._check(key, record)
+        with self._locked(shared=False):
+            offset = self._find(key)
+            if offset < 0:
+                raise StoreFull("장치 상태 저장소가 가득 찼습니다.")
+            start = offset + self.SLOT_HEADER.size
+            self._map[start:start + len(record)] = record
+            self._map[offset:start] = self.SLOT_HEADER.pack(len(key), key, len(record))
+        SENSOR_STATE_UPDATES.inc(backend=self.backend)
+
+    def get_many(self, device_ids: Iterable[str]) -> Dict[str, bytes]:
+        found = {}
+        with self._locked(shared=True):
+            for device_id in device_ids:
+                key = device_id.encode()
+                if len(key) > self.KEY_BYTES:
+                    continue
+                offset = self._find(key)
+                if offset < 0 or self._map[offset] == 0:
+                    continue
+                start = offset + self.SLOT_HEADER.size
+                _, _, length = self.SLOT_HEADER.unpack_from(self._map, offset)
+                found[device_id] = self._map[start:start + length]
+        return found
+
+
+def create_store(backend: str) -> StateStore:
+    if backend == "memory":
+        return MemoryStore(settings.SENSOR_STATE_SLOTS, settings.SENSOR_STATE_RECORD_BYTES)
+    if backend == "mmap":
+        return MmapStore(settings.SENSOR_STATE_PATH, settings.SENSOR_STATE_SLOTS, settings.SENSOR_STATE_RECORD_BYTES)
+    raise ValueError(f"알 수 없는 SENSOR_STATE_BACKEND 입니다: {backend}")
+
+
+store = create_store(settings.SENSOR_STATE_BACKEND)
+
+
+def join(records: List[bytes]) -> bytes:
+    """
+    저장된 레코드들을 JSON 배열 본문으로 잇습니다.
+    """
+    return b"[" + b",".join(records) + b"]"
@@ -0,0 +1,93 @@
+# app/serve.py
+"""
+운영 서버 실행기.
+
+    python serve.py [--host 0.0.0.0] [--port 8000] [--workers N]
+
+- 워커 프로세스 수는 SERVER_WORKERS(기본 1)이고, 0 이면 이 프로세스가 쓸 수 있는 CPU 수(컨테이너 cpuset 반영)입니다.
+- 이벤트 루프는 uvloop, HTTP 파서는 httptools 를 씁니다. 설치되어 있지 않은 플랫폼(Windows 등)에서는
+  uvicorn 기본 구현(asyncio, h11)으로 실행합니다.
+- 초기화는 main.lifespan 에서 하며, 워커마다 임포트/시작 시간을 로그(plkit.main)와 app_startup_seconds 메트릭으로 남깁니다.
+  NumPy/Pillow 를 쓰는 모듈과 백그라운드 스레드를 가진 모듈은 처음 쓸 때 임포트합니다(lazy.py).
+- SIGTERM(재배포)을 받으면 새 연결을 받지 않고 WebSocket 을 1012(Service Restart) 로 닫은 뒤, 진행 중인 요청과
+  WebSocket 핸들러의 정리를 SERVER_GRACEFUL_SHUTDOWN_SECONDS 까지 기다립니다. 그다음 lifespan 이 버퍼를
+  플러시하고 DB 풀을 닫습니다.
+
+장치 채널(devices.py), 이상치 탐지(anomaly.py), SENSOR_STATE_BACKEND=memory 상태는 워커 프로세스마다 따로 있고,
+워커들은 한 리슨 소켓을 나눠 쓰므로 한 장치의 연결과 제어 명령을 같은 워커로 보낼 방법이 없습니다.
+그래서 워커가 2개 이상이면 SERVER_MULTI_WORKER=true(장치 트래픽은 워커 1개짜리 인스턴스로 따로 보낸다는 확인)와
+SENSOR_STATE_BACKEND=mmap 이 모두 설정되어 있어야 시작합니다.
+개발 중에는 기존대로 `uvicorn main:app --reload` 를 씁니다.
+"""
+import argparse
+import copy
+import importlib.util
+import logging
+import logging.config
+import os
+from typing import List, Optional
+
+import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+
+from config import settings
+
+logger = logging.getLogger("plkit.serve")
+
+
+def cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def log_config() -> dict:
+    # uvicorn 로그 설정에 plkit.* 로거를 더해서 워커의 시작 시간, 백그라운드 스레드 오류도 함께 출력합니다
+    config = copy.deepcopy(LOGGING_CONFIG)
+    config["loggers"]["plkit"] = {"handlers": ["default"], "level": "INFO", "propagate": False}
+    return config
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="PLKIT 운영 서버")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS, help="0 이면 CPU 수 (2 이상은 SERVER_MULTI_WORKER 필요)")
+    args = parser.parse_args(argv)
+
+    config = log_config()
+    logging.config.dictConfig(config)
+    workers = args.workers or cpu_count()
+    if workers > 1:
+        if not settings.SERVER_MULTI_WORKER:
+            parser.error(
+                f"워커 {workers}개로 시작하려면 SERVER_MULTI_WORKER=true 가 필요합니다. "
+                "장치 채널과 이상치 탐지 상태가 워커마다 따로 있으므로, 장치 트래픽은 워커 1개짜리 인스턴스로 보내세요."
+            )
+        if settings.SENSOR_STATE_BACKEND != "mmap":
+            parser.error("워커가 여러 개면 워커 간 장치 상태를 공유하도록 SENSOR_STATE_BACKEND=mmap 이어야 합니다.")
+    loop = "uvloop" if _installed("uvloop") else "asyncio"
+    http = "httptools" if _installed("httptools") else "h11"
+    logger.info("starting %d worker(s) on %s:%d (loop=%s, http=%s)", workers, args.host, args.port, loop, http)
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        lifespan="on",
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        log_config=config,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# app/tasks.py
+"""
+jobs 큐에서 실행하는 작업들. (jobs.enqueue("이름", ...) 으로 넣습니다)
+"""
+
+from sqlalchemy import update
+
+import jobs
+import lazy
+from config import settings
+from database import SessionLocal
+from models.community import Community
+from models.market import Market
+from models.user import User
+from routers import communities, markets, users
+
+# Pillow(와 NumPy)는 워커 시작 때가 아니라 첫 이미지 작업 때 임포트합니다
+images = lazy.module("images")
+
+# 종류 -> (업로드 디렉터리, 모델, 이미지 컬럼)
+IMAGE_KINDS = {
+    "market": (markets.UPLOAD_DIR, Market, "image"),
+    "community": (communities.UPLOAD_DIR, Community, "image"),
+    "avatar": (users.UPLOAD_DIR, User, "avatar"),
+}
+
+# 허용하는 이미지 형식의 파일 시그니처
+_SIGNATURES = (
+    b"\xff\xd8\xff",  # JPEG
+    b"\x89PNG\r\n\x1a\n",  # PNG
+    b"GIF87a",
+    b"GIF89a",
+)
+
+
+def is_image(head: bytes) -> bool:
+    if head.startswith(_SIGNATURES):
+        return True
+    return head[:4] == b"RIFF" and head[8:12] == b"WEBP"
+
+
+@jobs.register("delete_image")
+def delete_image(kind: str, filename: str):
+    """
+    교체된 업로드 이미지와 그 파생본을 지웁니다.
+    """
+    directory = IMAGE_KINDS[kind][0]
+    images.delete_derivatives(directory, filename)
+    (directory / filename).unlink(missing_ok=True)
+
+
+@jobs.register("verify_image")
+def verify_image(kind: str, owner_id: int, filename: str):
+    """
+    업로드된 파일이 허용 형식의 이미지이고 IMAGE_MAX_BYTES 이하인지 확인하고, 맞으면 파생본 생성을 예약합니다.
+    아니면 파일을 지우고, 게시물/사용자가 아직 이 파일을 가리키고 있으면 참조도 지웁니다.
+    """
+    directory, model, column = IMAGE_KINDS[kind]
+    path = directory / filename
+    if not path.exists():
+        return
+    with open(path, "rb") as file:
+        head = file.read(12)
+    if is_image(head) and path.stat().st_size <= settings.IMAGE_MAX_BYTES:
+        jobs.enqueue("make_derivatives", kind=kind, filename=filename)
+        return
+    db = SessionLocal()
+    try:
+        attribute = getattr(model, column)
+        db.execute(update(model).where(model.id == owner_id, attribute == filename).values({column: None}))
+        db.commit()
+    finally:
+        db.close()
+    if kind == "avatar":
+        from crud.user import profile_cache
+        profile_cache.invalidate(owner_id)
+    delete_image(kind, filename)
+
+
+@jobs.register("make_derivatives")
+def make_derivatives(kind: str, filename: str):
+    """
+    검증된 업로드 이미지의 크기별 WebP 파생본을 미리 만듭니다.
+    """
+    directory = IMAGE_KINDS[kind][0]
+    if not (directory / filename).exists():
+        return
+    try:
+        images.generate(directory, filename)
+    except images.UNREADABLE:
+        # 시그니처는 맞지만 디코딩할 수 없는 파일은 요청 시 원본을 내려줍니다
+        return
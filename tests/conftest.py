@@ -0,0 +1,26 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+import pytest
+
+# 설정은 임포트 시점에 읽으므로 앱을 임포트하기 전에 테스트용 SQLite DB 와 작업 큐 파일을 지정합니다
+_tmp_dir = tempfile.mkdtemp(prefix="plkit-test-")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'app.db')}"
+os.environ["JOBS_DB_PATH"] = os.path.join(_tmp_dir, "jobs.sqlite3")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import database
+    import main
+    import models.community, models.market, models.trending, models.user  # noqa: F401  (테이블 등록)
+
+    database.Base.metadata.create_all(database.engine)
+    # lifespan 을 실행하지 않으므로 작업 큐 워커는 뜨지 않습니다
+    return TestClient(main.app)
@@ -0,0 +1,67 @@
+# tests/test_query_inspector.py
+import threading
+
+import pytest
+from sqlalchemy import select
+
+import database
+import query_inspector
+from models.community import Community
+from models.user import User
+
+WRITERS = 5
+
+
+@pytest.fixture(scope="module")
+def communities(client):
+    db = database.SessionLocal()
+    try:
+        for i in range(WRITERS):
+            writer = User(email=f"budget{i}@example.com", name=f"budget{i}", password="x")
+            db.add(writer)
+            db.flush()
+            db.add(Community(title=f"글 {i}", content="내용", writer_id=writer.id))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _list_with_writer_per_row(db):
+    # 예전 GET /communities/ 의 방식: 게시물 목록을 읽은 뒤 게시물마다 작성자를 따로 조회 (N+1)
+    response = []
+    for community in db.query(Community).all():
+        writer = db.query(User).filter(User.id == community.writer_id).first()
+        response.append({"id": community.id, "writer_name": writer.name})
+    return response
+
+
+def test_writer_per_row_listing_exceeds_budget(communities):
+    db = database.SessionLocal()
+    try:
+        with pytest.raises(query_inspector.QueryBudgetExceeded, match="budget is 3"):
+            with query_inspector.query_budget(3):
+                _list_with_writer_per_row(db)
+    finally:
+        db.close()
+
+
+def test_list_communities_within_budget(client, communities):
+    with query_inspector.query_budget(3) as budget:
+        response = client.get("/communities/")
+    assert response.status_code == 200
+    assert len(response.json()) >= WRITERS
+    assert 1 <= budget.count <= 3
+
+
+def test_budget_ignores_other_threads(communities):
+    def background_flush():
+        # trending/recommendations flush 처럼 요청과 무관하게 도는 스레드
+        with database.SessionLocal() as db:
+            for _ in range(10):
+                db.execute(select(User.id)).all()
+
+    with query_inspector.query_budget(0) as budget:
+        thread = threading.Thread(target=background_flush)
+        thread.start()
+        thread.join()
+    assert budget.count == 0
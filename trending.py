@@ -0,0 +1,322 @@
+# app/trending.py
+"""
+커뮤니티/마켓 게시물의 조회수·상호작용 집계와 시간 감쇠 hot 랭킹.
+
+- 이벤트(조회, 답변 등)는 메모리 버퍼에 모았다가 TRENDING_FLUSH_INTERVAL_SECONDS 마다
+  (또는 버퍼가 TRENDING_FLUSH_MAX_KEYS 를 넘으면) 백그라운드 스레드가 content_stat 에 한 트랜잭션으로 반영합니다.
+- hot 점수는 forward decay 방식입니다. 시각 t 의 이벤트는 가중치 * 2^((t - EPOCH) / 반감기) 를 더하고,
+  넘치지 않도록 로그 값으로 저장합니다. 모든 항목이 같은 비율로 감쇠하므로 순위는 시간이 지나도 바뀌지 않고,
+  점수는 이벤트가 올 때만 증가합니다. 그래서 상위 K 개를 이벤트마다 점진적으로 갱신할 수 있고
+  /trending 조회는 정렬 없이 O(K) 입니다.
+- 상위 K 개는 이 워커가 플러시한 뒤, 또는 TRENDING_RESYNC_SECONDS 마다 (kind, score) 인덱스로 다시 읽어
+  다른 워커의 이벤트도 반영합니다.
+"""
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func, select, tuple_, update
+
+import metrics
+from config import settings
+from database import greatest, upsert
+from models.community import Community
+from models.market import Market
+from models.trending import ContentStat
+
+logger = logging.getLogger("plkit.trending")
+
+# forward decay 기준 시각 (바꾸면 저장된 점수와 호환되지 않습니다)
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+
+VIEW = "view"
+INTERACTION = "interaction"
+
+# kind -> 게시물 모델 (삭제된 게시물을 상위 K 에서 빼기 위해 조인합니다)
+KINDS = {"community": Community, "market": Market}
+
+TRENDING_EVENTS = metrics.REGISTRY.counter("trending_events_total", "Trending events recorded, by kind and event.")
+TRENDING_FLUSHES = metrics.REGISTRY.counter("trending_flushes_total", "Trending buffer flushes, by result.")
+TRENDING_FLUSH_KEYS = metrics.REGISTRY.histogram(
+    "trending_flush_keys", "Distinct items written per trending flush.", (1, 10, 100, 1000, 10000)
+)
+
+
+def _log_add(a: float, b: float) -> float:
+    """
+    log(exp(a) + exp(b)) 를 넘침 없이 계산합니다.
+    """
+    if a < b:
+        a, b = b, a
+    if b == -math.inf:
+        return a
+    return a + math.log1p(math.exp(b - a))
+
+
+def forward_score(weight: float, at: float) -> float:
+    """
+    시각 at(유닉스 초)의 가중치 weight 이벤트가 더하는 로그 점수.
+    """
+    half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600
+    return math.log(weight) + (at - EPOCH) / half_life * math.log(2)
+
+
+def current_score(log_score: float, now: float) -> float:
+    """
+    로그 점수를 현재 시각 기준의 감쇠된 점수(최근 이벤트 하나 = 가중치)로 바꿉니다.
+    """
+    return math.exp(log_score - forward_score(1.0, now))
+
+
+class TopK:
+    """
+    점수가 증가만 하는 항목들의 상위 k 개를 유지하는 정렬 집합.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.scores: Dict[int, float] = {}
+        self._order: List[Tuple[float, int]] = []  # (-score, id) 오름차순
+
+    def offer(self, item_id: int, score: float):
+        old = self.scores.get(item_id)
+        if old is not None:
+            if score <= old:
+                return
+            del self._order[bisect_left(self._order, (-old, item_id))]
+        elif len(self._order) >= self.k and score <= -self._order[-1][0]:
+            return
+        insort(self._order, (-score, item_id))
+        self.scores[item_id] = score
+        if len(self._order) > self.k:
+            _, evicted = self._order.pop()
+            del self.scores[evicted]
+
+    def replace(self, items: List[Tuple[int, float]]):
+        self._order = sorted((-score, item_id) for item_id, score in items)[: self.k]
+        self.scores = {item_id: -negative for negative, item_id in self._order}
+
+    def top(self, n: int) -> List[Tuple[int, float]]:
+        return [(item_id, -negative) for negative, item_id in self._order[:n]]
+
+
+class _Pending:
+    __slots__ = ("views", "interactions", "score")
+
+    def __init__(self):
+        self.views = 0
+        self.interactions = 0
+        self.score = -math.inf
+
+
+class TrendingTracker:
+    """
+    이벤트 버퍼, 종류별 TopK, 플러시 스레드를 관리합니다. 플러시 스레드는 첫 사용 시 시작됩니다.
+    """
+
+    def __init__(self, session_factory, top_k: int, flush_interval: float, flush_max_keys: int, resync_interval: float):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.flush_max_keys = flush_max_keys
+        self.resync_interval = resync_interval
+        self._reloaded_at = -math.inf
+        self.tops = {kind: TopK(top_k) for kind in KINDS}
+        self._pending: Dict[Tuple[str, int], _Pending] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._loaded = False
+
+    def record(self, kind: str, content_id: int, event: str = VIEW):
+        weight = settings.TRENDING_INTERACTION_WEIGHT if event == INTERACTION else 1.0
+        delta = forward_score(weight, time.time())
+        with self._lock:
+            pending = self._pending.get((kind, content_id))
+            if pending is None:
+                pending = self._pending[(kind, content_id)] = _Pending()
+            if event == INTERACTION:
+                pending.interactions += 1
+            else:
+                pending.views += 1
+            pending.score = _log_add(pending.score, delta)
+            top = self.tops[kind]
+            if content_id in top.scores:
+                top.offer(content_id, _log_add(top.scores[content_id], delta))
+            else:
+                # 상위 K 에 없는 항목은 DB 점수를 모르므로 버퍼 점수(하한)로만 경쟁합니다. 다음 플러시에서 정확해집니다
+                top.offer(content_id, pending.score)
+            full = len(self._pending) >= self.flush_max_keys
+        TRENDING_EVENTS.inc(kind=kind, event=event)
+        self._ensure_started()
+        if full:
+            self._wake.set()
+
+    def top(self, kind: str, n: int) -> List[Tuple[int, float]]:
+        if not self._loaded:
+            self.reload()
+        self._ensure_started()
+        with self._lock:
+            return self.tops[kind].top(n)
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trending-flush", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("trending flush failed")
+
+    def stop(self):
+        """
+        플러시 스레드를 멈추고 남은 이벤트를 반영합니다. (애플리케이션 종료 시)
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if pending:
+                try:
+                    self._write(pending)
+                except Exception:
+                    TRENDING_FLUSHES.inc(result="error")
+                    self._restore(pending)
+                    raise
+                TRENDING_FLUSHES.inc(result="ok")
+                TRENDING_FLUSH_KEYS.observe(len(pending))
+            # 쓴 것이 없으면 다른 워커의 이벤트를 반영하는 재동기화 주기에만 다시 읽습니다
+            if pending or time.monotonic() - self._reloaded_at >= self.resync_interval:
+                self.reload()
+
+    def _restore(self, pending: Dict[Tuple[str, int], _Pending]):
+        # 실패한 배치는 다음 플러시에 다시 반영되도록 버퍼에 되돌립니다
+        with self._lock:
+            for key, item in pending.items():
+                current = self._pending.get(key)
+                if current is None:
+                    self._pending[key] = item
+                    continue
+                current.views += item.views
+                current.interactions += item.interactions
+                current.score = _log_add(current.score, item.score)
+
+    def _write(self, pending: Dict[Tuple[str, int], _Pending]):
+        keys = list(pending)
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(ContentStat.kind, ContentStat.content_id, ContentStat.views, ContentStat.interactions, ContentStat.score)
+                .where(tuple_(ContentStat.kind, ContentStat.content_id).in_(keys))
+                .with_for_update()
+            ).all()
+            existing = {(row.kind, row.content_id): row for row in rows}
+            now = datetime.utcnow()
+            updates, inserts = [], []
+            for key, item in pending.items():
+                row = existing.get(key)
+                if row is None:
+                    inserts.append({
+                        "kind": key[0], "content_id": key[1], "views": item.views,
+                        "interactions": item.interactions, "score": item.score, "updated_at": now,
+                    })
+                else:
+                    updates.append({
+                        "kind": key[0], "content_id": key[1], "views": row.views + item.views,
+                        "interactions": row.interactions + item.interactions,
+                        "score": _log_add(row.score, item.score), "updated_at": now,
+                    })
+            if updates:
+                db.execute(update(ContentStat), updates)
+            # 다른 워커가 같은 항목의 첫 행을 먼저 넣었으면 그 행에 합칩니다
+            table = ContentStat.__table__
+            upsert(db, table, inserts, lambda new: {
+                "views": table.c.views + new.views,
+                "interactions": table.c.interactions + new.interactions,
+                # _log_add 와 같은 식: max(a, b) + ln(1 + exp(-|a - b|))
+                "score": greatest(db, table.c.score, new.score)
+                + func.ln(1 + func.exp(-func.abs(table.c.score - new.score))),
+                "updated_at": new.updated_at,
+            })
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def reload(self):
+        """
+        종류별 상위 K 개를 (kind, score) 인덱스로 다시 읽고, 아직 반영되지 않은 버퍼 점수를 더합니다.
+        """
+        self._reloaded_at = time.monotonic()
+        db = self.session_factory()
+        try:
+            loaded = {}
+            for kind, model in KINDS.items():
+                loaded[kind] = db.execute(
+                    select(ContentStat.content_id, ContentStat.score)
+                    .join(model, model.id == ContentStat.content_id)
+                    .where(ContentStat.kind == kind)
+                    .order_by(ContentStat.score.desc())
+                    .limit(self.tops[kind].k)
+                ).all()
+        finally:
+            db.close()
+        with self._lock:
+            for kind, rows in loaded.items():
+                top = self.tops[kind]
+                top.replace([(row.content_id, row.score) for row in rows])
+            for (kind, content_id), item in self._pending.items():
+                top = self.tops[kind]
+                top.offer(content_id, _log_add(top.scores.get(content_id, -math.inf), item.score))
+            self._loaded = True
+
+
+def _create_tracker() -> TrendingTracker:
+    from database import SessionLocal
+
+    return TrendingTracker(
+        SessionLocal,
+        settings.TRENDING_TOP_K,
+        settings.TRENDING_FLUSH_INTERVAL_SECONDS,
+        settings.TRENDING_FLUSH_MAX_KEYS,
+        settings.TRENDING_RESYNC_SECONDS,
+    )
+
+
+tracker = _create_tracker()
+
+
+def record_view(kind: str, content_id: int):
+    tracker.record(kind, content_id, VIEW)
+
+
+def record_interaction(kind: str, content_id: int):
+    tracker.record(kind, content_id, INTERACTION)
+
+
+def trending(kind: str, limit: int) -> List[Tuple[int, float]]:
+    """
+    hot 점수 상위 limit 개를 [(content_id, 현재 기준 점수)] 로 반환합니다.
+    """
+    now = time.time()
+    return [(content_id, round(current_score(score, now), 4)) for content_id, score in tracker.top(kind, limit)]